@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import discord
+import metrics
+import rest_scheduler
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Discord-Limits pro Nachricht
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+def guild_log_channel(guild: Optional[discord.Guild], channel_id: Optional[int]) -> Optional[discord.TextChannel]:
+    """
+    Log-Kanal einer Guild. Gesucht wird nur in dieser Guild, nie über den globalen Cache des Clients: Logs und
+    Transkripte eines Servers dürfen nicht in einem Kanal eines anderen Servers landen (z.B. wenn eine Guild ohne eigenen
+    Eintrag die Log-Kanal-ID der Standard-Konfiguration erbt).
+    """
+    if guild is None or not channel_id:
+        return None
+    channel = guild.get_channel(channel_id)
+    if not isinstance(channel, discord.TextChannel) or channel.guild.id != guild.id:
+        return None
+    return channel
+
+
+class AuditLogWriter:
+    """
+    Hintergrund-Pipeline für Log-Nachrichten.
+    Interaction-Handler legen Embeds nur in eine begrenzte Queue; ein einzelner Task fasst bis zu 10 Embeds
+    pro Guild und Log-Kanal und Nachricht zusammen und sendet, sobald eine Nachricht voll ist oder flush_interval abgelaufen ist.
+    Ist die Queue voll (z.B. bei Raids), werden neue Einträge verworfen statt die Handler zu bremsen.
+    """
+
+    def __init__(self, client: discord.Client, max_queue_size: int = 1000, flush_interval: float = 2.0):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        # Laufender Sendevorgang; wird beim Beenden nicht abgebrochen, sondern abgewartet
+        self._in_flight: Optional[asyncio.Future] = None
+        # Gesammelte, noch nicht gesendete Einträge pro (Guild-ID, Log-Kanal-ID)
+        self._pending: Dict[Tuple[int, int], List[discord.Embed]] = {}
+        # Fehlende Log-Kanäle werden nur einmal gemeldet (z.B. Guilds, die die Standard-Konfiguration erben)
+        self._missing_reported = set()
+        # Zähler
+        self.dropped = 0
+        self.failed = 0
+        self.sent_messages = 0
+        self.sent_embeds = 0
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() + sum(len(batch) for batch in self._pending.values())
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "sent_messages": self.sent_messages,
+            "sent_embeds": self.sent_embeds,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+
+    async def stop(self):
+        """Beendet den Writer und sendet noch wartende Einträge."""
+        if self._task is None:
+            return
+        in_flight = self._in_flight
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if in_flight is not None:
+            await in_flight
+        while not self.queue.empty():
+            await self._add(*self.queue.get_nowait())
+        await self._flush_all()
+
+    def submit(self, guild_id: int, channel_id: int, embed: discord.Embed) -> bool:
+        """
+        Reiht ein Log-Embed für den Log-Kanal einer Guild ein, ohne zu warten. Gibt False zurück, wenn es verworfen wurde.
+        Gesendet wird nur, wenn der Kanal zu dieser Guild gehört.
+        """
+        try:
+            self.queue.put_nowait(((guild_id, channel_id), embed))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                log.warning("Log-Queue voll (%d Einträge), bisher %d Log-Einträge verworfen.", self.depth, self.dropped)
+            return False
+
+    async def _add(self, target: Tuple[int, int], embed: discord.Embed):
+        """Fügt einen Eintrag zum Batch seines Kanals hinzu und sendet den Batch, sobald er voll ist."""
+        batch = self._pending.setdefault(target, [])
+        if batch and sum(len(e) for e in batch) + len(embed) > MAX_EMBED_CHARS_PER_MESSAGE:
+            # Passt nicht mehr in diese Nachricht: aktuellen Batch senden, Eintrag startet den nächsten
+            await self._send(target, self._pending.pop(target))
+            batch = self._pending.setdefault(target, [])
+        batch.append(embed)
+        if len(batch) >= MAX_EMBEDS_PER_MESSAGE:
+            await self._send(target, self._pending.pop(target))
+
+    async def _flush_all(self):
+        # Einzeln entnehmen, damit bei einem Abbruch die Batches der übrigen Kanäle erhalten bleiben
+        while self._pending:
+            target = next(iter(self._pending))
+            await self._send(target, self._pending.pop(target))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._add(*(await self.queue.get()))
+            deadline = loop.time() + self.flush_interval
+            # Sammeln, bis das Zeitfenster abläuft; volle Nachrichten werden sofort gesendet
+            while self._pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                await self._add(*item)
+            await self._flush_all()
+
+    async def _send(self, target: Tuple[int, int], batch: List[discord.Embed]):
+        if not batch:
+            return
+        guild_id, channel_id = target
+        log_channel = guild_log_channel(self.client.get_guild(guild_id), channel_id)
+        if log_channel is None:
+            self.failed += len(batch)
+            if target in self._missing_reported:
+                return
+            self._missing_reported.add(target)
+            log.error("Log-Kanal mit ID %s auf dem Server %s nicht gefunden oder kein Textkanal.", channel_id, guild_id,
+                      extra={"guild_id": guild_id})
+            return
+        self._in_flight = asyncio.ensure_future(self._deliver(log_channel, batch))
+        try:
+            # Abbrechen des Writers (stop) darf einen bereits begonnenen Sendevorgang nicht verwerfen
+            await asyncio.shield(self._in_flight)
+        finally:
+            self._in_flight = None
+
+    async def _deliver(self, log_channel: discord.TextChannel, batch: List[discord.Embed]):
+        rest_scheduler.background() # Eigener Task (ensure_future), betrifft nur diesen Sendevorgang
+        try:
+            with metrics.LOG_WRITE_SECONDS.time():
+                await log_channel.send(embeds=batch)
+            self.sent_messages += 1
+            self.sent_embeds += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            log.error("Fehler beim Senden der Log-Nachricht: %s", e)
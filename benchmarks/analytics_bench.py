@@ -0,0 +1,122 @@
+"""
+Benchmark der Ticket-Statistiken (ticket_analytics.py) mit synthetischen Ereignissen.
+
+Schreibt N Tickets (Erstellen, bei den meisten Claim und Schließen) über TicketEventLog in mehrere Segmente eines
+temporären Verzeichnisses und misst Laden und Auswertung mit NumPy (falls installiert) und mit dem array-Modul.
+Beide Varianten müssen dieselben Ergebnisse liefern.
+
+Beispiele:
+    python benchmarks/analytics_bench.py                    # 400.000 Tickets (ca. 1 Mio. Ereignisse)
+    python benchmarks/analytics_bench.py --tickets 2000000 --segments 8
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import ticket_analytics # noqa: E402
+from ticket_analytics import EVENT_CLAIMED, EVENT_CLOSED, EVENT_CREATED, TicketEventLog # noqa: E402
+
+CATEGORIES = ("general_help", "ban_appeal", "report_user", "bug_report", "partnership")
+
+
+def write_events(directory: str, tickets: int, segments: int, seed: int) -> int:
+    """Füllt die Puffer direkt (schneller als record() pro Ereignis) und schreibt sie mit flush()."""
+    rng = random.Random(seed)
+    start = time.time() - 90 * 86400
+    logs = [TicketEventLog(directory, f"cluster-{index}") for index in range(segments)]
+    for event_log in logs:
+        event_log.open()
+        # Unterschiedliche Reihenfolge der Kategorie-Codes pro Segment prüft das Zusammenführen beim Laden
+        event_log._categories = rng.sample(CATEGORIES, len(CATEGORIES))
+        event_log._codes = {category: code for code, category in enumerate(event_log._categories)}
+        event_log._categories_dirty = True
+    for thread_id in range(1, tickets + 1):
+        event_log = logs[thread_id % segments]
+        buffer = event_log._buffer
+        guild_id = 1 + thread_id % 3
+        category = event_log._codes[CATEGORIES[thread_id % len(CATEGORIES)]]
+        created_at = start + thread_id * 90 * 86400 / tickets
+        rows = [(created_at, EVENT_CREATED, 10_000 + thread_id % 5000)]
+        if rng.random() < 0.9:
+            claimed_at = created_at + rng.expovariate(1 / 1800)
+            rows.append((claimed_at, EVENT_CLAIMED, 1 + rng.randrange(40)))
+            if rng.random() < 0.9:
+                rows.append((claimed_at + rng.expovariate(1 / 14400), EVENT_CLOSED, 1 + rng.randrange(40)))
+        for ts, kind, actor_id in rows:
+            buffer["ts"].append(ts)
+            buffer["thread_id"].append(thread_id)
+            buffer["guild_id"].append(guild_id)
+            buffer["actor_id"].append(actor_id)
+            buffer["kind"].append(kind)
+            buffer["category"].append(category)
+    for event_log in logs:
+        asyncio.run(event_log.flush())
+    return sum(event_log.written for event_log in logs)
+
+
+def measure(directory: str, use_numpy: bool, guild_id, since) -> tuple:
+    started = time.perf_counter()
+    events = ticket_analytics.load_events(directory, use_numpy=use_numpy)
+    loaded = time.perf_counter()
+    result = ticket_analytics.compute_stats(events, guild_id, since)
+    return result, loaded - started, time.perf_counter() - loaded
+
+
+def same_results(a: dict, b: dict) -> bool:
+    if a["tickets"] != b["tickets"]:
+        return False
+    for name in ("time_to_claim", "time_to_close"):
+        for group in ("category", "moderator", "hour"):
+            if set(a[name][group]) != set(b[name][group]):
+                return False
+            for key, stats in a[name][group].items():
+                other = b[name][group][key]
+                if stats.count != other.count or not all(math.isclose(getattr(stats, field), getattr(other, field), rel_tol=1e-9)
+                                                         for field in ("mean", "p50", "p90")):
+                    return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Ticket-Statistiken mit synthetischen Ereignissen.")
+    parser.add_argument("--tickets", type=int, default=400_000, help="Anzahl synthetischer Tickets (Standard: 400000)")
+    parser.add_argument("--segments", type=int, default=4, help="Anzahl Segmente / Bot-Prozesse (Standard: 4)")
+    parser.add_argument("--guild", type=int, default=None, help="Nur diese Guild auswerten (1-3)")
+    parser.add_argument("--days", type=float, default=0, help="Nur Tickets der letzten N Tage (0 = alle)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="ticket-analytics-")
+    try:
+        started = time.perf_counter()
+        events = write_events(directory, args.tickets, args.segments, args.seed)
+        print(f"{events} Ereignisse geschrieben in {time.perf_counter() - started:.2f}s "
+              f"({sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names) / 1e6:.1f} MB)")
+        since = time.time() - args.days * 86400 if args.days else None
+        results = {}
+        for backend, use_numpy in (("NumPy", True), ("array", False)):
+            if use_numpy and ticket_analytics._load_numpy() is None:
+                print("NumPy: nicht installiert, übersprungen")
+                continue
+            result, load_seconds, compute_seconds = measure(directory, use_numpy, args.guild, since)
+            results[backend] = result
+            print(f"{backend}: Laden {load_seconds:.3f}s, Auswertung {compute_seconds:.3f}s, gesamt {load_seconds + compute_seconds:.3f}s")
+        if len(results) == 2:
+            print("Ergebnisse identisch:", "ja" if same_results(results["NumPy"], results["array"]) else "NEIN")
+        result = next(iter(results.values()))
+        print(ticket_analytics.format_row("Gesamt", result["time_to_claim"]["all"], result["time_to_close"]["all"]))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
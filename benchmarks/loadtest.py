@@ -0,0 +1,577 @@
+"""
+Offline-Lasttest für den Ticket-Ablauf (ohne Netzwerkverbindung).
+
+Der Lasttest treibt die echten Klassen aus bot.py – TicketPanelView, DynamicTicketModal.on_submit,
+create_ticket_thread_after_modal und finalize_close_ticket – gegen einen lokalen Ersatz für Discord.
+ForumChannel.create_thread, thread.send, thread.edit, message.edit, log_channel.send sowie die Interaktions-Antworten
+werden durch Stubs mit konfigurierbarer Latenz ersetzt. Mit --rate-429 wird ein Anteil der REST-Aufrufe rate-limitiert:
+wie discord.py wartet der Stub dann retry_after Sekunden und wiederholt den Aufruf.
+
+Gemessen werden:
+  * Latenz vom Absenden des Modals bis zur Bestätigung (defer) und bis zur Followup-Nachricht (p50/p99/max)
+  * Durchsatz (fertige Tickets pro Sekunde) bei N gleichzeitigen Ticket-Eröffnungen
+  * Event-Loop-Verzögerung (wie viel später als geplant ein 10-ms-Timer aufwacht)
+
+Beispiele:
+    python benchmarks/loadtest.py                                   # 500 Tickets, 100 gleichzeitig, 50 ms Latenz
+    python benchmarks/loadtest.py --tickets 2000 --concurrency 500 --latency-ms 80 --rate-429 0.02 --close
+    python benchmarks/loadtest.py --json                            # Ergebnis als JSON (z.B. für Vergleiche)
+    python benchmarks/loadtest.py --close --bulk-close --rest-rate 40 # Schließen mit /tickets bulk_close
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GUILD_ID = 100000000000000001
+OPEN_TICKET_CHANNEL_ID = 100000000000000002
+APPEALS_FORUM_ID = 100000000000000003
+LOG_CHANNEL_ID = 100000000000000004
+PING_ROLE_ID = 100000000000000005
+FIRST_USER_ID = 200000000000000000
+FIRST_THREAD_ID = 300000000000000000
+FIRST_MESSAGE_ID = 500000000000000000
+
+
+def percentile(values: list, p: float) -> float:
+    """Perzentil nach dem Nearest-Rank-Verfahren (0.0 bei leerer Liste)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(values: list) -> dict:
+    """Kennzahlen einer Messreihe in Millisekunden."""
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+class FakeRestApi:
+    """
+    Simuliert die REST-Latenz von Discord und injiziert 429-Antworten. Wie die echten Aufrufe laufen alle Aufrufe durch
+    den REST-Scheduler des Bots (Interaktions-Antworten in der hohen Spur, ohne globales Limit).
+    """
+
+    def __init__(self, latency: float, jitter: float, rate_429: float, retry_after: float, seed: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self.scheduler = None # RestScheduler des Bots, wird nach dem Import von bot.py gesetzt
+
+    def _delay(self) -> float:
+        return max(0.0, self.rng.gauss(self.latency, self.jitter))
+
+    async def call(self, route: str):
+        async with self.scheduler.slot(route, exempt=route.startswith("interaction.")):
+            self.calls[route] += 1
+            delay = self._delay()
+            if self.rng.random() < self.rate_429:
+                # discord.py wartet bei 429 retry_after ab und sendet die Anfrage erneut
+                self.rate_limited[route] += 1
+                self.scheduler.record_rate_limit(route, self.retry_after)
+                delay += self.retry_after + self._delay()
+            await asyncio.sleep(delay)
+
+
+def build_fakes(discord, api: FakeRestApi, tag_names: list, history_messages: int):
+    """Erzeugt Ersatzklassen für die discord.py-Objekte. isinstance-Prüfungen in bot.py bleiben dadurch gültig."""
+
+    class FakeAuthor(SimpleNamespace):
+        def __str__(self):
+            return self.name
+
+    bot_user = FakeAuthor(id=FIRST_USER_ID - 2, name="TicketBot")
+    message_ids = iter(range(FIRST_MESSAGE_ID, FIRST_MESSAGE_ID + 10 ** 9))
+
+    class FakeMessage:
+        def __init__(self, embeds=None, content=None, author=None):
+            self.id = next(message_ids)
+            self.embeds = list(embeds or [])
+            self.content = content or ""
+            self.author = author or bot_user
+            self.created_at = datetime.datetime.now(datetime.timezone.utc)
+            self.attachments = []
+
+        async def edit(self, embed=None, view=None, **kwargs):
+            await api.call("message.edit")
+            if embed is not None:
+                self.embeds = [embed]
+
+    class FakeThread(discord.Thread):
+        def __init__(self, guild, thread_id: int, name: str):
+            self.guild = guild
+            self.id = thread_id
+            self.name = name
+            self.parent_id = APPEALS_FORUM_ID
+            self.archived = False
+            self.locked = False
+            self._created_at = None
+            self.messages = []
+
+        async def send(self, content=None, embed=None, view=None, **kwargs):
+            await api.call("thread.send")
+            message = FakeMessage([embed] if embed else None, content)
+            self.messages.append(message)
+            return message
+
+        async def history(self, limit=None, oldest_first=False, **kwargs):
+            # Simulierter Verlauf (--history Nachrichten) plus die vom Bot gesendeten Nachrichten, seitenweise wie discord.py
+            total = history_messages + len(self.messages)
+            for index in range(total):
+                if index % 100 == 0:
+                    await api.call("thread.history")
+                if index < history_messages:
+                    yield FakeMessage(content=f"Nachricht {index} " + "x" * 200, author=FakeAuthor(id=FIRST_USER_ID, name="user0"))
+                else:
+                    yield self.messages[index - history_messages]
+
+        async def fetch_message(self, message_id: int):
+            await api.call("thread.fetch_message")
+            for message in self.messages:
+                if message.id == message_id:
+                    return message
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+
+        async def edit(self, name=None, archived=None, locked=None, **kwargs):
+            await api.call("thread.edit")
+            if name is not None:
+                self.name = name
+            if archived is not None:
+                self.archived = archived
+            if locked is not None:
+                self.locked = locked
+            return self
+
+    class FakeForum(discord.ForumChannel):
+        available_tags = () # Überdeckt die Property, Tags werden direkt gesetzt
+
+        def __init__(self, guild):
+            self.guild = guild
+            self.id = APPEALS_FORUM_ID
+            self.name = "appeals"
+            self.available_tags = [discord.ForumTag(name=name) for name in tag_names]
+            self.next_thread_id = FIRST_THREAD_ID
+            self.created_threads = {}
+
+        async def create_thread(self, name, content=None, applied_tags=None, **kwargs):
+            await api.call("forum.create_thread")
+            self.next_thread_id += 1
+            thread = FakeThread(self.guild, self.next_thread_id, name)
+            self.created_threads[thread.id] = thread
+            return SimpleNamespace(thread=thread, message=FakeMessage())
+
+    class FakeLogChannel(discord.TextChannel):
+        def __init__(self, guild):
+            self.guild = guild
+            self.id = LOG_CHANNEL_ID
+            self.name = "ticket-log"
+
+        async def send(self, content=None, embeds=None, file=None, **kwargs):
+            await api.call("log_channel.upload" if file else "log_channel.send")
+            if file:
+                file.close()
+            return FakeMessage(embeds, content)
+
+    class FakeRole:
+        def __init__(self, role_id: int):
+            self.id = role_id
+            self.mention = f"<@&{role_id}>"
+
+    class FakeGuild:
+        def __init__(self):
+            self.id = GUILD_ID
+            self.name = "Lasttest"
+            self.filesize_limit = 10 * 1024 * 1024
+            self.forum = FakeForum(self)
+            self.log_channel = FakeLogChannel(self)
+            self.open_channel = SimpleNamespace(id=OPEN_TICKET_CHANNEL_ID)
+            self.roles = {PING_ROLE_ID: FakeRole(PING_ROLE_ID)}
+
+        def get_channel(self, channel_id: int):
+            if channel_id == APPEALS_FORUM_ID:
+                return self.forum
+            if channel_id == LOG_CHANNEL_ID:
+                return self.log_channel
+            if channel_id == OPEN_TICKET_CHANNEL_ID:
+                return self.open_channel
+            return self.forum.created_threads.get(channel_id)
+
+        def get_role(self, role_id: int):
+            return self.roles.get(role_id)
+
+    class FakeUser:
+        def __init__(self, user_id: int, administrator: bool = False):
+            self.id = user_id
+            self.name = f"user{user_id - FIRST_USER_ID}"
+            self.mention = f"<@{user_id}>"
+            self.guild_permissions = SimpleNamespace(administrator=administrator)
+
+        def get_role(self, role_id: int):
+            return None
+
+        async def send(self, content=None, embed=None, **kwargs):
+            await api.call("dm.send")
+
+    class FakeResponse:
+        def __init__(self):
+            self.done_at = None
+            self.modal = None
+            self.message = None
+
+        def is_done(self) -> bool:
+            return self.done_at is not None
+
+        async def _respond(self, route: str):
+            await api.call(route)
+            self.done_at = time.perf_counter()
+
+        async def send_modal(self, modal):
+            self.modal = modal
+            await self._respond("interaction.send_modal")
+
+        async def defer(self, **kwargs):
+            await self._respond("interaction.defer")
+
+        async def send_message(self, content=None, **kwargs):
+            self.message = content
+            await self._respond("interaction.send_message")
+
+    class FakeFollowup:
+        def __init__(self):
+            self.sent_at = None
+            self.message = None
+
+        async def send(self, content=None, **kwargs):
+            await api.call("interaction.followup")
+            self.message = content
+            self.sent_at = time.perf_counter()
+
+    class FakeInteraction:
+        def __init__(self, client, interaction_id: int, user, guild, channel=None, message=None, custom_id=None):
+            self.id = interaction_id
+            self.client = client
+            self.user = user
+            self.guild = guild
+            self.guild_id = guild.id
+            self.channel = channel
+            self.channel_id = channel.id if channel else None
+            self.message = message
+            self.data = {"custom_id": custom_id} if custom_id else {}
+            self.response = FakeResponse()
+            self.followup = FakeFollowup()
+            self.original_response_embed = None
+
+        async def edit_original_response(self, embed=None, **kwargs):
+            await api.call("interaction.edit_original_response")
+            self.original_response_embed = embed
+
+    return SimpleNamespace(Guild=FakeGuild, User=FakeUser, Interaction=FakeInteraction)
+
+
+def snowflakes(discord):
+    """Eindeutige Interaktions-IDs mit aktuellem Zeitstempel, wie sie Discord vergibt (für die Latenz-Metriken)."""
+    sequence = 0
+    while True:
+        sequence = (sequence + 1) % (1 << 22)
+        yield discord.utils.time_snowflake(datetime.datetime.now(datetime.timezone.utc)) + sequence
+
+
+class LoopLagMonitor:
+    """Misst, wie viel später als geplant ein kurzer Timer im Event-Loop aufwacht."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+async def run_benchmark(args, bot, fakes, api: FakeRestApi) -> dict:
+    client = bot.client
+
+    async def skip_sync():
+        pass
+    client.sync_commands = skip_sync # Kein tree.sync ohne Verbindung
+
+    guild = fakes.Guild()
+    users = {}
+    client.get_channel = guild.get_channel
+    client.get_guild = {GUILD_ID: guild}.get
+    client.get_user = users.get
+    await client.setup_hook()
+    await asyncio.gather(*client._startup_tasks) # Kategorien laden wie sonst während des Verbindungsaufbaus
+
+    panel_view = client.panel_view
+    actions = client.ticket_actions
+    categories = list(client.get_category_registry(GUILD_ID))
+    if not categories:
+        raise SystemExit("FEHLER: Keine Ticket-Kategorien geladen.")
+    moderator = fakes.User(FIRST_USER_ID - 1, administrator=True)
+    answer = ("Lasttest " * (args.answer_length // 9 + 1))[:args.answer_length]
+    interaction_ids = snowflakes(bot.discord)
+
+    results = {"ack": [], "followup": [], "close": [], "close_done": [], "errors": 0, "throttled": 0, "deduplicated": 0}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def submit_ticket(user, category):
+        click = fakes.Interaction(client, next(interaction_ids), user, guild, channel=guild.open_channel,
+                                  custom_id=category.button_custom_id)
+        await panel_view.category_button_callback(click)
+        modal = click.response.modal
+        if modal is None: # Durch die Ticket-Limits abgelehnt
+            results["throttled"] += 1
+            return
+        for item in modal.children:
+            item._value = answer
+
+        submit = fakes.Interaction(client, next(interaction_ids), user, guild, channel=guild.open_channel)
+        started = time.perf_counter()
+        await modal.on_submit(submit)
+        if submit.followup.sent_at is not None and "bereits ein offenes Ticket" in submit.followup.message:
+            results["deduplicated"] += 1
+            return
+        if submit.followup.sent_at is None or "erfolgreich erstellt" not in submit.followup.message:
+            results["errors"] += 1
+            return
+        results["ack"].append(submit.response.done_at - started)
+        results["followup"].append(submit.followup.sent_at - started)
+
+    async def open_ticket(index: int):
+        async with semaphore:
+            user = fakes.User(FIRST_USER_ID + index)
+            users[user.id] = user
+            category = categories[index % len(categories)]
+            # Mit --resubmits sendet derselbe Benutzer das Ticket mehrfach gleichzeitig ab (Doppelklick unter Lag)
+            await asyncio.gather(*(submit_ticket(user, category) for _ in range(1 + args.resubmits)))
+
+    async def close_ticket(thread):
+        async with semaphore:
+            message = thread.messages[0]
+            click = fakes.Interaction(client, next(interaction_ids), moderator, guild, channel=thread, message=message)
+            await actions.close_button_callback(click)
+            modal = click.response.modal
+            modal.reason_input._value = "Lasttest"
+            submit = fakes.Interaction(client, next(interaction_ids), moderator, guild, channel=thread, message=message)
+            started = time.perf_counter()
+            await modal.on_submit(submit)
+            # Fehler im kritischen Pfad werden per Followup gemeldet
+            if not submit.response.is_done() or submit.followup.message is not None:
+                results["errors"] += 1
+                return
+            results["close"].append(submit.response.done_at - started)
+            results["close_done"].append(time.perf_counter() - started)
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    open_started = time.perf_counter()
+    await asyncio.gather(*(open_ticket(i) for i in range(args.tickets)))
+    open_elapsed = time.perf_counter() - open_started
+
+    close_elapsed = 0.0
+    if args.close:
+        close_started = time.perf_counter()
+        if args.bulk_close:
+            # Ein Befehl statt eines Modals pro Ticket; Fortschritt und Zusammenfassung stehen in der Antwort
+            command = fakes.Interaction(client, next(interaction_ids), moderator, guild, channel=guild.open_channel)
+            await bot.tickets_bulk_close_command.callback(command, name_prefix="[Offen]", reason="Lasttest", confirm=True)
+            summary = command.original_response_embed
+            results["bulk_summary"] = summary.fields[0].value if summary else "keine Antwort"
+        else:
+            await asyncio.gather(*(close_ticket(thread) for thread in list(guild.forum.created_threads.values())))
+        close_elapsed = time.perf_counter() - close_started
+
+    await client.background_tasks.stop(timeout=600) # DMs und Transkripte abwarten
+    await client.audit_log.stop() # Restliche Log-Einträge senden
+    await client.ticket_events.stop() # Ticket-Ereignisse für die Statistiken schreiben
+    await monitor.stop()
+    client.ticket_store.close()
+
+    report = {
+        "parameters": {
+            "tickets": args.tickets, "concurrency": args.concurrency, "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms, "rate_429": args.rate_429, "retry_after_ms": args.retry_after_ms,
+            "close": args.close, "throttle": args.throttle, "resubmits": args.resubmits, "rest_rate": args.rest_rate,
+            "single_lane": args.single_lane, "bulk_close": args.bulk_close,
+        },
+        "open": {
+            "elapsed_s": round(open_elapsed, 3),
+            "throughput_per_s": round(len(results["followup"]) / open_elapsed, 1) if open_elapsed else 0.0,
+            "ack": summarize(results["ack"]),
+            "followup": summarize(results["followup"]),
+        },
+        "errors": results["errors"],
+        "throttled": results["throttled"],
+        "throttle": client.ticket_throttle.stats(),
+        "deduplicated": results["deduplicated"],
+        "threads_created": len(guild.forum.created_threads),
+        "loop_lag": summarize(monitor.samples),
+        "rest_calls": dict(sorted(api.calls.items())),
+        "rate_limited": dict(sorted(api.rate_limited.items())),
+        "rest_scheduler": {key: value for key, value in client.rest.stats().items() if key != "routes"},
+        "audit_log": client.audit_log.stats(),
+        "logging": bot.log_pipeline.stats(),
+        "background_tasks": client.background_tasks.stats(),
+        "ticket_events": {"written": client.ticket_events.written, "failed": client.ticket_events.failed},
+    }
+    if args.close:
+        report["close"] = {
+            "elapsed_s": round(close_elapsed, 3),
+            "throughput_per_s": round(len(results["close"]) / close_elapsed, 1) if close_elapsed else 0.0,
+            "response": summarize(results["close"]),
+            "archived": summarize(results["close_done"]),
+        }
+        if args.bulk_close:
+            report["close"]["bulk_summary"] = results["bulk_summary"]
+    return report
+
+
+def print_report(report: dict):
+    p = report["parameters"]
+    print(f"Lasttest: {p['tickets']} Tickets, {p['concurrency']} gleichzeitig, Latenz {p['latency_ms']}±{p['jitter_ms']} ms, "
+          f"429-Rate {p['rate_429']:.1%} (retry_after {p['retry_after_ms']} ms)")
+
+    def line(name, stats):
+        print(f"  {name:<28} p50 {stats['p50_ms']:>9.2f} ms   p99 {stats['p99_ms']:>9.2f} ms   max {stats['max_ms']:>9.2f} ms   (n={stats['count']})")
+
+    print(f"Ticket-Erstellung: {report['open']['elapsed_s']} s, {report['open']['throughput_per_s']} Tickets/s")
+    line("Modal -> Bestätigung", report["open"]["ack"])
+    line("Modal -> Followup", report["open"]["followup"])
+    if "close" in report:
+        if "bulk_summary" in report["close"]:
+            print(f"Ticket-Schließung mit /tickets bulk_close: {report['close']['elapsed_s']} s – {report['close']['bulk_summary']}")
+        else:
+            print(f"Ticket-Schließung: {report['close']['elapsed_s']} s, {report['close']['throughput_per_s']} Tickets/s")
+            line("Modal -> Antwort", report["close"]["response"])
+            line("Modal -> Thread archiviert", report["close"]["archived"])
+    line("Event-Loop-Verzögerung", report["loop_lag"])
+    print(f"Fehler: {report['errors']}, durch Ticket-Limits abgelehnt: {report['throttled']}, "
+          f"doppelte Absendungen abgefangen: {report['deduplicated']}, Threads erstellt: {report['threads_created']}")
+    print("REST-Aufrufe: " + ", ".join(f"{route}={count}" for route, count in report["rest_calls"].items()))
+    if report["rate_limited"]:
+        print("Davon 429: " + ", ".join(f"{route}={count}" for route, count in report["rate_limited"].items()))
+    print(f"REST-Scheduler: {report['rest_scheduler']}")
+    print(f"Log-Pipeline: {report['audit_log']}")
+    print(f"Logging: {report['logging']}")
+    print(f"Hintergrundaufgaben: {report['background_tasks']}")
+    print(f"Ticket-Ereignisse: {report['ticket_events']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Lasttest für Ticket-Erstellung und -Schließung.")
+    parser.add_argument("--tickets", type=int, default=500, help="Anzahl der zu eröffnenden Tickets (Standard: 500)")
+    parser.add_argument("--concurrency", type=int, default=100, help="Gleichzeitige Ticket-Eröffnungen (Standard: 100)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mittlere REST-Latenz in ms (Standard: 50)")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Standardabweichung der Latenz in ms (Standard: 10)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Anteil der REST-Aufrufe mit 429-Antwort, z.B. 0.02")
+    parser.add_argument("--retry-after-ms", type=float, default=1000.0, help="Wartezeit nach einem 429 in ms (Standard: 1000)")
+    parser.add_argument("--answer-length", type=int, default=200, help="Länge jeder Modal-Antwort in Zeichen (Standard: 200)")
+    parser.add_argument("--close", action="store_true", help="Alle Tickets anschließend auch schließen")
+    parser.add_argument("--bulk-close", action="store_true", help="Mit --close: alle Tickets mit einem /tickets bulk_close schließen statt per Modal")
+    parser.add_argument("--resubmits", type=int, default=0, help="Zusätzliche gleichzeitige Absendungen pro Ticket (Standard: 0)")
+    parser.add_argument("--history", type=int, default=20, help="Zusätzliche Nachrichten pro Thread für das Transkript (Standard: 20)")
+    parser.add_argument("--throttle", action="store_true", help="Ticket-Limits aus der Standard-Konfiguration anwenden (Standard: aus)")
+    parser.add_argument("--rest-rate", type=float, default=0.0,
+                        help="REST-Aufrufe mit dem Bot-Token pro Sekunde im Scheduler des Bots (Standard: 0 = unbegrenzt, der Stub hat kein globales Limit; der Bot verwendet 40)")
+    parser.add_argument("--single-lane", action="store_true",
+                        help="Zum Vergleich alle REST-Aufrufe in einer Spur (Logs, DMs, Transkripte ohne Vorrang der Interaktionen)")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert für Latenz und 429-Auswahl")
+    parser.add_argument("--metrics", action="store_true", help="Zusätzlich die Prometheus-Metriken des Bots ausgeben")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    parser.add_argument("--verbose", action="store_true", help="Ausgaben von bot.py nicht unterdrücken")
+    args = parser.parse_args()
+
+    # bot.py liest seine Konfiguration beim Import; alle Dateien landen in einem temporären Verzeichnis
+    workdir = tempfile.mkdtemp(prefix="ticket-loadtest-")
+    shutil.copy(os.path.join(REPO_ROOT, "ticket_categories.json.example"), os.path.join(workdir, "ticket_categories.json"))
+    os.chdir(workdir)
+    os.environ.update({
+        "OPEN_TICKET_CHANNEL_ID": str(OPEN_TICKET_CHANNEL_ID),
+        "APPEALS_FORUM_ID": str(APPEALS_FORUM_ID),
+        "TICKET_LOG_CHANNEL_ID": str(LOG_CHANNEL_ID),
+        "ADMIN_MOD_PING_ROLE_ID": str(PING_ROLE_ID),
+        "TICKET_CLOSER_ROLE_ID": "",
+        "TICKET_DB_PATH": os.path.join(workdir, "tickets.db"),
+        "GUILD_CONFIG_PATH": os.path.join(workdir, "guild_configs.json"),
+        "COMMAND_SYNC_STATE_PATH": os.path.join(workdir, "command_sync.json"),
+        "TICKET_TRANSCRIPT_DIR": os.path.join(workdir, "transcripts"),
+        "TICKET_EVENTS_DIR": os.path.join(workdir, "ticket_events"),
+        "TICKET_CATEGORIES_WATCH": "",
+        "REST_RATE": str(args.rest_rate),
+        "SHARD_COUNT": "",
+        "SHARD_IDS": "",
+    })
+    if not args.throttle:
+        os.environ.update({"TICKET_USER_RATE": "0", "TICKET_CATEGORY_RATE": "0", "TICKET_GUILD_RATE": "0",
+                           "TICKET_MAX_OPEN_PER_USER": "0"})
+    else:
+        for name in ("TICKET_USER_RATE", "TICKET_CATEGORY_RATE", "TICKET_GUILD_RATE", "TICKET_MAX_OPEN_PER_USER"):
+            os.environ.pop(name, None)
+    sys.path.insert(0, REPO_ROOT)
+    # Das Logging von bot.py bindet beim Import stdout; ohne --verbose schreibt der Listener-Thread nach /dev/null,
+    # Queue, Formatierung und Schreiben zählen also weiter zur gemessenen Last
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+    with output:
+        import discord
+        import bot
+
+    api = FakeRestApi(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, rate_429=args.rate_429,
+                      retry_after=args.retry_after_ms / 1000, seed=args.seed)
+    api.scheduler = bot.client.rest
+    if args.single_lane:
+        bot.rest_scheduler.background = lambda: None # Hintergrundarbeit bleibt in der hohen Spur
+    tag_names = [category["forum_tag_name"] for category in bot.read_ticket_categories("ticket_categories.json")]
+    fakes = build_fakes(discord, api, tag_names, args.history)
+    try:
+        report = asyncio.run(run_benchmark(args, bot, fakes, api))
+    finally:
+        bot.log_pipeline.stop()
+        devnull.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.metrics:
+        print(bot.metrics.REGISTRY.render(), end="")
+
+
+if __name__ == "__main__":
+    main()
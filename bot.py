@@ -1,19 +1,116 @@
+# Als Erstes importieren: die Messung der Startzeit beginnt mit diesem Import
+from startup_profile import PROFILE as STARTUP_PROFILE
 import discord
 from discord import app_commands, ForumChannel, TextStyle, Embed
 from discord.ui import Button, View, Modal, TextInput
+import io
 import os
+import sys
+import time
+import asyncio
 from dotenv import load_dotenv
 import datetime
+import logging
+import math
+import metrics
+import rest_scheduler
+import structured_log
+from audit_log import AuditLogWriter, guild_log_channel
+from bulk_actions import RESULT_DONE, RESULT_SKIPPED, BulkProgress, BulkSelection, run_bulk, select_tickets
+from category_registry import CategoryRegistry, categories_file_path
+from command_sync import CommandSyncState
+from creation_guard import CreationGuard
+from evidence import EvidenceRejected, EvidenceStore, parse_allowed_types
+from guild_config import GuildConfig, GuildConfigStore
+from rest_scheduler import RestScheduler
+from shared_state import CLAIM_LOCK_TTL_SECONDS, CLOSE_LOCK_TTL_SECONDS, SharedStateError, claim_lock, close_lock, create_shared_state
+from resolved_config import ResolvedConfigCache, parse_id_list, parse_optional_id
+from sla_scheduler import SlaScheduler, KIND_IDLE, KIND_UNCLAIMED
+from task_supervisor import TaskSupervisor
+from throttle import RateLimit, TicketThrottle
+from ticket_analytics import EVENT_CLAIMED, EVENT_CLOSED, EVENT_CREATED, GROUPS, TicketEventLog, compute_stats, format_row, group_rows, load_events
+from ticket_log import TicketLog
+from ticket_queue import NAV_NEXT, NAV_PREVIOUS, NAV_REFRESH, QUEUE_MINE, QUEUE_OPEN, QUEUE_UNCLAIMED, QueueQuery, query_tickets, render_page
+from ticket_reconciler import TicketReconciler
+from ticket_store import TicketStore, TicketRecord, STATUS_OPEN, STATUS_CLAIMED, STATUS_CLOSED
+from transcript import TranscriptExporter
+STARTUP_PROFILE.mark("import")
 
 # Lade Umgebungsvariablen aus der .env Datei
 load_dotenv()
+# Strukturiertes Logging zuerst einrichten, damit auch Warnungen beim Lesen der Konfiguration erfasst werden
+log_pipeline = structured_log.setup_logging_from_env()
+log = logging.getLogger("bot")
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
-OPEN_TICKET_CHANNEL_ID = int(os.getenv("OPEN_TICKET_CHANNEL_ID"))
-APPEALS_FORUM_ID = int(os.getenv("APPEALS_FORUM_ID"))
+# Die folgenden IDs sind die Standard-Konfiguration für Server ohne eigenen Eintrag in guild_configs.json
+OPEN_TICKET_CHANNEL_ID = parse_optional_id(os.getenv("OPEN_TICKET_CHANNEL_ID"), "OPEN_TICKET_CHANNEL_ID")
+APPEALS_FORUM_ID = parse_optional_id(os.getenv("APPEALS_FORUM_ID"), "APPEALS_FORUM_ID")
 ADMIN_MOD_ROLE_ID = os.getenv("ADMIN_MOD_ROLE_ID")
 TICKET_LOG_CHANNEL_ID = os.getenv("TICKET_LOG_CHANNEL_ID")
+# Optional: Größe der Log-Queue und maximale Wartezeit (Sekunden), bevor gesammelte Log-Einträge gesendet werden
+TICKET_LOG_QUEUE_SIZE = int(os.getenv("TICKET_LOG_QUEUE_SIZE", "1000"))
+TICKET_LOG_FLUSH_INTERVAL = float(os.getenv("TICKET_LOG_FLUSH_INTERVAL", "2.0"))
 # Optional: Rollen-ID, die Threads schließen darf (zusätzlich zu Admins/Moderatoren mit Kanalrechten)
 TICKET_CLOSER_ROLE_ID = os.getenv("TICKET_CLOSER_ROLE_ID")
+# Optional: Rolle, die bei neuen Tickets erwähnt wird (einmalig beim Start geparst)
+ADMIN_MOD_PING_ROLE_ID = parse_optional_id(os.getenv("ADMIN_MOD_PING_ROLE_ID"), "ADMIN_MOD_PING_ROLE_ID")
+# Optional: Pfad der lokalen Ticket-Datenbank (SQLite)
+TICKET_DB_PATH = os.getenv("TICKET_DB_PATH", "tickets.db")
+# Optional: Pfad der Guild-Konfigurationen (mehrere Server in einem Prozess)
+GUILD_CONFIG_PATH = os.getenv("GUILD_CONFIG_PATH", "guild_configs.json")
+DEFAULT_CATEGORIES_FILE = "ticket_categories.json"
+# Optional: Verzeichnis, aus dem Server-Admins mit /ticket_config eigene Kategorien-Dateien wählen können
+TICKET_CATEGORIES_DIR = os.getenv("TICKET_CATEGORIES_DIR", "ticket_categories")
+# Optional: Kategorien-Dateien auf Änderungen überwachen und automatisch neu laden (Prüfintervall in Sekunden)
+TICKET_CATEGORIES_WATCH = os.getenv("TICKET_CATEGORIES_WATCH", "").lower() in ("1", "true", "yes")
+TICKET_CATEGORIES_WATCH_INTERVAL = float(os.getenv("TICKET_CATEGORIES_WATCH_INTERVAL", "5"))
+# Optional: Slash-Befehle nur in diese Guilds synchronisieren (komma-separiert, sofort sichtbar) statt global
+SYNC_GUILD_IDS = sorted(parse_id_list(os.getenv("SYNC_GUILD_IDS"), "SYNC_GUILD_IDS"))
+# Optional: Datei mit den Hashes der zuletzt synchronisierten Befehlsbäume
+COMMAND_SYNC_STATE_PATH = os.getenv("COMMAND_SYNC_STATE_PATH", "command_sync.json")
+# Optional: Sharding. SHARD_COUNT=auto lässt Discord die Anzahl bestimmen, SHARD_COUNT=N mit SHARD_IDS=0,1,...
+# startet nur die angegebenen Shards (wird vom launcher.py pro Worker-Prozess gesetzt). Ohne Angabe: eine Verbindung.
+SHARD_COUNT = os.getenv("SHARD_COUNT", "").strip().lower()
+SHARD_IDS = sorted(parse_id_list(os.getenv("SHARD_IDS"), "SHARD_IDS"))
+# Optional: Begrenzung der Ticket-Erstellung im Format "Anzahl/Sekunden" ("0" schaltet eine Grenze ab)
+# pro Benutzer, pro Kategorie einer Guild und pro Guild, sowie die Höchstzahl offener Tickets pro Benutzer (0 = unbegrenzt)
+TICKET_USER_RATE = RateLimit.parse(os.getenv("TICKET_USER_RATE"), "TICKET_USER_RATE", RateLimit(3, 600))
+TICKET_CATEGORY_RATE = RateLimit.parse(os.getenv("TICKET_CATEGORY_RATE"), "TICKET_CATEGORY_RATE", RateLimit(20, 60))
+TICKET_GUILD_RATE = RateLimit.parse(os.getenv("TICKET_GUILD_RATE"), "TICKET_GUILD_RATE", RateLimit(40, 60))
+TICKET_MAX_OPEN_PER_USER = int(os.getenv("TICKET_MAX_OPEN_PER_USER", "3"))
+# Optional: Transkript beim Schließen exportieren (html, jsonl oder off) und Verzeichnis des lokalen Transkript-Archivs
+TICKET_TRANSCRIPT_FORMAT = os.getenv("TICKET_TRANSCRIPT_FORMAT", "html").strip().lower()
+TICKET_TRANSCRIPT_DIR = os.getenv("TICKET_TRANSCRIPT_DIR", "transcripts")
+# Optional: Prometheus-Metriken unter http://METRICS_HOST:METRICS_PORT/metrics (ohne METRICS_PORT deaktiviert).
+# Mit launcher.py erhält jeder Worker-Prozess den Port METRICS_PORT + CLUSTER_ID.
+METRICS_PORT = parse_optional_id(os.getenv("METRICS_PORT"), "METRICS_PORT")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Optional: Ping der Ping-Rolle, wenn ein Ticket nach so vielen Minuten nicht geclaimed wurde (0 = aus), und automatisches
+# Schließen nach so vielen Stunden ohne Nachricht eines Benutzers (0 = aus)
+TICKET_SLA_UNCLAIMED_MINUTES = float(os.getenv("TICKET_SLA_UNCLAIMED_MINUTES", "60"))
+TICKET_IDLE_CLOSE_HOURS = float(os.getenv("TICKET_IDLE_CLOSE_HOURS", "0"))
+# Abgleich der Forum-Threads nach dem Start: REST-Aufrufe pro Sekunde (0 = kein Abgleich)
+TICKET_RECONCILE_RATE = float(os.getenv("TICKET_RECONCILE_RATE", "2"))
+# REST-Scheduler: Anfragen mit dem Bot-Token pro Sekunde (unter dem globalen Limit von 50/s, bei mehreren Prozessen
+# aufteilen; 0 = ohne Begrenzung) und gleichzeitige Anfragen der niedrigen Spur (Logs, DMs, Transkripte)
+REST_RATE = float(os.getenv("REST_RATE", "40"))
+REST_LOW_CONCURRENCY = max(1, int(os.getenv("REST_LOW_CONCURRENCY", "4")))
+# Ticket-Ereignisse (Erstellen, Claim, Schließen) als Spalten-Dateien für /ticket_stats und ticket_analytics.py (leer = aus)
+TICKET_EVENTS_DIR = os.getenv("TICKET_EVENTS_DIR", "ticket_events").strip()
+# Geteilter Zustand mehrerer Instanzen (Claim-Sperren, offene Tickets, Kategorien): leer = nur im Prozess, sonst redis://...
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "").strip()
+SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "ticketbot:")
+# Abstand (Sekunden), in dem auf neue Kategorien einer anderen Instanz geprüft wird (nur mit SHARED_STATE_URL)
+SHARED_STATE_CATEGORIES_INTERVAL = float(os.getenv("SHARED_STATE_CATEGORIES_INTERVAL", "10"))
+# Massenaktionen (/tickets bulk_*): gleichzeitig bearbeitete Tickets und Abstand der Fortschrittsmeldungen (Sekunden)
+BULK_CONCURRENCY = max(1, int(os.getenv("BULK_CONCURRENCY", "5")))
+BULK_PROGRESS_INTERVAL = float(os.getenv("BULK_PROGRESS_INTERVAL", "5"))
+# Nachweise (Dateien, die Benutzer im Ticket-Thread hochladen): Archiv-Verzeichnis (leer = aus), Größe pro Datei in MB,
+# Höchstzahl pro Ticket und erlaubte Typen (Content-Type-Präfixe wie "image/", Content-Types oder Endungen wie ".log")
+TICKET_EVIDENCE_DIR = os.getenv("TICKET_EVIDENCE_DIR", "evidence").strip()
+TICKET_EVIDENCE_MAX_MB = float(os.getenv("TICKET_EVIDENCE_MAX_MB", "8"))
+TICKET_EVIDENCE_MAX_FILES = int(os.getenv("TICKET_EVIDENCE_MAX_FILES", "20"))
+TICKET_EVIDENCE_TYPES = parse_allowed_types(os.getenv("TICKET_EVIDENCE_TYPES"))
 
 
 # Intents für den Bot definieren
@@ -22,77 +119,582 @@ intents.message_content = True
 intents.guilds = True
 intents.members = True # Wichtig für User-Info und DM
 
-import json
+# Optional: Startzeiten pro Phase loggen (auch mit --profile-startup)
+STARTUP_PROFILE.enabled = os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "yes") or "--profile-startup" in sys.argv[1:]
+STARTUP_PROFILE.mark("config")
 
-# Globale Variable für geladene Ticket-Kategorien
-TICKET_CATEGORIES = []
+import json
 
-def load_ticket_categories():
-    """Lädt Ticket-Kategorien aus ticket_categories.json."""
-    global TICKET_CATEGORIES
-    try:
-        with open("ticket_categories.json", "r", encoding="utf-8") as f:
+def read_ticket_categories(path: str = DEFAULT_CATEGORIES_FILE) -> list:
+    """Liest und validiert Ticket-Kategorien aus einer JSON-Datei. Wirft ValueError (bzw. OSError) bei Fehlern."""
+    with open(path, "r", encoding="utf-8") as f:
+        try:
             categories = json.load(f)
-        # Grundlegende Validierung (kann erweitert werden)
-        if not isinstance(categories, list):
-            print("FEHLER: ticket_categories.json ist keine Liste.")
-            TICKET_CATEGORIES = []
-            return False
-        for cat in categories:
-            if not all(k in cat for k in ["category_id", "button_label", "button_custom_id", "button_style", "forum_tag_name", "modal_title", "modal_custom_id_prefix", "modal_questions"]):
-                print(f"FEHLER: Kategorie {cat.get('category_id', 'Unbekannt')} in ticket_categories.json fehlen notwendige Schlüssel.")
-                TICKET_CATEGORIES = [] # Bei Fehler keine Kategorien laden, um inkonsistenten Zustand zu vermeiden
-                return False
-            if not isinstance(cat["modal_questions"], list):
-                print(f"FEHLER: 'modal_questions' in Kategorie {cat['category_id']} ist keine Liste.")
-                TICKET_CATEGORIES = []
-                return False
-            for q_idx, q in enumerate(cat["modal_questions"]):
-                 if not all(k_q in q for k_q in ["id", "label", "style", "required"]):
-                    print(f"FEHLER: Frage {q_idx} in Kategorie {cat['category_id']} fehlen notwendige Schlüssel (id, label, style, required).")
-                    TICKET_CATEGORIES = []
-                    return False
-        TICKET_CATEGORIES = categories
-        print(f"{len(TICKET_CATEGORIES)} Ticket-Kategorien erfolgreich aus ticket_categories.json geladen.")
-        return True
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path} ist nicht valides JSON: {e}")
+    # Grundlegende Validierung (kann erweitert werden)
+    if not isinstance(categories, list):
+        raise ValueError(f"{path} ist keine Liste.")
+    seen_ids, seen_custom_ids = set(), set()
+    for cat in categories:
+        if not all(k in cat for k in ["category_id", "button_label", "button_custom_id", "button_style", "forum_tag_name", "modal_title", "modal_custom_id_prefix", "modal_questions"]):
+            raise ValueError(f"Kategorie {cat.get('category_id', 'Unbekannt')} in {path} fehlen notwendige Schlüssel.")
+        if not isinstance(cat["modal_questions"], list):
+            raise ValueError(f"'modal_questions' in Kategorie {cat['category_id']} ist keine Liste.")
+        for q_idx, q in enumerate(cat["modal_questions"]):
+             if not all(k_q in q for k_q in ["id", "label", "style", "required"]):
+                raise ValueError(f"Frage {q_idx} in Kategorie {cat['category_id']} fehlen notwendige Schlüssel (id, label, style, required).")
+             if "max_length" in q and not (isinstance(q["max_length"], int) and 1 <= q["max_length"] <= 4000):
+                raise ValueError(f"Frage {q_idx} in Kategorie {cat['category_id']}: max_length muss zwischen 1 und 4000 liegen.")
+        if cat["category_id"] in seen_ids or cat["button_custom_id"] in seen_custom_ids:
+            raise ValueError(f"Kategorie {cat['category_id']} in {path} verwendet eine bereits vergebene category_id oder button_custom_id.")
+        seen_ids.add(cat["category_id"])
+        seen_custom_ids.add(cat["button_custom_id"])
+    return categories
+
+def load_ticket_categories(path: str = DEFAULT_CATEGORIES_FILE) -> list:
+    """Lädt Ticket-Kategorien aus einer JSON-Datei (Standard: ticket_categories.json). Bei Fehlern wird eine leere Liste geliefert."""
+    try:
+        categories = read_ticket_categories(path)
+        log.info("%d Ticket-Kategorien erfolgreich aus %s geladen.", len(categories), path)
+        return categories
     except FileNotFoundError:
-        print("WARNUNG: ticket_categories.json nicht gefunden. Das Ticket-Panel wird keine Optionen anzeigen.")
-        TICKET_CATEGORIES = []
-        return False # Datei nicht gefunden, aber kein harter Fehler für den Bot-Start unbedingt
-    except json.JSONDecodeError as e:
-        print(f"FEHLER: ticket_categories.json ist nicht valides JSON: {e}")
-        TICKET_CATEGORIES = []
-        return False
+        log.warning("%s nicht gefunden. Das Ticket-Panel wird keine Optionen anzeigen.", path)
+        return [] # Datei nicht gefunden, aber kein harter Fehler für den Bot-Start unbedingt
+    except ValueError as e:
+        log.error("%s", e)
+        return [] # Bei Fehler keine Kategorien laden, um inkonsistenten Zustand zu vermeiden
     except Exception as e:
-        print(f"FEHLER: Unerwarteter Fehler beim Laden von ticket_categories.json: {e}")
-        TICKET_CATEGORIES = []
-        return False
+        log.exception("Unerwarteter Fehler beim Laden von %s: %s", path, e)
+        return []
 
 # Client-Instanz erstellen
-class TicketBotClient(discord.Client):
-    def __init__(self, *, intents: discord.Intents):
-        super().__init__(intents=intents)
+def get_shard_settings():
+    """Liefert (shard_count, shard_ids) für den AutoShardedClient aus SHARD_COUNT/SHARD_IDS."""
+    if SHARD_COUNT == "auto":
+        return None, None # Discord empfiehlt die Anzahl, alle Shards in diesem Prozess
+    if not SHARD_COUNT:
+        return 1, None # Eine einzelne Gateway-Verbindung wie bisher
+    try:
+        shard_count = int(SHARD_COUNT)
+    except ValueError:
+        log.warning("SHARD_COUNT ('%s') ist keine gültige Zahl. Starte mit einer Verbindung.", SHARD_COUNT)
+        return 1, None
+    shard_ids = [shard_id for shard_id in SHARD_IDS if shard_id < shard_count] or None
+    if SHARD_IDS and shard_ids != SHARD_IDS:
+        log.warning("SHARD_IDS %s enthält IDs >= SHARD_COUNT (%d), diese werden ignoriert.", SHARD_IDS, shard_count)
+    return shard_count, shard_ids
+
+
+class TicketBotClient(discord.AutoShardedClient):
+    def __init__(self, *, intents: discord.Intents, shard_count: int = 1, shard_ids: list = None):
+        # Alle REST-Aufrufe in zwei Spuren: Interaktionen zuerst, Logs/DMs/Transkripte warten bei Lastspitzen.
+        # http_trace zählt 429-Antworten direkt an der HTTP-Antwort
+        rest = RestScheduler(REST_RATE, REST_LOW_CONCURRENCY)
+        super().__init__(intents=intents, shard_count=shard_count, shard_ids=shard_ids, http_trace=rest.http_trace)
+        self.rest = rest
+        self.rest.install(self.http)
         self.tree = app_commands.CommandTree(self)
-        self.ticket_categories = [] # Wird in setup_hook geladen
+        # Konfiguration pro Guild; Guilds ohne eigenen Eintrag nutzen die Werte aus der .env
+        self.guild_configs = GuildConfigStore(
+            default=GuildConfig(
+                guild_id=None,
+                open_ticket_channel_id=OPEN_TICKET_CHANNEL_ID,
+                appeals_forum_id=APPEALS_FORUM_ID,
+                log_channel_id=parse_optional_id(TICKET_LOG_CHANNEL_ID, "TICKET_LOG_CHANNEL_ID"),
+                ping_role_id=ADMIN_MOD_PING_ROLE_ID,
+                closer_role_ids=parse_id_list(TICKET_CLOSER_ROLE_ID, "TICKET_CLOSER_ROLE_ID"),
+            ),
+            path=GUILD_CONFIG_PATH
+        )
+        # Kompilierte Kategorien pro Kategorien-Datei (mehrere Guilds können dieselbe Datei nutzen), werden in setup_hook geladen
+        self.category_registries = {}
+        self.panel_view = None # Persistente Panel-View, siehe register_panel_view
+        self._reload_lock = asyncio.Lock()
+        self._categories_mtimes = {}
+        self._watch_task = None
+        self.force_sync = False # Wird mit --force-sync gesetzt
+        # Ticket-Zustand (Ersteller, Kategorie, Status, Claimer, Zeitstempel), indiziert nach Thread-ID
+        self.ticket_store = TicketStore(TICKET_DB_PATH)
+        # Verhindert doppelte Threads bei mehrfachem Absenden desselben Tickets
+        self.creation_guard = CreationGuard(self.ticket_store)
+        # Transkripte geschlossener Tickets (None = deaktiviert)
+        self.transcripts = TranscriptExporter(TICKET_TRANSCRIPT_DIR, TICKET_TRANSCRIPT_FORMAT) if TICKET_TRANSCRIPT_FORMAT != "off" else None
+        # Nachweise aus den Ticket-Threads (None = deaktiviert)
+        self.evidence = EvidenceStore(TICKET_EVIDENCE_DIR, int(TICKET_EVIDENCE_MAX_MB * 1024 * 1024), TICKET_EVIDENCE_TYPES) if TICKET_EVIDENCE_DIR else None
+        # Nebenwirkungen wie DMs laufen als überwachte Hintergrund-Tasks mit Wiederholungen
+        self.background_tasks = TaskSupervisor()
+        # Log-Nachrichten werden gebündelt im Hintergrund gesendet
+        self.audit_log = AuditLogWriter(self, max_queue_size=TICKET_LOG_QUEUE_SIZE, flush_interval=TICKET_LOG_FLUSH_INTERVAL)
+        self.ticket_log = TicketLog(self.guild_configs, self.audit_log)
+        self.ticket_actions = None # Claim/Close für alle Tickets, wird in setup_hook erzeugt
+        # Aufgelöste Forum-Tags und Rollen pro Guild, invalidiert durch Gateway-Events
+        self.resolved_config = ResolvedConfigCache(self.guild_configs)
+        self.metrics_server = None
+        # Begrenzung der Ticket-Erstellung (Token-Buckets im Speicher), wird vor dem Anzeigen des Modals geprüft
+        self.ticket_throttle = TicketThrottle(TICKET_USER_RATE, TICKET_CATEGORY_RATE, TICKET_GUILD_RATE, TICKET_MAX_OPEN_PER_USER)
+        # Fristen pro Ticket (Ping bei ungeclaimten Tickets, automatisches Schließen), gespeichert in der Ticket-Datenbank
+        self.sla = SlaScheduler(self.ticket_store, {KIND_UNCLAIMED: self._on_unclaimed_deadline, KIND_IDLE: self._on_idle_deadline})
+        self._sla_start_task = None
+        # Abgleich von Ticket-Speicher und Forum-Threads nach dem Start (im Hintergrund, begrenzte REST-Aufrufe)
+        self.reconciler = TicketReconciler(
+            self, self.ticket_store,
+            adopt=lambda thread, message: get_ticket_record(self.ticket_store, thread, message),
+            on_open=lambda record: self.schedule_ticket_deadlines(record, backfill=True),
+            on_closed=self._on_reconciled_close,
+            rate=TICKET_RECONCILE_RATE,
+        )
+        self._reconcile_task = None
+        # Ereignisse für die Ticket-Statistiken, ein Segment pro Prozess (None = deaktiviert)
+        self.ticket_events = TicketEventLog(TICKET_EVENTS_DIR, f"cluster-{os.getenv('CLUSTER_ID', '0') or 0}") if TICKET_EVENTS_DIR else None
+        # Sperren und Zähler, die sich mehrere Instanzen teilen (Standard: nur im Prozess)
+        self.shared_state = create_shared_state(SHARED_STATE_URL, SHARED_STATE_PREFIX)
+        self._categories_version = 0 # Version der zuletzt übernommenen bzw. veröffentlichten Kategorien
+        self._categories_follow_task = None
+        self._shared_state_seed_task = None
+        self._startup_tasks = [] # Kategorien laden, Befehls-Sync, Kanalprüfung
+
+    def get_category_registry(self, guild_id: int) -> CategoryRegistry:
+        """Kompilierte Kategorien der Guild (eigene Kategorien-Datei oder ticket_categories.json)."""
+        categories_file = self.guild_configs.get(guild_id).categories_file or DEFAULT_CATEGORIES_FILE
+        registry = self.category_registries.get(categories_file)
+        if registry is None:
+            # Datei wurde erst nach dem Start per /ticket_config gesetzt
+            registry = self.category_registries[categories_file] = CategoryRegistry(load_ticket_categories(categories_file))
+        return registry
+
+    async def set_categories_file(self, guild_id: int, name: str) -> GuildConfig:
+        """
+        Setzt die eigene Kategorien-Datei einer Guild (/ticket_config). Nur Dateinamen aus TICKET_CATEGORIES_DIR; die
+        Datei wird in einem Worker-Thread gelesen, geprüft und kompiliert, bevor die Konfiguration gespeichert wird.
+        Wirft ValueError mit einer Meldung für den Admin, die Konfiguration bleibt dann unverändert.
+        """
+        path = categories_file_path(TICKET_CATEGORIES_DIR, name)
+        try:
+            registry = await asyncio.to_thread(lambda: CategoryRegistry(read_ticket_categories(path)))
+        except FileNotFoundError:
+            raise ValueError(f"Die Datei `{name}` liegt nicht im Kategorien-Verzeichnis.")
+        except OSError as e:
+            raise ValueError(f"Die Datei `{name}` konnte nicht gelesen werden ({type(e).__name__}).")
+        async with self._reload_lock:
+            cfg = self.guild_configs.update(guild_id, categories_file=path)
+            self.category_registries = {**self.category_registries, path: registry}
+            self.register_panel_view() # Neue Button-IDs persistent registrieren
+        return cfg
+
+    def register_panel_view(self):
+        """
+        Registriert eine persistente Panel-View für alle Guilds: sie enthält jede Button-ID einmal,
+        die Kategorie wird beim Klick über die Registry der jeweiligen Guild aufgelöst.
+        Eine zuvor registrierte Panel-View wird dabei abgemeldet.
+        """
+        if self.panel_view is not None:
+            self.panel_view.stop() # Entfernt die alten Handler aus dem View-Store
+        self.panel_view = TicketPanelView(client=self, registry=CategoryRegistry.union(self.category_registries.values()))
+        self.add_view(self.panel_view)
+
+    def render_panel_view(self, guild_id: int) -> 'TicketPanelView':
+        """
+        View zum Senden/Bearbeiten eines Panels. Sie wird vor dem Senden gestoppt, damit discord.py sie nicht
+        pro Nachricht registriert; Klicks verarbeitet ausschließlich die persistente View aus register_panel_view.
+        """
+        view = TicketPanelView(client=self, registry=self.get_category_registry(guild_id))
+        view.stop()
+        return view
+
+    def _categories_files(self) -> set:
+        return {DEFAULT_CATEGORIES_FILE} | {cfg.categories_file for cfg in self.guild_configs if cfg.categories_file}
+
+    @staticmethod
+    def _compile_category_files(categories_files: set) -> dict:
+        """Liest, validiert und kompiliert alle Kategorien-Dateien. Läuft in einem Worker-Thread, wirft ValueError/OSError."""
+        registries = {}
+        for categories_file in sorted(categories_files):
+            try:
+                registries[categories_file] = CategoryRegistry(read_ticket_categories(categories_file))
+            except (OSError, ValueError) as e:
+                raise ValueError(f"{categories_file}: {e}")
+        return registries
+
+    async def reload_categories(self, update_panels: bool = False) -> str:
+        """
+        Lädt alle Kategorien-Dateien neu, ohne Neustart. Validierung und Kompilierung laufen außerhalb des Event-Loops;
+        erst wenn alle Dateien gültig sind, werden die Registries in einem Schritt ausgetauscht und die
+        persistente Panel-View neu registriert. Wirft ValueError, wenn eine Datei ungültig ist (alter Stand bleibt aktiv).
+        """
+        async with self._reload_lock:
+            registries = await asyncio.to_thread(self._compile_category_files, self._categories_files())
+            self.category_registries = registries # Atomarer Austausch
+            self.register_panel_view()
+            self._categories_mtimes = self._read_categories_mtimes()
+            summary = ", ".join(f"{path}: {len(registry)}" for path, registry in registries.items())
+            log.info("Ticket-Kategorien neu geladen (%s).", summary)
+            if self.shared_state.shared:
+                # Andere Instanzen übernehmen den neuen Stand (siehe _follow_categories)
+                try:
+                    self._categories_version = await self.shared_state.publish_categories(
+                        {path: [category.config for category in registry] for path, registry in registries.items()})
+                except SharedStateError as e:
+                    log.error("Ticket-Kategorien konnten nicht an andere Instanzen verteilt werden: %s", e)
+                    summary += " – nicht an andere Instanzen verteilt"
+            if update_panels:
+                updated = await self.update_posted_panels()
+                summary += f" – {updated} Panel(s) aktualisiert"
+            return summary
+
+    async def update_posted_panels(self) -> int:
+        """Aktualisiert die Buttons aller mit /setup_ticket_panel geposteten Panels. Gelöschte Panels werden vergessen."""
+        updated = 0
+        for message_id, channel_id, guild_id in self.ticket_store.panels():
+            guild = self.get_guild(guild_id)
+            if guild is None:
+                continue # Guild gehört zu einem anderen Shard-Prozess
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                self.ticket_store.remove_panel(message_id)
+                continue
+            try:
+                await channel.get_partial_message(message_id).edit(view=self.render_panel_view(guild_id))
+                updated += 1
+            except discord.NotFound:
+                self.ticket_store.remove_panel(message_id)
+            except discord.HTTPException as e:
+                log.warning("Panel %s konnte nicht aktualisiert werden: %s", message_id, e)
+        return updated
+
+    def _read_categories_mtimes(self) -> dict:
+        mtimes = {}
+        for categories_file in self._categories_files():
+            try:
+                mtimes[categories_file] = os.path.getmtime(categories_file)
+            except OSError:
+                mtimes[categories_file] = None
+        return mtimes
+
+    async def _watch_categories(self):
+        """Optionaler Datei-Watcher: prüft regelmäßig die Änderungszeit der Kategorien-Dateien und lädt bei Änderungen neu."""
+        self._categories_mtimes = self._read_categories_mtimes()
+        while True:
+            await asyncio.sleep(TICKET_CATEGORIES_WATCH_INTERVAL)
+            if self._read_categories_mtimes() == self._categories_mtimes:
+                continue
+            try:
+                await self.reload_categories(update_panels=True)
+            except ValueError as e:
+                # Ungültige Datei (z.B. während des Speicherns): alten Stand behalten, beim nächsten Ändern erneut versuchen
+                self._categories_mtimes = self._read_categories_mtimes()
+                log.error("Neu geladene Ticket-Kategorien sind ungültig, alter Stand bleibt aktiv: %s", e)
+
+    async def _follow_categories(self):
+        """
+        Übernimmt Kategorien, die eine andere Instanz mit /reload_ticket_categories oder dem Datei-Watcher neu geladen hat.
+        Geprüft wird nur die Versionsnummer; erst bei einer neuen Version werden die Kategorien geholt und kompiliert.
+        """
+        while True:
+            await asyncio.sleep(SHARED_STATE_CATEGORIES_INTERVAL)
+            try:
+                if await self.shared_state.categories_version() == self._categories_version:
+                    continue
+                version, categories = await self.shared_state.get_categories()
+            except SharedStateError as e:
+                log.warning("Version der geteilten Ticket-Kategorien konnte nicht abgefragt werden: %s", e)
+                continue
+            async with self._reload_lock:
+                if version <= self._categories_version:
+                    continue # Inzwischen selbst veröffentlicht
+                registries = await asyncio.to_thread(
+                    lambda: {path: CategoryRegistry(configs) for path, configs in categories.items()})
+                for path in self._categories_files() - set(registries):
+                    registries[path] = self.category_registries.get(path) or CategoryRegistry([])
+                self.category_registries = registries
+                self.register_panel_view()
+                self._categories_version = version
+            log.info("Ticket-Kategorien einer anderen Instanz übernommen (Version %d).", version)
+
+    async def load_categories(self):
+        """
+        Erstes Laden der Kategorien: Lesen und Kompilieren (Lookup-Tabellen, Button-Styles, Modal-Felder) laufen in einem
+        Worker-Thread, während die Gateway-Verbindung aufgebaut wird; danach wird die persistente Panel-View registriert.
+        Ungültige Dateien ergeben leere Kategorien.
+        """
+        started = time.perf_counter()
+        async with self._reload_lock:
+            def compile_all():
+                return {categories_file: CategoryRegistry(load_ticket_categories(categories_file))
+                        for categories_file in sorted(self._categories_files())}
+            self.category_registries = await asyncio.to_thread(compile_all)
+            if not any(len(registry) for registry in self.category_registries.values()):
+                # Hier könnte man entscheiden, ob der Bot ohne Kategorien überhaupt starten soll
+                log.warning("Bot startet ohne geladene Ticket-Kategorien aufgrund von Fehlern.")
+            self.register_panel_view()
+        STARTUP_PROFILE.record("categories", time.perf_counter() - started)
 
     async def setup_hook(self):
-        if load_ticket_categories(): # Lädt in globale Variable TICKET_CATEGORIES
-             self.ticket_categories = TICKET_CATEGORIES # Kopiere in die Client-Instanz
-        else:
-             # Hier könnte man entscheiden, ob der Bot ohne Kategorien überhaupt starten soll
-             print("Bot startet ohne geladene Ticket-Kategorien aufgrund von Fehlern.")
-             self.ticket_categories = []
-
-
-        # Views müssen die Kategorien oder den Client bekommen, um darauf zuzugreifen
-        # TicketPanelView wird die Kategorien direkt verwenden
-        self.add_view(TicketPanelView(client=self, categories=self.ticket_categories))
-        self.add_view(TicketActionsView(client=self)) # Enthält jetzt auch Close
-
-        await self.tree.sync()
-        print("Slash-Befehle synchronisiert.")
-
-client = TicketBotClient(intents=intents)
+        STARTUP_PROFILE.mark("login")
+        # Nicht kritische Arbeit läuft parallel zum Verbindungsaufbau bzw. erst nach dem Ready
+        self._startup_tasks.append(asyncio.create_task(self.load_categories(), name="categories-load"))
+        self.ticket_actions = TicketActions(self)
+        self.add_dynamic_items(TicketActionButton) # Claim/Close-Buttons aller Ticket-Nachrichten
+        self.add_dynamic_items(TicketQueueButton) # Blätter-Buttons der Ticket-Listen (/tickets)
+
+        self.audit_log.start()
+        if self.ticket_events:
+            await self.ticket_events.start()
+        await self.shared_state.start()
+        self._shared_state_seed_task = asyncio.create_task(self.seed_shared_state(), name="shared-state-seed")
+        if self.shared_state.shared:
+            self._categories_follow_task = asyncio.create_task(self._follow_categories(), name="categories-follow")
+        await self.start_metrics()
+        self._sla_start_task = asyncio.create_task(self.start_sla(), name="sla-start")
+        if TICKET_RECONCILE_RATE > 0:
+            self._reconcile_task = asyncio.create_task(self.reconcile_tickets(), name="ticket-reconcile")
+        if TICKET_CATEGORIES_WATCH:
+            self._watch_task = asyncio.create_task(self._watch_categories(), name="categories-watcher")
+
+        # Slash-Befehle sind global: bei mehreren Prozessen synchronisiert nur der Prozess mit Shard 0
+        if self.shard_ids is None or 0 in self.shard_ids:
+            self._startup_tasks.append(asyncio.create_task(self.sync_commands(), name="command-sync"))
+        STARTUP_PROFILE.mark("views")
+
+    async def start_metrics(self):
+        """Verbindet die Gauges mit dem Bot-Zustand und startet optional den HTTP-Endpunkt für Prometheus."""
+        metrics.OPEN_TICKETS.set_function(self.ticket_store.count_all_open)
+        metrics.GATEWAY_LATENCY_SECONDS.set_function(
+            lambda: {(shard_id,): latency for shard_id, latency in self.latencies if math.isfinite(latency)})
+        metrics.LOG_QUEUE_DEPTH.set_function(lambda: self.audit_log.depth)
+        metrics.BACKGROUND_TASKS_PENDING.set_function(lambda: self.background_tasks.pending)
+        metrics.SLA_DEADLINES.set_function(lambda: len(self.sla))
+        metrics.STARTUP_PHASE_SECONDS.set_function(STARTUP_PROFILE.seconds)
+        metrics.REST_QUEUE_DEPTH.set_function(self.rest.depth)
+        metrics.REST_IN_FLIGHT.set_function(self.rest.in_flight)
+        if not METRICS_PORT:
+            return
+        port = METRICS_PORT + int(os.getenv("CLUSTER_ID", "0") or 0)
+        self.metrics_server = metrics.MetricsServer(metrics.REGISTRY, METRICS_HOST, port)
+        try:
+            await self.metrics_server.start()
+        except OSError as e:
+            self.metrics_server = None
+            log.error("Metrik-Endpunkt konnte nicht auf %s:%d gestartet werden: %s", METRICS_HOST, port, e)
+
+    async def sync_commands(self):
+        """
+        Synchronisiert die Slash-Befehle nur, wenn sich der Befehlsbaum seit dem letzten Sync geändert hat
+        (oder mit --force-sync). Mit SYNC_GUILD_IDS werden die Befehle nur in diese Guilds synchronisiert,
+        dort sind sie sofort sichtbar (z.B. für Tests). Läuft erst nach dem Ready, der Sync verzögert den Start nicht.
+        """
+        rest_scheduler.background()
+        await self.wait_until_ready()
+        started = time.perf_counter()
+        sync_state = CommandSyncState(COMMAND_SYNC_STATE_PATH)
+        targets = [discord.Object(id=guild_id) for guild_id in SYNC_GUILD_IDS] or [None]
+        for guild in targets:
+            if guild is not None:
+                self.tree.copy_global_to(guild=guild)
+            scope = f"Guild {guild.id}" if guild else "global"
+            try:
+                if await sync_state.sync(self.tree, guild=guild, force=self.force_sync):
+                    log.info("Slash-Befehle synchronisiert (%s).", scope)
+                else:
+                    log.info("Slash-Befehle unverändert, Sync übersprungen (%s).", scope)
+            except discord.HTTPException as e:
+                log.error("Slash-Befehle konnten nicht synchronisiert werden (%s): %s", scope, e)
+        STARTUP_PROFILE.record("command_sync", time.perf_counter() - started)
+
+    async def seed_shared_state(self):
+        """Trägt nach dem Verbinden die offenen Tickets der eigenen Guilds in den geteilten Zustand ein (Zähler pro Benutzer)."""
+        await self.wait_until_ready()
+        tickets = [(record.guild_id, record.creator_id, record.thread_id) for record in self.ticket_store.open_tickets()
+                   if record.guild_id is not None and self.get_guild(record.guild_id) is not None]
+        try:
+            await self.shared_state.add_open(tickets)
+        except SharedStateError as e:
+            log.error("Offene Tickets konnten nicht in den geteilten Zustand übernommen werden: %s", e)
+
+    def forget_open_ticket(self, record: TicketRecord, release_claim: bool = False):
+        """Entfernt ein geschlossenes Ticket im Hintergrund aus dem geteilten Zustand (Zähler und ggf. Claim-Sperre)."""
+        async def forget():
+            await self.shared_state.remove_open(record.guild_id, record.creator_id, record.thread_id)
+            if release_claim:
+                await self.shared_state.release(claim_lock(record.thread_id))
+        self.background_tasks.spawn("shared_state", forget)
+
+    async def start_sla(self):
+        """Lädt nach dem Verbinden die Fristen der eigenen Guilds und ergänzt fehlende für bereits offene Tickets."""
+        await self.wait_until_ready()
+        def own_guild(record: TicketRecord) -> bool:
+            return record.guild_id is not None and self.get_guild(record.guild_id) is not None # Andere Shard-Prozesse
+        self.sla.load(own_guild)
+        for record in self.ticket_store.open_tickets():
+            if own_guild(record):
+                self.schedule_ticket_deadlines(record, backfill=True)
+        self.sla.start()
+        log.info("SLA-Scheduler gestartet (%d Fristen).", len(self.sla))
+
+    async def reconcile_tickets(self):
+        """
+        Gleicht nach dem Verbinden die Ticket-Foren der eigenen Guilds mit dem Ticket-Speicher ab und baut danach die
+        offenen Tickets dieser Guilds im geteilten Zustand neu auf (Schließungen, die dort nie angekommen sind).
+        """
+        await self.wait_until_ready()
+        forums = {}
+        for guild in self.guilds:
+            forum = self.resolved_config.get(guild).forum
+            if forum is not None:
+                forums[forum.id] = forum
+        before_thread_id = discord.utils.time_snowflake(discord.utils.utcnow())
+        for forum in await self.reconciler.run(forums.values()):
+            tickets = [(record.guild_id, record.creator_id, record.thread_id)
+                       for record in self.ticket_store.open_in_guild(forum.guild.id)]
+            try:
+                removed = await self.shared_state.rebuild_open(forum.guild.id, tickets, before_thread_id)
+            except SharedStateError as e:
+                log.error("Offene Tickets konnten im geteilten Zustand nicht neu aufgebaut werden: %s", e,
+                          extra={"guild_id": forum.guild.id})
+                continue
+            if removed:
+                log.info("Geteilter Zustand: %d veraltete offene Tickets entfernt.", removed, extra={"guild_id": forum.guild.id})
+
+    def schedule_ticket_deadlines(self, record: TicketRecord, backfill: bool = False):
+        """Setzt die Fristen eines neuen Tickets. Mit `backfill` nur fehlende, ohne alte Tickets nachträglich anzupingen."""
+        if TICKET_SLA_UNCLAIMED_MINUTES and record.status == STATUS_OPEN and not self.sla.has(record.thread_id, KIND_UNCLAIMED):
+            due_at = record.created_at + TICKET_SLA_UNCLAIMED_MINUTES * 60
+            if not backfill or due_at > time.time():
+                self.sla.schedule(record.thread_id, KIND_UNCLAIMED, due_at)
+        if TICKET_IDLE_CLOSE_HOURS and not self.sla.has(record.thread_id, KIND_IDLE):
+            self.sla.schedule(record.thread_id, KIND_IDLE, record.created_at + TICKET_IDLE_CLOSE_HOURS * 3600)
+
+    def _on_reconciled_close(self, record: TicketRecord):
+        self.sla.cancel(record.thread_id)
+        self.forget_open_ticket(record, release_claim=True)
+
+    async def intake_evidence(self, message: discord.Message, record: TicketRecord):
+        """
+        Übernimmt die Anhänge einer Nachricht im Ticket-Thread ins Nachweis-Archiv. Läuft als Hintergrundaufgabe; bei einer
+        Wiederholung zählen bereits aus derselben Nachricht erfasste Dateien als übernommen.
+        Rückmeldung: eine Reaktion, wenn alles übernommen wurde, sonst eine Antwort mit den abgelehnten Dateien.
+        """
+        stored, notes = 0, []
+        for attachment in message.attachments:
+            try:
+                if self.ticket_store.count_evidence(record.thread_id) >= TICKET_EVIDENCE_MAX_FILES:
+                    raise EvidenceRejected(f"Höchstzahl von {TICKET_EVIDENCE_MAX_FILES} Dateien pro Ticket erreicht")
+                evidence = await self.evidence.store(record.guild_id, attachment)
+            except EvidenceRejected as e:
+                metrics.EVIDENCE_FILES_TOTAL.inc("rejected")
+                notes.append(f"❌ `{attachment.filename}`: {e}")
+                continue
+            added = self.ticket_store.add_evidence(record.thread_id, evidence.sha256, attachment.filename, evidence.content_type,
+                                                   evidence.size_bytes, evidence.path, message.author.id, message.id)
+            if added:
+                metrics.EVIDENCE_FILES_TOTAL.inc("stored")
+                if not evidence.existed:
+                    metrics.EVIDENCE_BYTES_TOTAL.inc(amount=evidence.size_bytes)
+                stored += 1
+            elif self.ticket_store.get_evidence(record.thread_id, evidence.sha256).message_id == message.id:
+                stored += 1 # Schon im ersten Versuch übernommen
+            else:
+                metrics.EVIDENCE_FILES_TOTAL.inc("duplicate")
+                notes.append(f"ℹ️ `{attachment.filename}`: wurde in diesem Ticket bereits hochgeladen")
+        log.info("Nachweise für Ticket %s: %d von %d Anhängen übernommen.", record.thread_id, stored, len(message.attachments))
+        if notes:
+            await message.reply("\n".join(notes)[:2000], mention_author=False)
+        elif stored:
+            await message.add_reaction("📎")
+
+    def record_ticket_event(self, kind: int, record: TicketRecord, actor_id: int):
+        if self.ticket_events:
+            self.ticket_events.record(kind, record.thread_id, record.guild_id, actor_id, record.category_id)
+
+    async def fetch_ticket_thread(self, record: TicketRecord):
+        """Thread eines Tickets aus dem Cache, sonst mit einem REST-Aufruf (z.B. archiviert). Gelöschte Tickets werden geschlossen."""
+        thread = self.get_channel(record.thread_id)
+        if thread is None:
+            try:
+                thread = await self.fetch_channel(record.thread_id)
+            except discord.NotFound:
+                self.ticket_store.mark_closed(record.thread_id, self.user.id)
+                self.sla.cancel(record.thread_id)
+                self.forget_open_ticket(record, release_claim=True)
+                log.info("Thread von Ticket %s existiert nicht mehr, Ticket als geschlossen markiert.", record.thread_id)
+                return None
+        return thread if isinstance(thread, discord.Thread) else None
+
+    async def _on_unclaimed_deadline(self, record: TicketRecord):
+        if record.status != STATUS_OPEN or not TICKET_SLA_UNCLAIMED_MINUTES:
+            return None
+        guild = self.get_guild(record.guild_id)
+        ping_role = self.resolved_config.get(guild).ping_role if guild else None
+        if not ping_role:
+            return None
+        thread = await self.fetch_ticket_thread(record)
+        if thread is None:
+            return None
+        await thread.send(f"{ping_role.mention}, dieses Ticket wartet seit über {TICKET_SLA_UNCLAIMED_MINUTES:g} Minuten darauf, geclaimed zu werden.",
+                          allowed_mentions=discord.AllowedMentions(roles=[ping_role]))
+        metrics.ACTIONS_TOTAL.inc("sla_pinged", record.category_id)
+        return None
+
+    async def _on_idle_deadline(self, record: TicketRecord):
+        if not TICKET_IDLE_CLOSE_HOURS:
+            return None
+        # Nur Nachrichten von Benutzern zählen (gespeichert, übersteht Neustarts); Pings und Log-Nachrichten des Bots nicht
+        last_activity = max(record.created_at, record.claimed_at or 0, self.sla.last_activity(record.thread_id) or 0)
+        due_at = last_activity + TICKET_IDLE_CLOSE_HOURS * 3600
+        if time.time() < due_at:
+            return due_at
+        thread = await self.fetch_ticket_thread(record)
+        if thread is None:
+            return None
+        await self.auto_close_ticket(record, thread)
+        return None
+
+    @staticmethod
+    async def fetch_ticket_message(record: TicketRecord, thread: discord.Thread):
+        """Nachricht mit Ticket-Embed und Buttons (ein REST-Aufruf); None bei älteren Tickets ohne gespeicherte ID."""
+        if not record.message_id:
+            return None
+        try:
+            return await thread.fetch_message(record.message_id)
+        except discord.NotFound:
+            return None
+
+    async def auto_close_ticket(self, record: TicketRecord, thread: discord.Thread):
+        """Schließt ein inaktives Ticket über denselben Ablauf wie das Schließen per Modal."""
+        message = await self.fetch_ticket_message(record, thread)
+        reason = f"Automatisch geschlossen nach {TICKET_IDLE_CLOSE_HOURS:g} Stunden ohne Aktivität."
+        if await self.ticket_actions.close_ticket(thread, message, self.user, reason):
+            metrics.ACTIONS_TOTAL.inc("auto_closed", record.category_id)
+
+    async def close(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+        if self._categories_follow_task:
+            self._categories_follow_task.cancel()
+        if self._shared_state_seed_task:
+            self._shared_state_seed_task.cancel()
+        if self._sla_start_task:
+            self._sla_start_task.cancel()
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+        for task in self._startup_tasks:
+            task.cancel()
+        await self.sla.stop()
+        # Laufende Hintergrundaufgaben abwarten und noch wartende Log-Einträge senden, bevor die Verbindung getrennt wird
+        await self.background_tasks.stop()
+        await self.audit_log.stop()
+        if self.evidence:
+            await self.evidence.close()
+        if self.ticket_events:
+            await self.ticket_events.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await self.shared_state.close()
+        await super().close()
+
+_shard_count, _shard_ids = get_shard_settings()
+client = TicketBotClient(intents=intents, shard_count=_shard_count, shard_ids=_shard_ids)
+STARTUP_PROFILE.mark("client") # Ticket-Speicher und Guild-Konfigurationen geladen
 
 # --- Modal für den Schließungsgrund ---
 class CloseTicketModal(Modal, title="Ticket schließen"):
@@ -103,140 +705,340 @@ class CloseTicketModal(Modal, title="Ticket schließen"):
         placeholder="Gib hier einen optionalen Grund für den Benutzer an."
     )
 
-    def __init__(self, ticket_actions_view: 'TicketActionsView', original_interaction: discord.Interaction):
+    def __init__(self, ticket_actions: 'TicketActions', original_interaction: discord.Interaction):
         super().__init__(timeout=None)
-        self.ticket_actions_view = ticket_actions_view
+        self.ticket_actions = ticket_actions
         self.original_interaction = original_interaction # Die Interaktion, die das Modal geöffnet hat
 
     async def on_submit(self, interaction: discord.Interaction):
         # Diese Interaktion ist die des Modal-Submit-Buttons
         reason = self.reason_input.value or "Kein Grund angegeben."
-        # Die eigentliche Schließlogik wird in der TicketActionsView aufgerufen
-        await self.ticket_actions_view.finalize_close_ticket(self.original_interaction, interaction, reason)
+        # Die eigentliche Schließlogik steht in TicketActions
+        await self.ticket_actions.finalize_close_ticket(self.original_interaction, interaction, reason)
 
-# --- View für Aktionen innerhalb eines Ticket-Threads (Claim, Close etc.) ---
-class TicketActionsView(View):
-    def __init__(self, client: TicketBotClient = None):
-        super().__init__(timeout=None)
-        self.client_ref = client
-        # Dynamisch Buttons hinzufügen, damit wir ihren Status später ändern können
-        self.claim_button = Button(label="✅ Claim Ticket", style=discord.ButtonStyle.success, custom_id="ticket_claim")
-        self.claim_button.callback = self.claim_button_callback
-        self.add_item(self.claim_button)
+# --- Ticket-Zustand ---
+def get_ticket_record(store: TicketStore, thread: discord.abc.GuildChannel, message: discord.Message):
+    """
+    Liefert den gespeicherten Zustand eines Tickets.
+    Tickets, die vor Einführung des Ticket-Speichers erstellt wurden, werden einmalig aus dem Embed übernommen.
+    """
+    record = store.get(thread.id)
+    if record and message and record.message_id is None:
+        store.set_message_id(record.thread_id, message.id) # Tickets von vor der Speicherung der Nachrichten-ID
+    if record or not message or not message.embeds:
+        return record
+
+    embed = message.embeds[0]
+    creator_field = next((field for field in embed.fields if field.name == "Ersteller"), None)
+    if not creator_field:
+        return None
+    try:
+        # Extrahiere User ID aus Mention, z.B. <@123456789012345678> (oder <@!ID>)
+        creator_id = int(creator_field.value.split('<@')[-1].split('>')[0].replace('!', ''))
+    except ValueError:
+        log.warning("Konnte Ticket-Ersteller nicht aus Embed extrahieren (Field Value: %s)", creator_field.value)
+        return None
+
+    category_id = "unbekannt"
+    if embed.footer and embed.footer.text and "Kategorie: " in embed.footer.text:
+        category_id = embed.footer.text.split("Kategorie: ")[-1].strip()
+
+    status = STATUS_OPEN
+    if "[Geschlossen]" in getattr(thread, "name", "") or any(field.name == "Status" for field in embed.fields):
+        status = STATUS_CLOSED
+    elif any(field.name == "✅ Geclaimed von" for field in embed.fields):
+        status = STATUS_CLAIMED
+
+    created_at = thread.created_at.timestamp() if thread.created_at else datetime.datetime.now(datetime.timezone.utc).timestamp()
+    record = TicketRecord(thread_id=thread.id, guild_id=thread.guild.id if thread.guild else None, creator_id=creator_id,
+                          category_id=category_id, status=status, created_at=created_at, message_id=message.id)
+    log.info("Ticket %s aus Embed in den Ticket-Speicher übernommen.", thread.id)
+    return store.add(record)
+
+
+def remove_embed_fields(embed: discord.Embed, name: str):
+    """Entfernt alle Felder mit diesem Namen (Embed.fields ist in discord.py 2.x schreibgeschützt)."""
+    for index in reversed(range(len(embed.fields))):
+        if embed.fields[index].name == name:
+            embed.remove_field(index)
+
+
+def is_ticket_staff(client: TicketBotClient, interaction: discord.Interaction) -> bool:
+    """Darf der Benutzer Tickets bearbeiten (claimen, schließen, Ticket-Listen abrufen)?"""
+    # Admins dürfen immer
+    if interaction.user.guild_permissions.administrator:
+        return True
+
+    # Überprüfe auf TICKET_CLOSER_ROLE_ID (eine oder mehrere, komma-separierte Rollen-IDs)
+    resolved = client.resolved_config.get(interaction.guild)
+    if resolved.member_has_closer_role(interaction.user):
+        return True
+
+    # Fallback: Hat der User "Manage Threads" in diesem Kanal? (Nicht perfekt, da Forum)
+    # Besser wäre es, spezifische Rollen-IDs für Moderatoren zu haben.
+    return interaction.channel.permissions_for(interaction.user).manage_threads
+
+
+# --- Aktionen innerhalb eines Ticket-Threads (Claim, Close) ---
+ACTION_CLAIM = "claim"
+ACTION_CLOSE = "close"
+# Ergebnis von TicketActions.claim_ticket
+CLAIM_OK = "claimed"
+CLAIM_TAKEN = "taken"
+CLAIM_CLOSED = "closed"
+
+
+class TicketActionButton(discord.ui.DynamicItem[Button], template=r"ticket_(?P<action>claim|close)"):
+    """
+    Claim- bzw. Close-Button einer Ticket-Nachricht. Die Aktion steht in der Custom ID (`ticket_claim`, `ticket_close`,
+    wie bei bestehenden Tickets); der Button wird bei jedem Klick daraus erzeugt und an TicketActions weitergegeben.
+    Es gibt weder eine View pro Ticket noch Button-Zustand, den sich mehrere Tickets teilen.
+    """
+
+    def __init__(self, action: str, label: str = "", style: discord.ButtonStyle = discord.ButtonStyle.secondary, disabled: bool = False):
+        super().__init__(Button(label=label, style=style, disabled=disabled, custom_id=f"ticket_{action}"))
+        self.action = action
 
-        self.close_button = Button(label="🔒 Close Ticket", style=discord.ButtonStyle.danger, custom_id="ticket_close")
-        self.close_button.callback = self.close_button_callback
-        self.add_item(self.close_button)
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(match["action"])
+
+    async def callback(self, interaction: discord.Interaction):
+        actions = interaction.client.ticket_actions
+        if self.action == ACTION_CLAIM:
+            await actions.claim_button_callback(interaction)
+        else:
+            await actions.close_button_callback(interaction)
+
+
+_ticket_action_views = {} # (Status, geclaimed) -> gestoppte View, siehe render_ticket_actions
+
+
+def render_ticket_actions(status: str, claimed: bool = False) -> View:
+    """
+    Buttons der Ticket-Nachricht für einen Ticket-Status (`claimed`: geschlossenes Ticket war geclaimed).
+    Die Views sind gestoppt, discord.py speichert sie also nicht pro Nachricht; geklickt wird über TicketActionButton.
+    Da sie nie verändert werden, gibt es pro Status nur eine Instanz.
+    """
+    key = (status, status == STATUS_CLAIMED or (status == STATUS_CLOSED and claimed))
+    view = _ticket_action_views.get(key)
+    if view is None:
+        view = View(timeout=None)
+        if status == STATUS_OPEN:
+            view.add_item(TicketActionButton(ACTION_CLAIM, "✅ Claim Ticket", discord.ButtonStyle.success))
+        elif key[1]:
+            view.add_item(TicketActionButton(ACTION_CLAIM, "Geclaimed", disabled=True))
+        else:
+            view.add_item(TicketActionButton(ACTION_CLAIM, "Aktion nicht mehr verfügbar", disabled=True))
+        if status == STATUS_CLOSED:
+            view.add_item(TicketActionButton(ACTION_CLOSE, "Geschlossen", disabled=True))
+        else:
+            view.add_item(TicketActionButton(ACTION_CLOSE, "🔒 Close Ticket", discord.ButtonStyle.danger))
+        view.stop()
+        _ticket_action_views[key] = view
+    return view
+
+
+def claimed_embed(message: discord.Message, claimer: discord.abc.User) -> discord.Embed:
+    """Ticket-Embed der Nachricht mit (neuem) Claim-Feld und grüner Farbe."""
+    embed = message.embeds[0] if message.embeds else discord.Embed()
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    # Entferne alte Claim-Felder, falls vorhanden (auch beim Neu-Zuweisen)
+    remove_embed_fields(embed, "✅ Geclaimed von")
+    embed.add_field(name="✅ Geclaimed von", value=f"{claimer.mention}\nam {timestamp}", inline=False)
+    embed.color = discord.Color.green()
+    return embed
+
+
+class TicketActions:
+    """
+    Claim und Close für alle Tickets, eine Instanz pro Client. Hält keinen Zustand pro Ticket: Status, Ersteller und
+    Claimer kommen aus dem Ticket-Speicher, die Buttons werden mit render_ticket_actions aus dem Status erzeugt.
+    """
+
+    def __init__(self, client: TicketBotClient):
+        self.client_ref = client
 
 
     async def _check_permissions(self, interaction: discord.Interaction) -> bool:
         """Überprüft, ob der Benutzer die Berechtigung hat, die Aktion auszuführen."""
-        # Admins dürfen immer
-        if interaction.user.guild_permissions.administrator:
+        if is_ticket_staff(self.client_ref, interaction):
             return True
-        
-        # Überprüfe auf TICKET_CLOSER_ROLE_ID (oder Mod/Admin Rollen)
-        # Dies ist eine vereinfachte Prüfung. Ideal wäre eine Konfiguration von erlaubten Rollen.
-        if TICKET_CLOSER_ROLE_ID:
-            closer_role = interaction.guild.get_role(int(TICKET_CLOSER_ROLE_ID))
-            if closer_role and closer_role in interaction.user.roles:
-                return True
-        
-        # Fallback: Hat der User "Manage Threads" in diesem Kanal? (Nicht perfekt, da Forum)
-        # Besser wäre es, spezifische Rollen-IDs für Moderatoren zu haben.
-        if interaction.channel.permissions_for(interaction.user).manage_threads:
-             return True
 
         await interaction.response.send_message("Du hast nicht die erforderlichen Berechtigungen, um diese Aktion auszuführen.", ephemeral=True)
         return False
 
-    async def claim_button_callback(self, interaction: discord.Interaction, button: Button):
+    @metrics.CALLBACK_SECONDS.time("claim_button")
+    async def claim_button_callback(self, interaction: discord.Interaction):
+        structured_log.bind_interaction(interaction, ticket_id=interaction.channel_id)
         if not await self._check_permissions(interaction): return
-        if not self.client_ref: self.client_ref = interaction.client
 
         original_message = interaction.message
-        embed = original_message.embeds[0] if original_message.embeds else discord.Embed()
+        record = get_ticket_record(self.client_ref.ticket_store, interaction.channel, original_message)
+        if not record:
+            await interaction.response.send_message("Fehler: Dieses Ticket ist dem Ticket-System nicht bekannt.", ephemeral=True)
+            return
+        structured_log.bind(category=record.category_id)
 
-        # Prüfen, ob schon geclaimed (z.B. durch Button-Label oder Embed-Text)
-        if button.label == "Geclaimed" or "Geclaimed von:" in embed.description or any("Geclaimed von:" in field.name for field in embed.fields):
+        claimer = interaction.user
+        try:
+            result = await self.claim_ticket(record, claimer, f"{claimer.id}:{interaction.id}")
+        except SharedStateError as e:
+            log.error("Claim-Sperre für Ticket %s konnte nicht gesetzt werden: %s", record.thread_id, e)
+            await interaction.response.send_message("Der Claim konnte gerade nicht geprüft werden. Bitte versuche es gleich noch einmal.", ephemeral=True)
+            return
+        if result == CLAIM_CLOSED:
+            await interaction.response.send_message("Dieses Ticket wurde bereits geschlossen.", ephemeral=True)
+            return
+        if result != CLAIM_OK:
             await interaction.response.send_message("Dieses Ticket wurde bereits geclaimed.", ephemeral=True)
             return
-        
-        claimer = interaction.user
-        timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-
-        # Aktualisiere das Embed, um den Claim-Status anzuzeigen
-        # Entferne alte Claim-Felder, falls vorhanden (defensive Programmierung)
-        embed.fields = [field for field in embed.fields if field.name != "✅ Geclaimed von"]
-        
-        embed.add_field(name="✅ Geclaimed von", value=f"{claimer.mention}\nam {timestamp}", inline=False)
-        embed.color = discord.Color.green() # Ändere die Farbe des Embeds zu grün
-
-        # Button-Status anpassen
-        button.disabled = True
-        button.label = "Geclaimed"
-        button.style = discord.ButtonStyle.secondary
 
         try:
-            await original_message.edit(embed=embed, view=self)
+            await original_message.edit(embed=claimed_embed(original_message, claimer), view=render_ticket_actions(STATUS_CLAIMED))
             # Nur antworten, wenn die Interaktion noch nicht beantwortet wurde (z.B. durch einen vorherigen Fehler)
             if not interaction.response.is_done():
                 await interaction.response.send_message(f"Du hast dieses Ticket geclaimed.", ephemeral=True)
         except discord.HTTPException as e:
-            print(f"FEHLER: Konnte die Originalnachricht beim Claimen nicht bearbeiten: {e}")
+            log.error("Konnte die Originalnachricht beim Claimen nicht bearbeiten: %s", e)
             if not interaction.response.is_done():
                 await interaction.response.send_message("Das Ticket wurde als geclaimed markiert, aber die Ursprungsnachricht konnte nicht vollständig aktualisiert werden. Bitte überprüfe den Thread.", ephemeral=True)
             # Dennoch versuchen zu loggen, da der Claim-Vorgang logisch stattgefunden hat
         except Exception as e:
-            print(f"FEHLER: Unerwarteter Fehler beim Bearbeiten der Nachricht/Antworten für Claim: {e}")
+            log.exception("Unerwarteter Fehler beim Bearbeiten der Nachricht/Antworten für Claim: %s", e)
             if not interaction.response.is_done():
                 await interaction.response.send_message("Ein unerwarteter Fehler ist beim Claimen aufgetreten.", ephemeral=True)
             # Dennoch versuchen zu loggen
         
-        ticket_creator_field = next((field for field in embed.fields if field.name == "Ersteller"), None)
-        creator_mention = ticket_creator_field.value if ticket_creator_field else "dem Ersteller"
-
-        await self.log_ticket_action(interaction, "Ticket Geclaimed", f"Ticket von {creator_mention} wurde von {claimer.mention} geclaimed.", discord.Color.green())
+        creator_mention = f"<@{record.creator_id}>"
+
+        self.client_ref.ticket_log.submit_interaction(interaction, "Ticket Geclaimed", f"Ticket von {creator_mention} wurde von {claimer.mention} geclaimed.", discord.Color.green())
+
+    async def claim_ticket(self, record: TicketRecord, claimer: discord.abc.User, lock_owner: str) -> str:
+        """
+        Claimt ein Ticket (Button und /tickets bulk_claim): Sperre im geteilten Zustand, Ticket-Speicher, Metrik,
+        Ereignis und SLA-Frist. Nachricht und Log aktualisiert der Aufrufer. `lock_owner` ist pro Versuch eindeutig.
+        Wirft SharedStateError, wenn die Sperre nicht geprüft werden kann.
+        """
+        # Sperre im geteilten Zustand zuerst: Klicks auf verschiedenen Instanzen sehen nicht denselben Ticket-Speicher
+        if not await self.client_ref.shared_state.acquire(claim_lock(record.thread_id), lock_owner, CLAIM_LOCK_TTL_SECONDS):
+            return CLAIM_TAKEN
+        # Prüfen und Setzen in einem Schritt, damit zwei gleichzeitige Klicks nicht beide erfolgreich sind
+        if not self.client_ref.ticket_store.mark_claimed(record.thread_id, claimer.id):
+            self.client_ref.background_tasks.spawn("shared_state", lambda: self.client_ref.shared_state.release(claim_lock(record.thread_id)))
+            return CLAIM_CLOSED if record.status == STATUS_CLOSED else CLAIM_TAKEN
+        metrics.ACTIONS_TOTAL.inc("claimed", record.category_id)
+        self.client_ref.record_ticket_event(EVENT_CLAIMED, record, claimer.id)
+        self.client_ref.sla.cancel(record.thread_id, KIND_UNCLAIMED)
+        return CLAIM_OK
+
+    async def reassign_ticket(self, record: TicketRecord, moderator: discord.abc.User) -> bool:
+        """
+        Weist ein offenes Ticket `moderator` zu, auch wenn es bereits geclaimed ist (/tickets bulk_reassign).
+        Gibt False zurück, wenn es geschlossen ist oder schon diesem Moderator gehört. Wirft SharedStateError.
+        """
+        if not record.is_open or record.claimer_id == moderator.id:
+            return False
+        was_unclaimed = record.status == STATUS_OPEN
+        # Claim-Sperre auf den neuen Moderator umschreiben, damit andere Instanzen das Ticket weiter als geclaimed sehen
+        await self.client_ref.shared_state.assign(claim_lock(record.thread_id), f"{moderator.id}:reassign", CLAIM_LOCK_TTL_SECONDS)
+        if not self.client_ref.ticket_store.reassign(record.thread_id, moderator.id):
+            self.client_ref.background_tasks.spawn("shared_state", lambda: self.client_ref.shared_state.release(claim_lock(record.thread_id)))
+            return False
+        if was_unclaimed:
+            metrics.ACTIONS_TOTAL.inc("claimed", record.category_id)
+            self.client_ref.record_ticket_event(EVENT_CLAIMED, record, moderator.id)
+            self.client_ref.sla.cancel(record.thread_id, KIND_UNCLAIMED)
+        metrics.ACTIONS_TOTAL.inc("reassigned", record.category_id)
+        return True
 
-    async def close_button_callback(self, interaction: discord.Interaction, button: Button):
+    @metrics.CALLBACK_SECONDS.time("close_button")
+    async def close_button_callback(self, interaction: discord.Interaction):
+        structured_log.bind_interaction(interaction, ticket_id=interaction.channel_id)
         if not await self._check_permissions(interaction): return
-        if not self.client_ref: self.client_ref = interaction.client
-        
+
         # Modal für den Schließungsgrund anzeigen
         # Die Interaktion vom Button-Klick wird an das Modal weitergegeben
-        modal = CloseTicketModal(ticket_actions_view=self, original_interaction=interaction)
+        modal = CloseTicketModal(ticket_actions=self, original_interaction=interaction)
         await interaction.response.send_modal(modal)
         # Die weitere Logik (finalize_close_ticket) wird nach dem Absenden des Modals ausgeführt.
 
+    @metrics.CALLBACK_SECONDS.time("close_modal")
     async def finalize_close_ticket(self, original_button_interaction: discord.Interaction, modal_submit_interaction: discord.Interaction, reason: str):
-        """Wird nach dem Absenden des CloseTicketModal aufgerufen."""
+        """
+        Wird nach dem Absenden des CloseTicketModal aufgerufen. Die Antwort an den Moderator läuft parallel zum
+        Schließen (siehe close_ticket); schlägt das Schließen fehl, wird er per Followup informiert.
+        """
         # original_button_interaction ist die Interaktion vom Klick auf "Close Ticket"
         # modal_submit_interaction ist die Interaktion vom Absenden des Modals
         
         closer = modal_submit_interaction.user # Der User, der das Modal abgeschickt hat
         thread = original_button_interaction.channel
-        original_message = original_button_interaction.message # Die Nachricht mit den Buttons
+        # Hintergrundaufgaben (DM, Transkript) übernehmen diesen Log-Kontext
+        structured_log.bind_interaction(modal_submit_interaction, ticket_id=original_button_interaction.channel_id)
 
         if not isinstance(thread, discord.Thread):
             await modal_submit_interaction.response.send_message("Fehler: Dies ist kein Thread-Kanal.", ephemeral=True)
             return
 
-        # Buttons deaktivieren
-        self.claim_button.disabled = True
-        if self.claim_button.label != "Geclaimed": # Falls es noch nicht geclaimed war
-            self.claim_button.label = "Aktion nicht mehr verfügbar"
-            self.claim_button.style = discord.ButtonStyle.secondary
-        self.close_button.disabled = True
-        self.close_button.label = "Geschlossen"
-        self.close_button.style = discord.ButtonStyle.secondary
-        
+        async def respond():
+            await modal_submit_interaction.response.send_message(f"Ticket wird geschlossen und archiviert. Grund: {reason}", ephemeral=True)
+            metrics.INTERACTION_DEFER_SECONDS.observe(metrics.snowflake_age(modal_submit_interaction.id), "close")
+
+        try:
+            closed = await self.close_ticket(thread, original_button_interaction.message, closer, reason, respond=respond)
+        except Exception as e:
+            if isinstance(e, discord.Forbidden):
+                error_message = "Fehler: Ich habe keine Berechtigungen, um den Thread zu bearbeiten oder Nachrichten zu senden."
+            else:
+                error_message = f"Ein unerwarteter Fehler ist beim Schließen aufgetreten: {e}"
+            log.error("Fehler beim Schließen des Tickets: %s", e)
+            try:
+                await modal_submit_interaction.followup.send(error_message, ephemeral=True)
+            except discord.HTTPException:
+                pass
+            return
+        if not closed:
+            await modal_submit_interaction.response.send_message("Dieses Ticket wurde bereits geschlossen.", ephemeral=True)
+
+    async def close_ticket(self, thread: discord.Thread, original_message: discord.Message, closer: discord.abc.User, reason: str, respond=None) -> bool:
+        """
+        Gemeinsamer Ablauf für das Schließen per Modal und das automatische Schließen nach Inaktivität.
+        Kritischer Pfad (parallel): optionale Antwort `respond()`, Aktualisieren des Ticket-Embeds und Archivieren/Sperren.
+        Log, DM an den Ersteller und Transkript laufen danach im Hintergrund und verzögern die Antwort nicht.
+        Gibt False zurück, wenn das Ticket bereits geschlossen war. Fehler beim Schließen des Threads werden weitergegeben;
+        der Ticket-Speicher wird dann zurückgesetzt und die Schließen-Sperre freigegeben, sodass erneut geschlossen werden kann.
+        """
+        record = get_ticket_record(self.client_ref.ticket_store, thread, original_message)
+        if record:
+            structured_log.bind(category=record.category_id)
+        if record:
+            was_claimed = record.status == STATUS_CLAIMED
+        else: # Ticket nicht im Speicher (z.B. automatisches Schließen ohne Datensatz): Claim-Feld im Embed
+            was_claimed = bool(original_message and original_message.embeds and
+                               any(field.name == "✅ Geclaimed von" for field in original_message.embeds[0].fields))
+        if record:
+            try:
+                if not await self.client_ref.shared_state.acquire(close_lock(record.thread_id), str(closer.id), CLOSE_LOCK_TTL_SECONDS):
+                    return False # Eine andere Instanz schließt bzw. hat das Ticket geschlossen
+            except SharedStateError as e:
+                # Schließen nicht blockieren: doppeltes Schließen über zwei Instanzen ist harmloser als ein offenes Ticket
+                log.warning("Schließen-Sperre für Ticket %s nicht verfügbar, nur lokale Prüfung: %s", record.thread_id, e)
+        # Als Sperre gegen doppeltes Schließen sofort markieren; Ereignis, geteilter Zustand und Fristen erst nach dem
+        # Archivieren, damit ein fehlgeschlagenes Schließen nichts davon verändert
+        if record and not self.client_ref.ticket_store.mark_closed(record.thread_id, closer.id):
+            return False
+
+        # Deaktivierte Buttons; "Geclaimed" bleibt sichtbar, falls das Ticket geclaimed war
+        view = render_ticket_actions(STATUS_CLOSED, claimed=was_claimed)
+
         # Original-Embed der Ticket-Info aktualisieren
-        if original_message.embeds:
+        if original_message and original_message.embeds:
             original_ticket_embed = original_message.embeds[0]
             original_ticket_embed.color = discord.Color.dark_grey() # Farbe für geschlossenen Status
 
             # Entferne das "Geclaimed von"-Feld, da "Geschlossen" der definitive Status ist
-            original_ticket_embed.fields = [field for field in original_ticket_embed.fields if field.name != "✅ Geclaimed von"]
+            remove_embed_fields(original_ticket_embed, "✅ Geclaimed von")
 
             # Füge ein Statusfeld hinzu oder aktualisiere es
             status_field_found = False
@@ -247,11 +1049,8 @@ class TicketActionsView(View):
                     break
             if not status_field_found:
                 original_ticket_embed.add_field(name="Status", value=f"🔒 Geschlossen von {closer.mention}", inline=False)
-
-            await original_message.edit(embed=original_ticket_embed, view=self)
         else:
-            # Sollte nicht passieren, da wir immer mit einem Embed starten
-            await original_message.edit(view=self)
+            original_ticket_embed = None # Sollte nicht passieren, da wir immer mit einem Embed starten
 
         # Embed für die separate Schließungsnachricht im Thread
         close_embed = Embed(
@@ -261,250 +1060,239 @@ class TicketActionsView(View):
             timestamp=datetime.datetime.now(datetime.timezone.utc)
         )
         close_embed.add_field(name="Grund", value=reason, inline=False)
-        
-        # Original-Embed der Ticket-Info holen, um den Ersteller zu finden
-        ticket_embed = original_message.embeds[0] if original_message.embeds else None
-        ticket_creator_user = None
-        if ticket_embed:
-            creator_field = next((field for field in ticket_embed.fields if field.name == "Ersteller"), None)
-            if creator_field:
-                try:
-                    # Extrahiere User ID aus Mention, z.B. <@123456789012345678> (oder <@!ID>)
-                    user_id_str = creator_field.value.split('<@')[-1].split('>')[0].replace('!', '')
-                    user_id = int(user_id_str)
-                    ticket_creator_user = self.client_ref.get_user(user_id) or await self.client_ref.fetch_user(user_id)
-                except Exception as e:
-                    print(f"Konnte Ticket-Ersteller nicht aus Embed extrahieren: {e} (Field Value: {creator_field.value})")
 
+        new_name = f"[Geschlossen] {thread.name}".replace("[Offen]", "").replace("[Geclaimed]", "").strip()
+        if len(new_name) > 100: new_name = new_name[:97] + "..."
 
-        try:
-            await thread.send(embed=close_embed)
-            
-            # Thread umbenennen und archivieren/sperren
-            new_name = f"[Geschlossen] {thread.name}".replace("[Offen]", "").replace("[Geclaimed]", "").strip()
-            if len(new_name) > 100: new_name = new_name[:97] + "..."
-            
+        async def close_thread():
+            # Embed und Schließungsnachricht gleichzeitig; archiviert wird danach,
+            # da eine neue Nachricht einen archivierten Thread wieder öffnen würde
+            calls = [thread.send(embed=close_embed)]
+            if original_message: # Beim automatischen Schließen älterer Tickets ist die Nachricht evtl. unbekannt
+                calls.insert(0, original_message.edit(embed=original_ticket_embed, view=view) if original_ticket_embed else original_message.edit(view=view))
+            await asyncio.gather(*calls)
             await thread.edit(name=new_name, archived=True, locked=True)
-            # Bestätigung an den Admin/Mod, der geschlossen hat (über die Modal-Interaktion)
-            await modal_submit_interaction.response.send_message(f"Ticket erfolgreich geschlossen und archiviert. Grund: {reason}", ephemeral=True)
-            
-            # Log-Nachricht
-            log_message = f"Ticket {thread.mention} wurde von {closer.mention} geschlossen.\nGrund: {reason}"
-            await self.log_ticket_action(modal_submit_interaction, "Ticket Geschlossen", log_message, discord.Color.red())
 
-            # DM an den Ticketersteller (falls gefunden)
-            if ticket_creator_user:
-                try:
-                    dm_embed = Embed(
-                        title="Dein Ticket wurde geschlossen",
-                        description=f"Hallo {ticket_creator_user.name},\n\nDein Ticket \"{thread.name.replace('[Geschlossen]', '').strip()}\" wurde von einem Teammitglied geschlossen.",
-                        color=discord.Color.blue()
-                    )
-                    dm_embed.add_field(name="Grund der Schließung", value=reason, inline=False)
-                    dm_embed.set_footer(text=f"Server: {original_button_interaction.guild.name}")
-                    await ticket_creator_user.send(embed=dm_embed)
-                except discord.Forbidden:
-                    print(f"Konnte keine DM an {ticket_creator_user.name} senden (DMs möglicherweise deaktiviert).")
-                except Exception as e:
-                    print(f"Fehler beim Senden der DM an den Ticketersteller: {e}")
-
-        except discord.Forbidden:
-            await modal_submit_interaction.response.send_message("Fehler: Ich habe keine Berechtigungen, um den Thread zu bearbeiten oder Nachrichten zu senden.", ephemeral=True)
-        except Exception as e:
-            await modal_submit_interaction.response.send_message(f"Ein unerwarteter Fehler ist aufgetreten: {e}", ephemeral=True)
-            print(f"Fehler beim Schließen des Tickets: {e}")
+        # Die Antwort an den Moderator wartet nicht auf die Thread-Aufrufe
+        calls = ([respond()] if respond else []) + [close_thread()]
+        with metrics.CLOSE_SECONDS.time():
+            results = await asyncio.gather(*calls, return_exceptions=True)
+        if respond and isinstance(results[0], Exception):
+            log.error("Bestätigung für das Schließen von Ticket %s konnte nicht gesendet werden: %s", thread.id, results[0])
+        if isinstance(results[-1], Exception):
+            if record:
+                self.client_ref.ticket_store.reopen(record.thread_id)
+                self.client_ref.background_tasks.spawn("shared_state", lambda: self.client_ref.shared_state.release(close_lock(record.thread_id)))
+            raise results[-1]
+
+        if record:
+            self.client_ref.record_ticket_event(EVENT_CLOSED, record, closer.id)
+            self.client_ref.forget_open_ticket(record, release_claim=True)
+        self.client_ref.sla.cancel(thread.id)
+        metrics.ACTIONS_TOTAL.inc("closed", record.category_id if record else "unbekannt")
+        # Log-Nachricht (wird nur eingereiht, gesendet wird gebündelt im Hintergrund)
+        log_message = f"Ticket {thread.mention} wurde von {closer.mention} geschlossen.\nGrund: {reason}"
+        self.client_ref.ticket_log.submit(thread.guild.id, closer, "Ticket Geschlossen", log_message, discord.Color.red(), thread.id)
+
+        # DM an den Ticketersteller (falls bekannt) als überwachte Hintergrundaufgabe mit Wiederholungen
+        if record:
+            # Ersteller aus dem Ticket-Speicher (kein Embed-Parsing, kein fetch_user)
+            ticket_creator_user = self.client_ref.get_user(record.creator_id)
+            creator_name = ticket_creator_user.name if ticket_creator_user else f"<@{record.creator_id}>"
+            dm_embed = Embed(
+                title="Dein Ticket wurde geschlossen",
+                description=f"Hallo {creator_name},\n\nDein Ticket \"{new_name.replace('[Geschlossen]', '').strip()}\" wurde von einem Teammitglied geschlossen.",
+                color=discord.Color.blue()
+            )
+            dm_embed.add_field(name="Grund der Schließung", value=reason, inline=False)
+            dm_embed.set_footer(text=f"Server: {thread.guild.name}")
+            creator_id = record.creator_id
+            self.client_ref.background_tasks.spawn("close_dm", lambda: self.send_close_dm(creator_id, dm_embed))
+
+        # Transkript exportieren und in den Log-Kanal hochladen, ebenfalls im Hintergrund
+        if self.client_ref.transcripts:
+            self.client_ref.background_tasks.spawn("transcript", lambda: self.export_transcript(thread))
+        return True
 
+    async def send_close_dm(self, creator_id: int, dm_embed: Embed):
+        # Ist der User nicht im Cache, reicht ein einzelner create_dm-Aufruf statt fetch_user + DM-Kanal
+        dm_target = self.client_ref.get_user(creator_id) or await self.client_ref.create_dm(discord.Object(id=creator_id))
+        await dm_target.send(embed=dm_embed)
+
+
+    async def export_transcript(self, thread: discord.Thread):
+        """
+        Exportiert den Verlauf des Threads und lädt das Transkript in den Log-Kanal hoch. Bei einer Wiederholung
+        wird ein bereits exportiertes Transkript aus dem Archiv-Index übernommen statt erneut exportiert.
+        """
+        store = self.client_ref.ticket_store
+        transcript = store.get_transcript(thread.id)
+        if transcript is None or not os.path.exists(transcript.path):
+            exported = await self.client_ref.transcripts.export(thread)
+            store.add_transcript(thread.id, thread.guild.id, exported.path, exported.message_count, exported.size_bytes)
+            transcript = store.get_transcript(thread.id)
+        if transcript.log_message_id:
+            return # Bereits hochgeladen
+
+        log_channel = guild_log_channel(thread.guild, self.client_ref.guild_configs.get(thread.guild.id).log_channel_id)
+        if log_channel is None:
+            return # Ohne Log-Kanal auf diesem Server bleibt das Transkript nur im lokalen Archiv
+        description = f"📄 Transkript für {thread.mention} ({transcript.message_count} Nachrichten)"
+        if transcript.size_bytes > log_channel.guild.filesize_limit:
+            message = await log_channel.send(f"{description} ist zu groß zum Hochladen und liegt im lokalen Archiv: `{transcript.path}`")
+        else:
+            message = await log_channel.send(description, file=discord.File(transcript.path, filename=os.path.basename(transcript.path)))
+        store.set_transcript_message(thread.id, message.id)
 
-    async def log_ticket_action(self, interaction: discord.Interaction, action_name: str, message: str, color: discord.Color, thread_id: int = None):
-        if not TICKET_LOG_CHANNEL_ID: return
-        client_to_use = self.client_ref if self.client_ref else interaction.client
-        if not client_to_use: return
 
-        log_channel_id = 0
-        try:
-            log_channel_id = int(TICKET_LOG_CHANNEL_ID)
-        except ValueError:
-            print(f"FEHLER: TICKET_LOG_CHANNEL_ID ('{TICKET_LOG_CHANNEL_ID}') ist keine gültige ID.")
-            return
+def throttle_message(result, open_tickets: int) -> str:
+    """Antwort an den Benutzer, wenn die Ticket-Erstellung begrenzt wurde."""
+    if result.scope == "open_tickets":
+        return f"Du hast bereits {open_tickets} offene(s) Ticket(s). Bitte warte, bis eines davon geschlossen wurde."
+    retry_at = int(datetime.datetime.now(datetime.timezone.utc).timestamp() + result.retry_after) + 1
+    if result.scope == "user":
+        return f"Du hast in kurzer Zeit zu viele Tickets erstellt. Bitte versuche es <t:{retry_at}:R> erneut."
+    return f"Gerade werden sehr viele Tickets erstellt. Bitte versuche es <t:{retry_at}:R> erneut."
 
-        log_channel = client_to_use.get_channel(log_channel_id)
-        if log_channel and isinstance(log_channel, discord.TextChannel):
-            embed = Embed(title=f"Ticket System: {action_name}", description=message, color=color)
-            embed.set_footer(text=f"Aktion durchgeführt von: {interaction.user.name} ({interaction.user.id})")
-            embed.timestamp = datetime.datetime.now(datetime.timezone.utc)
-
-            current_thread_id = None
-            thread_mention_value = "N/A"
-
-            if isinstance(interaction.channel, discord.Thread): # Für Aktionen innerhalb eines Threads (Claim, Close)
-                current_thread_id = interaction.channel.id
-                thread_mention_value = interaction.channel.mention
-            elif thread_id: # Für Aktionen wie Ticketerstellung
-                current_thread_id = thread_id
-                # Versuche, den Thread zu fetchen, um einen korrekten Mention zu bekommen, falls möglich
-                # Dies ist optional und dient der schöneren Darstellung.
-                try:
-                    fetched_thread = await client_to_use.fetch_channel(thread_id)
-                    if isinstance(fetched_thread, discord.Thread):
-                        thread_mention_value = fetched_thread.mention
-                    else: # Fallback, falls fetch_channel keinen Thread liefert oder fehlschlägt
-                        thread_mention_value = f"<#{thread_id}> (Thread)"
-                except (discord.NotFound, discord.Forbidden): # Thread nicht gefunden oder keine Rechte
-                    thread_mention_value = f"<#{thread_id}> (Thread)"
-                except Exception as e: # Andere Fehler beim Fetchen
-                    print(f"Log: Konnte Thread {thread_id} nicht fetchen für Mention: {e}")
-                    thread_mention_value = f"<#{thread_id}> (Thread)"
-
-            if current_thread_id:
-                embed.add_field(name="Ticket Thread", value=thread_mention_value, inline=True)
-                embed.add_field(name="Ticket ID", value=str(current_thread_id), inline=True)
-            
-            try:
-                await log_channel.send(embed=embed)
-            except Exception as e:
-                print(f"Fehler beim Senden der Log-Nachricht: {e}")
-        else:
-            print(f"Log-Kanal mit ID {TICKET_LOG_CHANNEL_ID} nicht gefunden oder kein Textkanal.")
+
+# Discord-Limits für Embeds: Wert eines Feldes und Summe aller Texte (Titel, Beschreibung, Felder, Footer)
+EMBED_FIELD_VALUE_LIMIT = 1024
+EMBED_TOTAL_LIMIT = 6000
+# Platz für Footer (Ticket-ID, Kategorie) und die Felder, die Claim und Schließen später ins Ticket-Embed schreiben
+EMBED_LATER_FIELDS_RESERVE = 400
+ANSWERS_FILENAME = "antworten.txt"
+
+def add_answer_fields(embed: Embed, answers: list, heading: str, reserve: int = 0):
+    """
+    Fügt die Modal-Antworten (Liste aus Label und Antwort) als Felder hinzu. Passen sie nicht ins Embed (1024 Zeichen pro
+    Feld, 6000 insgesamt abzüglich `reserve` für später hinzugefügte Felder), werden die zu langen Antworten gekürzt und
+    alle Antworten vollständig als Textdatei zurückgegeben, sonst None.
+    """
+    note = f"… (vollständig in {ANSWERS_FILENAME})"
+    budget = EMBED_TOTAL_LIMIT - len(embed) - EMBED_LATER_FIELDS_RESERVE - reserve - sum(len(label) for label, _ in answers)
+    truncated = False
+    for index, (label, value) in enumerate(answers):
+        # Gleicher Anteil am restlichen Platz für jede noch folgende Antwort; kurze Antworten lassen Platz für lange
+        limit = max(len(note), min(EMBED_FIELD_VALUE_LIMIT, budget // (len(answers) - index)))
+        if len(value) > limit:
+            value = value[:limit - len(note)].rstrip() + note
+            truncated = True
+        budget -= len(value)
+        embed.add_field(name=label, value=value, inline=False)
+    if not truncated:
+        return None
+    text = f"{heading}\n\n" + "".join(f"{label}\n{value}\n\n" for label, value in answers)
+    return discord.File(io.BytesIO(text.encode("utf-8")), filename=ANSWERS_FILENAME)
 
 
 # --- Ticket Panel View mit Buttons und Logik ---
 class TicketPanelView(View):
-    def __init__(self, client: TicketBotClient, categories: list):
+    def __init__(self, client: TicketBotClient, registry: CategoryRegistry):
         super().__init__(timeout=None)
         self.client_ref = client
-        self.categories_data = categories # Speichere die Kategorien-Daten
+        self.registry = registry # Kompilierte Kategorien (O(1)-Zugriff, vorberechnete Buttons und Modals)
 
-        if not self.categories_data:
-            print("WARNUNG: TicketPanelView wurde ohne Kategorien initialisiert. Es werden keine Buttons angezeigt.")
+        if not len(self.registry):
+            log.warning("TicketPanelView wurde ohne Kategorien initialisiert. Es werden keine Buttons angezeigt.")
             # Optional: Einen Hinweis-Button hinzufügen oder nichts tun
             # error_button = Button(label="Fehler: Keine Ticket-Kategorien konfiguriert.", style=discord.ButtonStyle.danger, disabled=True, custom_id="cat_error")
             # self.add_item(error_button)
             return
 
-        for category in self.categories_data:
-            button_label = category.get("button_label", "N/A")
-            button_emoji = category.get("button_emoji")
-            if button_emoji:
-                button_label = f"{button_emoji} {button_label}"
-
-            style_str = category.get("button_style", "secondary").lower()
-            button_style = getattr(discord.ButtonStyle, style_str, discord.ButtonStyle.secondary)
-
-            # Die custom_id des Buttons ist nun die category_id aus der JSON, um sie eindeutig zu identifizieren
+        for category in self.registry:
             button = Button(
-                label=button_label,
-                style=button_style,
-                custom_id=category["button_custom_id"] # Verwende die definierte custom_id
+                label=category.button_label,
+                style=category.button_style,
+                custom_id=category.button_custom_id # Verwende die definierte custom_id
             )
-            # Wir binden die category_id an den Callback, um zu wissen, welche Kategorie geklickt wurde
-            button.callback = lambda i, cat_id=category["category_id"]: self.category_button_callback(i, cat_id)
+            button.callback = self.category_button_callback
             self.add_item(button)
 
-    async def category_button_callback(self, interaction: discord.Interaction, category_id: str):
+    @metrics.CALLBACK_SECONDS.time("category_button")
+    async def category_button_callback(self, interaction: discord.Interaction):
         """Wird aufgerufen, wenn ein Kategorie-Button geklickt wird. Zeigt das Modal an."""
         if not self.client_ref: self.client_ref = interaction.client # Fallback
+        structured_log.bind_interaction(interaction)
 
-        # Finde die geklickte Kategorie in den geladenen Daten
-        selected_category = next((cat for cat in self.categories_data if cat["category_id"] == category_id), None)
+        # Kategorie über die custom_id des geklickten Buttons in der Registry der Guild finden (O(1))
+        custom_id = interaction.data.get("custom_id") if interaction.data else None
+        selected_category = self.client_ref.get_category_registry(interaction.guild_id).get_by_custom_id(custom_id)
 
         if not selected_category:
             await interaction.response.send_message("Fehler: Die ausgewählte Ticket-Kategorie konnte nicht gefunden werden. Bitte kontaktiere einen Admin.", ephemeral=True)
-            print(f"FEHLER: Kategorie mit ID '{category_id}' nicht in self.categories_data gefunden.")
+            log.error("Kategorie mit Button-ID '%s' nicht in der Kategorie-Registry gefunden.", custom_id)
+            return
+        structured_log.bind(category=selected_category.category_id)
+
+        # Ticket-Limits prüfen, bevor ein Modal angezeigt wird (kein REST-Aufruf, kein Datenbankzugriff)
+        open_tickets = self.client_ref.ticket_store.count_open(interaction.guild_id, interaction.user.id)
+        throttle_result = self.client_ref.ticket_throttle.acquire(interaction.guild_id, interaction.user.id, selected_category.category_id, open_tickets)
+        if not throttle_result.allowed:
+            metrics.ACTIONS_TOTAL.inc("throttled", selected_category.category_id)
+            await interaction.response.send_message(throttle_message(throttle_result, open_tickets), ephemeral=True)
             return
 
-        # Hier wird das Modal erstellt und angezeigt (nächster Schritt)
-        # Erstelle und zeige das Modal dynamisch
-        ticket_modal = self.build_ticket_modal(selected_category, self.create_ticket_thread_after_modal)
+        # Modal aus der vorab kompilierten Kategorie erzeugen und anzeigen
+        ticket_modal = selected_category.build_modal(self.create_ticket_thread_after_modal, interaction.id)
         await interaction.response.send_modal(ticket_modal)
+        metrics.INTERACTION_DEFER_SECONDS.observe(metrics.snowflake_age(interaction.id), "modal")
         # Die weitere Verarbeitung geschieht im on_submit des Modals, welches dann create_ticket_thread_after_modal aufruft.
 
-    def build_ticket_modal(self, category_config: dict, on_submit_callback: callable) -> Modal:
-        """Erstellt dynamisch ein Modal basierend auf der Kategoriekonfiguration."""
-
-        modal_title = category_config.get("modal_title", "Ticket Details")
-        # Wichtig: Die Custom ID des Modals muss die category_id beinhalten, um sie im on_submit wiederzufinden
-        # und darf nicht zu lang sein (max 100 Zeichen).
-        modal_custom_id = f"ticket_modal_{category_config['category_id']}"
-        if len(modal_custom_id) > 100:
-            modal_custom_id = modal_custom_id[:100]
-
-
-        # Dynamische Modal-Klasse
-        class DynamicTicketModal(Modal, title=modal_title):
-            # Speichere die category_id und den Callback für on_submit
-            # Diese müssen als Klassenattribute oder im Konstruktor übergeben werden,
-            # da sie nicht direkt in on_submit verfügbar sind.
-            # Lösung: Binde sie an die Instanz im Konstruktor der äußeren Klasse oder übergebe sie hier.
-
-            # Wir verwenden eine etwas andere Herangehensweise, um die Daten in on_submit zu bekommen:
-            # Der Callback (on_submit_callback) wird direkt in on_submit verwendet.
-            # Die category_id wird Teil der custom_id des Modals sein und dort extrahiert.
-
-            def __init__(self, category_conf: dict, final_callback: callable):
-                super().__init__(title=category_conf.get("modal_title", "Ticket Details"), custom_id=f"ticket_modal_{category_conf['category_id']}"[:100])
-                self.final_submit_callback = final_callback # z.B. create_ticket_thread_after_modal
-                self.category_config_data = category_conf
-
-                for q_config in category_conf.get("modal_questions", []):
-                    text_style = discord.TextStyle.short
-                    if q_config.get("style", "short").lower() == "paragraph":
-                        text_style = discord.TextStyle.paragraph
-
-                    # TextInput custom_id muss eindeutig sein innerhalb des Modals
-                    # Wir verwenden hier die 'id' aus der JSON-Konfiguration der Frage.
-                    input_field = TextInput(
-                        label=q_config["label"],
-                        custom_id=q_config["id"], # Eindeutige ID für dieses Feld
-                        style=text_style,
-                        placeholder=q_config.get("placeholder"),
-                        required=q_config.get("required", False),
-                        # min_length, max_length können auch konfiguriert werden
-                    )
-                    self.add_item(input_field)
-
-            async def on_submit(self, interaction: discord.Interaction):
-                # Extrahiere Antworten aus dem Modal
-                responses = {}
-                for item in self.children:
-                    if isinstance(item, TextInput):
-                        responses[item.custom_id] = item.value
-
-                # Rufe den finalen Callback auf (create_ticket_thread_after_modal)
-                # Die category_id muss hier wieder extrahiert werden, z.B. aus der modal custom_id
-                # Die custom_id des Modals ist z.B. "ticket_modal_general_help"
-                modal_cat_id = self.custom_id.split("ticket_modal_")[-1]
-
-                # Wichtig: Die Interaktion vom Modal muss zunächst bestätigt werden (defer oder send_message)
-                # bevor der langlaufende Thread-Erstellungsprozess beginnt.
-                # Da create_ticket_thread_after_modal eine followup.send() verwenden wird,
-                # können wir hier mit defer() antworten.
-                await interaction.response.defer(ephemeral=True, thinking=True) # Zeigt "Bot denkt nach..."
-
-                await self.final_submit_callback(interaction, modal_cat_id, responses)
-
-
-        return DynamicTicketModal(category_config, on_submit_callback)
-
-
+    @metrics.CALLBACK_SECONDS.time("ticket_modal")
     async def create_ticket_thread_after_modal(self, interaction: discord.Interaction, category_id: str, modal_responses: dict):
-        """Erstellt den Ticket-Thread, nachdem das Modal ausgefüllt wurde. Enthält Logik der alten create_ticket_callback."""
+        """Erstellt den Ticket-Thread, nachdem das Modal ausgefüllt wurde. Doppelte Absendungen erzeugen keinen zweiten Thread."""
 
         if not self.client_ref: self.client_ref = interaction.client # Fallback
+        structured_log.bind_interaction(interaction, category=category_id)
+        # Das Modal hat die Interaktion bereits bestätigt (defer)
+        metrics.INTERACTION_DEFER_SECONDS.observe(metrics.snowflake_age(interaction.id), "create")
+
+        # Läuft für diesen Benutzer und diese Kategorie bereits eine Erstellung (z.B. erneutes Absenden unter Lag, auch in
+        # einem anderen Bot-Prozess) oder gibt es schon ein offenes Ticket, wird dieses zurückgegeben
+        creation_key = (interaction.guild_id, interaction.user.id, category_id)
+        existing_thread_id = await self.client_ref.creation_guard.acquire(creation_key)
+        if existing_thread_id:
+            metrics.ACTIONS_TOTAL.inc("deduplicated", category_id)
+            await interaction.followup.send(f"Du hast bereits ein offenes Ticket in dieser Kategorie: <#{existing_thread_id}>", ephemeral=True)
+            return
 
-        selected_category = next((cat for cat in self.categories_data if cat["category_id"] == category_id), None)
+        thread_id = None
+        try:
+            thread_id = await self._create_ticket_thread(interaction, category_id, modal_responses)
+        finally:
+            self.client_ref.creation_guard.finish(creation_key, thread_id)
+
+    async def _create_ticket_thread(self, interaction: discord.Interaction, category_id: str, modal_responses: dict):
+        """Enthält Logik der alten create_ticket_callback. Gibt die ID des erstellten Threads zurück (None bei Fehlern)."""
+
+        selected_category = self.client_ref.get_category_registry(interaction.guild_id).get(category_id)
         if not selected_category:
             await interaction.followup.send("Ein interner Fehler ist aufgetreten (Kategorie nicht mehr gefunden beim Erstellen des Threads). Bitte versuche es erneut oder kontaktiere einen Admin.", ephemeral=True)
-            print(f"FEHLER: Kategorie mit ID '{category_id}' nicht in self.categories_data gefunden während create_ticket_thread_after_modal.")
+            log.error("Kategorie mit ID '%s' nicht in der Kategorie-Registry gefunden während create_ticket_thread_after_modal.", category_id)
             return
 
         user = interaction.user
-        ticket_type_name = selected_category['button_label'] # Button-Label als Ticket-Typ-Name
+        ticket_type_name = selected_category.label # Button-Label als Ticket-Typ-Name
 
-        appeals_forum: ForumChannel = self.client_ref.get_channel(APPEALS_FORUM_ID) # type: ignore
-        if not appeals_forum or not isinstance(appeals_forum, discord.ForumChannel):
+        # Erneut prüfen: mehrere gleichzeitig geöffnete Modals dürfen die Höchstzahl offener Tickets nicht überschreiten
+        open_tickets = self.client_ref.ticket_store.count_open(interaction.guild_id, user.id)
+        try:
+            # Tickets, die über andere Instanzen erstellt wurden, kennt nur der geteilte Zustand
+            open_tickets = max(open_tickets, await self.client_ref.shared_state.count_open(interaction.guild_id, user.id))
+        except SharedStateError as e:
+            log.warning("Offene Tickets laut geteiltem Zustand nicht abrufbar, nur lokale Zählung: %s", e)
+        throttle_result = self.client_ref.ticket_throttle.check_open_tickets(open_tickets)
+        if not throttle_result.allowed:
+            await interaction.followup.send(throttle_message(throttle_result, open_tickets), ephemeral=True)
+            return
+
+        # Forum, Forum-Tags und Ping-Rolle der Guild kommen aus dem Cache (kein Parsen, keine Suche pro Ticket)
+        resolved = self.client_ref.resolved_config.get(interaction.guild)
+        appeals_forum: ForumChannel = resolved.forum # type: ignore
+        if not appeals_forum:
             # Wichtig: followup verwenden, da die Interaktion vom Modal kommt und gedeffert wurde
             await interaction.followup.send("Fehler: Das 'Appeals'-Forum ist nicht korrekt konfiguriert. Bitte informiere einen Admin.", ephemeral=True)
-            print(f"FEHLER: Appeals-Forum (ID: {APPEALS_FORUM_ID}) nicht gefunden oder kein Forum-Kanal.")
+            log.error("Appeals-Forum (ID: %s) in Guild %s nicht gefunden oder kein Forum-Kanal.", self.client_ref.guild_configs.get(interaction.guild_id).appeals_forum_id, interaction.guild_id)
             return
 
         thread_title = f"[Offen] {ticket_type_name} - {user.name}"
@@ -522,10 +1310,16 @@ class TicketPanelView(View):
         ticket_embed.add_field(name="Ticket Typ", value=ticket_type_name, inline=False) # Verwende das Button-Label als Typ
         ticket_embed.add_field(name="Erstellt am", value=timestamp_formatted, inline=False)
         
+        evidence_field = None
+        if self.client_ref.evidence:
+            evidence_field = ("📎 Nachweise", f"Logs oder Screenshots bitte direkt in diesem Thread hochladen (bis {TICKET_EVIDENCE_MAX_MB:g} MB pro Datei).")
+
         # Trennlinie und Titel für Modal-Antworten
+        answers_file = None
         if modal_responses: # Nur hinzufügen, wenn es Antworten gibt
             ticket_embed.add_field(name="─" * 30, value="**Vom Benutzer angegebene Informationen:**", inline=False)
-            for question_config in selected_category.get("modal_questions", []):
+            answers = []
+            for question_config in selected_category.questions:
                 question_id = question_config["id"]
                 question_label = question_config["label"] # Das Label aus der JSON als Feldname
                 response_value = modal_responses.get(question_id)
@@ -535,70 +1329,69 @@ class TicketPanelView(View):
                         response_value = "_FEHLER: Erforderliche Angabe fehlt_" # Sollte nicht passieren bei Modal-Validierung
                     else:
                         response_value = "_N/A (Optional)_"
-
-                # Discord Field Value Limit ist 1024
-                ticket_embed.add_field(name=f"{question_label}", value=str(response_value)[:1020], inline=False)
+                answers.append((question_label, str(response_value)))
+            # Zu lange Antworten werden im Embed gekürzt und vollständig als Textdatei angehängt
+            answers_file = add_answer_fields(ticket_embed, answers, f"{ticket_type_name} – {user.name} ({user.id})",
+                                             reserve=sum(map(len, evidence_field)) if evidence_field else 0)
+        if evidence_field:
+            ticket_embed.add_field(name=evidence_field[0], value=evidence_field[1], inline=False)
         
         initial_content_for_thread_creation = f"Neues Ticket von {user.mention}."
         mention_text = ""
-        # Verwende ADMIN_MOD_ROLE_ID (aus .env, die der Bot als ADMIN_MOD_ROLE_ID kennt)
-        # Die .env.example nennt es ADMIN_MOD_PING_ROLE_ID zur Klarstellung des Zwecks
-        admin_mod_ping_role_id_str = os.getenv("ADMIN_MOD_PING_ROLE_ID") # Hole es frisch, falls es geändert wurde
-        if admin_mod_ping_role_id_str:
-            try:
-                role_id = int(admin_mod_ping_role_id_str)
-                if interaction.guild: # Stelle sicher, dass wir einen Guild-Kontext haben
-                    role = interaction.guild.get_role(role_id)
-                    if role:
-                        mention_text = f"\n{role.mention}, ein neues Ticket benötigt Aufmerksamkeit!"
-                    else:
-                        print(f"WARNUNG: ADMIN_MOD_PING_ROLE_ID {role_id} nicht auf dem Server gefunden.")
-                else: # Sollte nicht passieren bei Guild-basierten Interaktionen
-                     print(f"WARNUNG: Kein Guild-Kontext für ADMIN_MOD_PING_ROLE_ID.")
-            except ValueError:
-                print(f"WARNUNG: ADMIN_MOD_PING_ROLE_ID ('{admin_mod_ping_role_id_str}') ist keine gültige ID.")
-            except Exception as e:
-                print(f"FEHLER beim Verarbeiten der ADMIN_MOD_PING_ROLE_ID: {e}")
-
+        if resolved.ping_role:
+            mention_text = f"\n{resolved.ping_role.mention}, ein neues Ticket benötigt Aufmerksamkeit!"
 
         try:
             thread_message_content = initial_content_for_thread_creation + mention_text
             
             # Tagging basierend auf 'forum_tag_name' aus der Kategorie-Konfiguration
             applied_tags = []
-            target_tag_name = selected_category.get("forum_tag_name")
+            found_tag = None
+            target_tag_name = selected_category.forum_tag_name
             if target_tag_name:
-                available_tags = appeals_forum.available_tags
-                found_tag = discord.utils.find(lambda tag: tag.name == target_tag_name, available_tags)
+                found_tag = resolved.tags_by_name.get(target_tag_name)
                 if found_tag:
                     applied_tags.append(found_tag)
-                    print(f"INFO: Forum-Tag '{target_tag_name}' gefunden und wird für Kategorie '{selected_category['category_id']}' angewendet.")
+                    log.debug("Forum-Tag '%s' gefunden und wird für Kategorie '%s' angewendet.", target_tag_name, selected_category.category_id)
                 else:
-                    print(f"WARNUNG: Forum-Tag '{target_tag_name}' (für Kategorie '{selected_category['category_id']}') nicht im Forum '{appeals_forum.name}' (ID: {APPEALS_FORUM_ID}) gefunden.")
+                    log.warning("Forum-Tag '%s' (für Kategorie '%s') nicht im Forum '%s' (ID: %s) gefunden.", target_tag_name, selected_category.category_id, appeals_forum.name, appeals_forum.id)
             else:
-                print(f"INFO: Kein 'forum_tag_name' für Kategorie '{selected_category['category_id']}' definiert.")
-
-            thread = await appeals_forum.create_thread(
-                name=thread_title,
-                content=thread_message_content, 
-                applied_tags=applied_tags if applied_tags else discord.utils.MISSING # type: ignore
-            )
-            ticket_embed.set_footer(text=f"Ticket ID: {thread.id} | Kategorie: {selected_category['category_id']}")
+                log.info("Kein 'forum_tag_name' für Kategorie '%s' definiert.", selected_category.category_id)
+
+            with metrics.CREATE_THREAD_SECONDS.time():
+                created = await appeals_forum.create_thread(
+                    name=thread_title,
+                    content=thread_message_content,
+                    applied_tags=applied_tags if applied_tags else discord.utils.MISSING # type: ignore
+                )
+            thread = created.thread # create_thread liefert (thread, message)
+            structured_log.bind(ticket_id=thread.id)
+            # Ticket-Zustand sofort speichern, damit Claim/Close ihn ohne Embed-Parsing finden
+            record = self.client_ref.ticket_store.create(thread.id, interaction.guild_id, user.id, selected_category.category_id)
+            self.client_ref.schedule_ticket_deadlines(record)
+            try:
+                await self.client_ref.shared_state.add_open([(record.guild_id, record.creator_id, record.thread_id)])
+            except SharedStateError as e:
+                log.warning("Ticket %s konnte nicht in den geteilten Zustand eingetragen werden: %s", thread.id, e)
+            metrics.ACTIONS_TOTAL.inc("created", selected_category.category_id)
+            self.client_ref.record_ticket_event(EVENT_CREATED, record, user.id)
+            ticket_embed.set_footer(text=f"Ticket ID: {thread.id} | Kategorie: {selected_category.category_id}")
             
-            await thread.send(embed=ticket_embed, view=TicketActionsView(client=self.client_ref)) # type: ignore
+            ticket_message = await thread.send(embed=ticket_embed, view=render_ticket_actions(STATUS_OPEN), file=answers_file)
+            self.client_ref.ticket_store.set_message_id(thread.id, ticket_message.id)
             
             tag_info_msg = f" (Tag: {found_tag.name})" if found_tag and target_tag_name else ""
             if not found_tag and target_tag_name: # Tag war definiert, aber nicht gefunden
                 tag_info_msg = f" (Hinweis: Der konfigurierte Tag '{target_tag_name}' wurde im Forum nicht gefunden.)"
 
             # Wichtig: followup verwenden, da die Interaktion vom Modal kommt und gedeffert wurde
+            evidence_hint = " Logs oder Screenshots kannst du direkt im Thread hochladen." if self.client_ref.evidence else ""
             await interaction.followup.send(
-                f"Dein Ticket '{ticket_type_name}' wurde erfolgreich erstellt! Du findest es hier: {thread.mention}{tag_info_msg}",
+                f"Dein Ticket '{ticket_type_name}' wurde erfolgreich erstellt! Du findest es hier: {thread.mention}{tag_info_msg}{evidence_hint}",
                 ephemeral=True
             )
             
-            log_action_view_instance = TicketActionsView(client=self.client_ref if self.client_ref else interaction.client) # type: ignore
-            log_message_detail = f"Neues Ticket '{ticket_type_name}' (Kategorie: {selected_category['category_id']}) von {user.mention} erstellt im Thread {thread.mention}."
+            log_message_detail = f"Neues Ticket '{ticket_type_name}' (Kategorie: {selected_category.category_id}) von {user.mention} erstellt im Thread {thread.mention}."
             if found_tag and target_tag_name:
                 log_message_detail += f" Tag '{found_tag.name}' angewendet."
             elif target_tag_name: # Tag definiert, aber nicht gefunden
@@ -606,44 +1399,131 @@ class TicketPanelView(View):
             else: # Kein Tag definiert
                  log_message_detail += " Kein spezifischer Forum-Tag für diese Kategorie konfiguriert."
 
-            await log_action_view_instance.log_ticket_action(interaction, "Ticket Erstellt", log_message_detail, discord.Color.blue(), thread_id=thread.id)
+            self.client_ref.ticket_log.submit_interaction(interaction, "Ticket Erstellt", log_message_detail, discord.Color.blue(), thread_id=thread.id)
+            return thread.id
 
         except discord.Forbidden as fe:
             await interaction.followup.send(f"Fehler beim Erstellen des Tickets: Ich habe möglicherweise nicht die Berechtigung, Threads zu erstellen oder Tags anzuwenden. Bitte überprüfe meine Rollenberechtigungen im Forum. ({fe})", ephemeral=True)
-            print(f"FEHLER (Forbidden) beim Erstellen des Tickets oder Anwenden von Tags: {fe}")
+            log.error("Keine Berechtigung beim Erstellen des Tickets oder Anwenden von Tags: %s", fe)
         except Exception as e:
             await interaction.followup.send(f"Ein unerwarteter Fehler ist beim Erstellen des Tickets aufgetreten. Bitte versuche es später erneut oder kontaktiere einen Admin. Fehler: {e}",ephemeral=True)
-            print(f"FEHLER beim Erstellen des Tickets nach Modal: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Fehler beim Erstellen des Tickets nach Modal: %s", e)
+
+
+# --- Ticket-Listen für Moderatoren (/tickets) ---
+class TicketQueueButton(discord.ui.DynamicItem[Button], template=r"tickets:(?P<queue>open|unclaimed|mine):(?P<page>\d+):(?P<before>\d+):(?P<nav>[pnr]):(?P<category>.*)"):
+    """
+    Blätter-Button der Ticket-Listen. Liste, Filter und Ziel-Seite stehen in der Custom ID; der Button wird bei jedem
+    Klick daraus erzeugt und funktioniert so auch nach einem Neustart, ohne pro Nachricht eine View zu speichern.
+    """
+
+    def __init__(self, query: QueueQuery, page: int, nav: str, disabled: bool = False):
+        labels = {NAV_PREVIOUS: "◀ Zurück", NAV_REFRESH: "🔄 Aktualisieren", NAV_NEXT: "Weiter ▶"}
+        super().__init__(Button(label=labels[nav], style=discord.ButtonStyle.secondary, disabled=disabled,
+                                custom_id=query.custom_id(page, nav)))
+        self.query = query
+        self.page = page
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(QueueQuery(match["queue"], int(match["before"]), match["category"]), int(match["page"]), match["nav"])
+
+    @metrics.CALLBACK_SECONDS.time("tickets_page")
+    async def callback(self, interaction: discord.Interaction):
+        structured_log.bind_interaction(interaction)
+        if not is_ticket_staff(interaction.client, interaction):
+            await interaction.response.send_message("Du hast nicht die erforderlichen Berechtigungen, um diese Aktion auszuführen.", ephemeral=True)
+            return
+        embed, view = render_ticket_queue(interaction.client, interaction, self.query, self.page)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+def render_ticket_queue(client: TicketBotClient, interaction: discord.Interaction, query: QueueQuery, page: int):
+    """Seite einer Ticket-Liste aus dem Speicher-Index des Ticket-Speichers, mit Blätter-Buttons."""
+    records = query_tickets(client.ticket_store, interaction.guild_id, query, interaction.user.id)
+    embed, page, pages = render_page(records, query, page, client.get_category_registry(interaction.guild_id))
+    view = View(timeout=None)
+    view.add_item(TicketQueueButton(query, max(page - 1, 0), NAV_PREVIOUS, disabled=page == 0))
+    view.add_item(TicketQueueButton(query, page, NAV_REFRESH))
+    view.add_item(TicketQueueButton(query, min(page + 1, pages - 1), NAV_NEXT, disabled=page >= pages - 1))
+    view.stop() # Klicks verarbeitet TicketQueueButton, die View muss nicht im View-Store bleiben
+    return embed, view
 
 
 # --- Event: Bot ist bereit ---
 @client.event
 async def on_ready():
-    print(f'{client.user} ist jetzt online und bereit!')
-    print(f'User ID: {client.user.id}')
-    print(f'Open a Ticket Channel ID: {OPEN_TICKET_CHANNEL_ID}')
-    print(f'Appeals Forum ID: {APPEALS_FORUM_ID}')
-    if ADMIN_MOD_ROLE_ID: print(f'Admin/Mod Role ID: {ADMIN_MOD_ROLE_ID}')
-    if TICKET_LOG_CHANNEL_ID: print(f'Ticket Log Channel ID: {TICKET_LOG_CHANNEL_ID}')
-    if TICKET_CLOSER_ROLE_ID: print(f'Ticket Closer Role ID: {TICKET_CLOSER_ROLE_ID}')
-    print('------')
-    # Hier könnten zusätzliche Kanalüberprüfungen beim Start stattfinden, z.B. ob die Kanal-IDs gültig sind.
-    # Beispiel:
-    open_ticket_channel = client.get_channel(OPEN_TICKET_CHANNEL_ID)
-    if not open_ticket_channel:
-        print(f"WARNUNG: Open a Ticket Channel mit ID {OPEN_TICKET_CHANNEL_ID} wurde nicht gefunden.")
-    appeals_forum = client.get_channel(APPEALS_FORUM_ID)
-    if not appeals_forum:
-        print(f"WARNUNG: Appeals Forum mit ID {APPEALS_FORUM_ID} wurde nicht gefunden.")
-    if TICKET_LOG_CHANNEL_ID:
-        try:
-            log_channel = client.get_channel(int(TICKET_LOG_CHANNEL_ID))
-            if not log_channel:
-                print(f"WARNUNG: Ticket Log Channel mit ID {TICKET_LOG_CHANNEL_ID} wurde nicht gefunden.")
-        except ValueError:
-             print(f"WARNUNG: TICKET_LOG_CHANNEL_ID ('{TICKET_LOG_CHANNEL_ID}') ist keine gültige ID.")
+    if not STARTUP_PROFILE.has("ready"):
+        STARTUP_PROFILE.mark("ready")
+        log.info("Bereit nach %.2fs seit dem Start des Prozesses.", STARTUP_PROFILE.elapsed())
+        STARTUP_PROFILE.log_report("Startzeiten bis zum Ready")
+    log.info("%s ist jetzt online und bereit! User ID: %s, Guilds: %d, Shards: %s von %s, Admin/Mod Role ID: %s",
+             client.user, client.user.id, len(client.guilds), sorted(client.shards), client.shard_count, ADMIN_MOD_ROLE_ID or "—")
+    client._startup_tasks.append(asyncio.create_task(validate_guild_channels(), name="channel-validation"))
+
+
+# --- Event: Erste Interaktion nach dem Start (Profil-Modus) ---
+@client.event
+async def on_interaction(interaction: discord.Interaction):
+    if not STARTUP_PROFILE.has("first_interaction"):
+        STARTUP_PROFILE.mark("first_interaction")
+        STARTUP_PROFILE.log_report("Startzeiten bis zur ersten Interaktion")
+
+
+async def validate_guild_channels():
+    """Prüft nach dem Ready im Hintergrund, ob die konfigurierten Kanäle existieren (nur Log-Ausgaben)."""
+    # Kanalüberprüfung pro Guild: Kanäle werden immer innerhalb der jeweiligen Guild gesucht
+    for index, guild in enumerate(client.guilds):
+        if index and index % 100 == 0:
+            await asyncio.sleep(0) # Bei vielen Guilds dem Event-Loop Zeit für Interaktionen geben
+        cfg = client.guild_configs.get(guild.id)
+        if not client.guild_configs.has_own_config(guild.id) and not guild.get_channel(cfg.appeals_forum_id or 0):
+            log.info("Guild %s (%s) hat keine Ticket-Konfiguration. Einrichtung mit /ticket_config.", guild.name, guild.id, extra={"guild_id": guild.id})
+            continue
+        if not guild.get_channel(cfg.open_ticket_channel_id or 0):
+            log.warning("[%s] Open a Ticket Channel mit ID %s wurde nicht gefunden.", guild.name, cfg.open_ticket_channel_id, extra={"guild_id": guild.id})
+        if not guild.get_channel(cfg.appeals_forum_id or 0):
+            log.warning("[%s] Appeals Forum mit ID %s wurde nicht gefunden.", guild.name, cfg.appeals_forum_id, extra={"guild_id": guild.id})
+        if cfg.log_channel_id and not guild.get_channel(cfg.log_channel_id):
+            log.warning("[%s] Ticket Log Channel mit ID %s wurde nicht gefunden.", guild.name, cfg.log_channel_id, extra={"guild_id": guild.id})
+
+
+# --- Event: Aktivität in Ticket-Threads (verschiebt das automatische Schließen, übernimmt Nachweise) ---
+@client.event
+async def on_message(message: discord.Message):
+    if not message.author.bot and isinstance(message.channel, discord.Thread):
+        client.sla.note_activity(message.channel.id)
+        if message.attachments and client.evidence:
+            record = client.ticket_store.get(message.channel.id)
+            # Nur Uploads des Ticket-Erstellers sind Nachweise; Dateien von Moderatoren bleiben nur im Thread
+            if record and record.is_open and message.author.id == record.creator_id:
+                client.background_tasks.spawn("evidence", lambda: client.intake_evidence(message, record))
+
+
+# --- Events: Invalidierung des Konfigurations-Caches ---
+@client.event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    client.resolved_config.on_channel_created(channel)
+
+@client.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    client.resolved_config.on_channel_changed(after) # z.B. geänderte Forum-Tags
+
+@client.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    client.resolved_config.on_channel_changed(channel)
+
+@client.event
+async def on_guild_role_create(role: discord.Role):
+    client.resolved_config.on_role_created(role)
+
+@client.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    client.resolved_config.on_role_changed(after)
+
+@client.event
+async def on_guild_role_delete(role: discord.Role):
+    client.resolved_config.on_role_changed(role)
 
 
 # --- Slash-Befehl: Setup Ticket Panel ---
@@ -654,13 +1534,14 @@ async def setup_ticket_panel_command(interaction: discord.Interaction):
     Sendet das Ticket-Erstellungspanel in den konfigurierten Kanal.
     Dieser Befehl kann nur von Administratoren ausgeführt werden.
     """
-    target_channel_id = OPEN_TICKET_CHANNEL_ID
-    target_channel = interaction.guild.get_channel(target_channel_id)
+    structured_log.bind_interaction(interaction)
+    target_channel_id = client.guild_configs.get(interaction.guild_id).open_ticket_channel_id
+    target_channel = interaction.guild.get_channel(target_channel_id) if target_channel_id else None
 
     if not target_channel:
         await interaction.response.send_message(
             f"Fehler: Der Kanal zum Öffnen von Tickets (ID: {target_channel_id}) wurde nicht gefunden. "
-            "Bitte überprüfe die `OPEN_TICKET_CHANNEL_ID` in deiner `.env`-Datei.",
+            "Bitte richte ihn mit `/ticket_config` ein oder überprüfe die `OPEN_TICKET_CHANNEL_ID` in deiner `.env`-Datei.",
             ephemeral=True
         )
         return
@@ -687,15 +1568,14 @@ async def setup_ticket_panel_command(interaction: discord.Interaction):
     # Optional: Ein Thumbnail oder Bild hinzufügen
     # panel_embed.set_thumbnail(url="URL_ZU_DEINEM_SERVER_LOGO_ODER_EINEM_PASSENDEN_BILD")
 
-    # Erstelle die View mit den Buttons
-    # Stelle sicher, dass die TicketPanelView-Klasse den client korrekt erhält,
-    # falls sie ihn für Callbacks benötigt, die nicht direkt über die Interaction laufen.
-    # In diesem Fall wird der Client in der `setup_hook` der `TicketBotClient` Klasse
-    # bereits an die persistenten Views übergeben.
-    panel_view = TicketPanelView(client=client)
+    # Erstelle die View mit den Buttons der Kategorien dieser Guild
+    # Die Klicks selbst werden von der persistenten View aus `setup_hook` verarbeitet.
+    panel_view = client.render_panel_view(interaction.guild_id)
 
     try:
-        await target_channel.send(embed=panel_embed, view=panel_view)
+        panel_message = await target_channel.send(embed=panel_embed, view=panel_view)
+        # Merken, damit das Panel nach /reload_ticket_categories aktualisiert werden kann
+        client.ticket_store.add_panel(panel_message.id, target_channel.id, interaction.guild_id)
         await interaction.response.send_message(
             f"Das Ticket-Panel wurde erfolgreich im Kanal {target_channel.mention} gepostet.",
             ephemeral=True
@@ -711,7 +1591,7 @@ async def setup_ticket_panel_command(interaction: discord.Interaction):
             f"Ein unerwarteter Fehler ist beim Posten des Panels aufgetreten: {e}",
             ephemeral=True
         )
-        print(f"Fehler beim Ausführen von setup_ticket_panel_command: {e}")
+        log.exception("Fehler beim Ausführen von setup_ticket_panel_command: %s", e)
 
 @setup_ticket_panel_command.error
 async def setup_ticket_panel_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
@@ -719,15 +1599,326 @@ async def setup_ticket_panel_command_error(interaction: discord.Interaction, err
         await interaction.response.send_message("Fehler: Du hast nicht die erforderlichen Berechtigungen (Administrator), um diesen Befehl auszuführen.", ephemeral=True)
     else:
         await interaction.response.send_message(f"Ein Fehler ist aufgetreten: {error}", ephemeral=True)
-        print(f"Fehler im setup_ticket_panel_command: {error}")
+        log.error("Fehler im setup_ticket_panel_command: %s", error)
+
+# --- Slash-Befehl: Kategorien neu laden ---
+@client.tree.command(name="reload_ticket_categories", description="Lädt die Ticket-Kategorien ohne Neustart neu.")
+@app_commands.describe(panels_aktualisieren="Bereits gepostete Ticket-Panels mit den neuen Buttons aktualisieren")
+@app_commands.checks.has_permissions(administrator=True)
+async def reload_ticket_categories_command(interaction: discord.Interaction, panels_aktualisieren: bool = False):
+    structured_log.bind_interaction(interaction)
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        summary = await client.reload_categories(update_panels=panels_aktualisieren)
+    except ValueError as e:
+        await interaction.followup.send(f"Fehler: Die Kategorien konnten nicht geladen werden, der bisherige Stand bleibt aktiv.\n{e}", ephemeral=True)
+        return
+    await interaction.followup.send(f"Ticket-Kategorien neu geladen ({summary}).", ephemeral=True)
+
+@reload_ticket_categories_command.error
+async def reload_ticket_categories_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("Fehler: Du hast nicht die erforderlichen Berechtigungen (Administrator), um diesen Befehl auszuführen.", ephemeral=True)
+    else:
+        log.error("Fehler im reload_ticket_categories_command: %s", error)
+        if not interaction.response.is_done():
+            await interaction.response.send_message(f"Ein Fehler ist aufgetreten: {error}", ephemeral=True)
+
+
+# --- Slash-Befehl: Guild-Konfiguration ---
+@client.tree.command(name="ticket_config", description="Zeigt oder ändert die Ticket-Konfiguration dieses Servers.")
+@app_commands.describe(
+    open_channel="Kanal für das Ticket-Panel",
+    forum="Forum, in dem die Ticket-Threads erstellt werden",
+    log_channel="Kanal für Ticket-Logs",
+    ping_role="Rolle, die bei neuen Tickets erwähnt wird",
+    closer_role="Rolle, die Tickets claimen und schließen darf",
+    categories_file="Eigene Kategorien-Datei (Dateiname im Kategorien-Verzeichnis des Bots) für diesen Server"
+)
+@app_commands.checks.has_permissions(administrator=True)
+async def ticket_config_command(
+    interaction: discord.Interaction,
+    open_channel: discord.TextChannel = None,
+    forum: discord.ForumChannel = None,
+    log_channel: discord.TextChannel = None,
+    ping_role: discord.Role = None,
+    closer_role: discord.Role = None,
+    categories_file: str = None
+):
+    """Ohne Parameter wird die aktuelle Konfiguration angezeigt, sonst werden die angegebenen Werte gespeichert."""
+    structured_log.bind_interaction(interaction)
+    changes = {}
+    if open_channel: changes["open_ticket_channel_id"] = open_channel.id
+    if forum: changes["appeals_forum_id"] = forum.id
+    if log_channel: changes["log_channel_id"] = log_channel.id
+    if ping_role: changes["ping_role_id"] = ping_role.id
+    if closer_role: changes["closer_role_ids"] = frozenset({closer_role.id})
+
+    if categories_file:
+        # Zuerst prüfen: bei einer ungültigen Datei wird gar nichts gespeichert
+        try:
+            cfg = await client.set_categories_file(interaction.guild_id, categories_file)
+        except ValueError as e:
+            await interaction.response.send_message(f"Fehler: {e}", ephemeral=True)
+            return
+    if changes:
+        cfg = client.guild_configs.update(interaction.guild_id, **changes)
+    if changes or categories_file:
+        client.resolved_config.invalidate(interaction.guild_id)
+    else:
+        cfg = client.guild_configs.get(interaction.guild_id)
+
+    def fmt(value, prefix):
+        return f"<{prefix}{value}>" if value else "—"
+    config_embed = Embed(title="Ticket-Konfiguration", color=discord.Color.blue())
+    config_embed.add_field(name="Panel-Kanal", value=fmt(cfg.open_ticket_channel_id, "#"), inline=True)
+    config_embed.add_field(name="Ticket-Forum", value=fmt(cfg.appeals_forum_id, "#"), inline=True)
+    config_embed.add_field(name="Log-Kanal", value=fmt(cfg.log_channel_id, "#"), inline=True)
+    config_embed.add_field(name="Ping-Rolle", value=fmt(cfg.ping_role_id, "@&"), inline=True)
+    config_embed.add_field(name="Closer-Rollen", value=", ".join(f"<@&{r}>" for r in cfg.closer_role_ids) or "—", inline=True)
+    config_embed.add_field(name="Kategorien-Datei", value=cfg.categories_file or DEFAULT_CATEGORIES_FILE, inline=True)
+    if not client.guild_configs.has_own_config(interaction.guild_id):
+        config_embed.set_footer(text="Standard-Konfiguration aus der .env")
+    await interaction.response.send_message(embed=config_embed, ephemeral=True)
+
+@ticket_config_command.error
+async def ticket_config_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.MissingPermissions):
+        await interaction.response.send_message("Fehler: Du hast nicht die erforderlichen Berechtigungen (Administrator), um diesen Befehl auszuführen.", ephemeral=True)
+    else:
+        await interaction.response.send_message(f"Ein Fehler ist aufgetreten: {error}", ephemeral=True)
+        log.error("Fehler im ticket_config_command: %s", error)
+
+# --- Slash-Befehle: Ticket-Listen für Moderatoren ---
+tickets_group = app_commands.Group(name="tickets", description="Ticket-Listen und Massenaktionen für Moderatoren.", guild_only=True,
+                                   default_permissions=discord.Permissions(manage_threads=True))
+
+async def ticket_category_autocomplete(interaction: discord.Interaction, current: str):
+    current = current.lower()
+    return [app_commands.Choice(name=category.label, value=category.category_id)
+            for category in client.get_category_registry(interaction.guild_id)
+            if current in category.label.lower() or current in category.category_id.lower()][:25]
+
+async def send_ticket_queue(interaction: discord.Interaction, queue: str, category: str, older_than_hours: int):
+    structured_log.bind_interaction(interaction)
+    if not is_ticket_staff(client, interaction):
+        await interaction.response.send_message("Du hast nicht die erforderlichen Berechtigungen, um diese Aktion auszuführen.", ephemeral=True)
+        return
+    created_before = int(time.time() - older_than_hours * 3600) if older_than_hours else 0
+    query = QueueQuery(queue, created_before, category or "")
+    if not query.fits_custom_id():
+        await interaction.response.send_message("Fehler: Die Kategorie-ID ist zu lang.", ephemeral=True)
+        return
+    embed, view = render_ticket_queue(client, interaction, query, 0)
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+@tickets_group.command(name="open", description="Listet alle offenen Tickets (auch geclaimte), älteste zuerst.")
+@app_commands.describe(category="Nur Tickets dieser Kategorie", older_than_hours="Nur Tickets, die älter als so viele Stunden sind")
+@app_commands.autocomplete(category=ticket_category_autocomplete)
+async def tickets_open_command(interaction: discord.Interaction, category: str = None, older_than_hours: app_commands.Range[int, 0, 8760] = 0):
+    await send_ticket_queue(interaction, QUEUE_OPEN, category, older_than_hours)
+
+@tickets_group.command(name="unclaimed", description="Listet Tickets, die noch nicht geclaimed wurden, älteste zuerst.")
+@app_commands.describe(category="Nur Tickets dieser Kategorie", older_than_hours="Nur Tickets, die älter als so viele Stunden sind")
+@app_commands.autocomplete(category=ticket_category_autocomplete)
+async def tickets_unclaimed_command(interaction: discord.Interaction, category: str = None, older_than_hours: app_commands.Range[int, 0, 8760] = 0):
+    await send_ticket_queue(interaction, QUEUE_UNCLAIMED, category, older_than_hours)
+
+@tickets_group.command(name="mine", description="Listet die offenen Tickets, die du geclaimed hast.")
+@app_commands.describe(category="Nur Tickets dieser Kategorie", older_than_hours="Nur Tickets, die älter als so viele Stunden sind")
+@app_commands.autocomplete(category=ticket_category_autocomplete)
+async def tickets_mine_command(interaction: discord.Interaction, category: str = None, older_than_hours: app_commands.Range[int, 0, 8760] = 0):
+    await send_ticket_queue(interaction, QUEUE_MINE, category, older_than_hours)
+
+# --- Massenaktionen (/tickets bulk_close, bulk_claim, bulk_reassign) ---
+BULK_PREVIEW_ROWS = 10
+
+def bulk_selection(category: str, older_than_hours: int, creator: discord.abc.User, claimed_by: discord.abc.User = None,
+                   name_prefix: str = None, unclaimed_only: bool = False) -> BulkSelection:
+    return BulkSelection(category_id=category or "", created_before=time.time() - older_than_hours * 3600 if older_than_hours else 0,
+                         creator_id=creator.id if creator else None, claimer_id=claimed_by.id if claimed_by else None,
+                         name_prefix=name_prefix or "", unclaimed_only=unclaimed_only)
+
+async def resolve_bulk_ticket(record: TicketRecord, selection: BulkSelection):
+    """Thread und Ticket-Nachricht für eine Massenaktion; None, wenn der Thread fehlt oder der Name nicht passt."""
+    structured_log.bind(ticket_id=record.thread_id, category=record.category_id)
+    thread = await client.fetch_ticket_thread(record)
+    if thread is None or not selection.matches_name(thread.name):
+        return None
+    return thread, await client.fetch_ticket_message(record, thread)
+
+def bulk_progress_embed(title: str, description: str, progress: BulkProgress, done: bool = False) -> Embed:
+    embed = Embed(title=f"{title} {'abgeschlossen' if done else 'läuft …'}", description=description,
+                  color=discord.Color.green() if done and not progress.failed else discord.Color.orange() if done else discord.Color.blue())
+    embed.add_field(name="Fortschritt", value=progress.summary(), inline=False)
+    if progress.errors:
+        embed.add_field(name="Fehler", value="\n".join(progress.errors)[:1024], inline=False)
+    return embed
+
+async def run_bulk_command(interaction: discord.Interaction, title: str, selection: BulkSelection, action, confirm: bool):
+    """
+    Gemeinsamer Ablauf der Massenaktionen: ohne `confirm` nur Vorschau der ausgewählten Tickets, sonst Ausführung mit
+    BULK_CONCURRENCY Tickets gleichzeitig in der niedrigen Spur des REST-Schedulers (Klicks anderer Moderatoren haben
+    Vorrang) und Fortschritt alle BULK_PROGRESS_INTERVAL Sekunden in der Antwort.
+    """
+    structured_log.bind_interaction(interaction)
+    if not is_ticket_staff(client, interaction):
+        await interaction.response.send_message("Du hast nicht die erforderlichen Berechtigungen, um diese Aktion auszuführen.", ephemeral=True)
+        return
+    def thread_name(thread_id: int):
+        thread = client.get_channel(thread_id)
+        return thread.name if isinstance(thread, discord.Thread) else None
+    records = select_tickets(client.ticket_store, interaction.guild_id, selection, thread_name)
+    description = selection.describe(client.get_category_registry(interaction.guild_id))
+    if not records:
+        await interaction.response.send_message(f"Keine passenden offenen Tickets ({description}).", ephemeral=True)
+        return
+    if not confirm:
+        lines = [f"<#{record.thread_id}> · <@{record.creator_id}> · <t:{int(record.created_at)}:R>" for record in records[:BULK_PREVIEW_ROWS]]
+        if len(records) > BULK_PREVIEW_ROWS:
+            lines.append(f"… und {len(records) - BULK_PREVIEW_ROWS} weitere")
+        embed = Embed(title=f"{title}: {len(records)} Ticket(s)", description=f"{description}\n\n" + "\n".join(lines), color=discord.Color.orange())
+        embed.set_footer(text="Vorschau – zum Ausführen den Befehl mit confirm: True wiederholen.")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    progress = BulkProgress(len(records))
+    async def report(progress: BulkProgress):
+        await interaction.edit_original_response(embed=bulk_progress_embed(title, description, progress))
+    log.info("Massenaktion '%s' gestartet: %d Tickets (%s).", title, len(records), description)
+    with rest_scheduler.lane(rest_scheduler.LANE_LOW):
+        await run_bulk(records, action, progress, BULK_CONCURRENCY, report, BULK_PROGRESS_INTERVAL)
+    log.info("Massenaktion '%s' beendet: %s", title, progress.summary())
+    client.ticket_log.submit(interaction.guild_id, interaction.user, f"Massenaktion {title}", f"{description}\n{progress.summary()}", discord.Color.dark_grey())
+    try:
+        await interaction.edit_original_response(embed=bulk_progress_embed(title, description, progress, done=True))
+    except discord.HTTPException as e: # Interaktions-Token ist nach 15 Minuten abgelaufen, die Zusammenfassung steht im Log-Kanal
+        log.warning("Zusammenfassung der Massenaktion konnte nicht gesendet werden: %s", e)
+
+@tickets_group.command(name="bulk_close", description="Schließt alle passenden offenen Tickets (ohne confirm nur Vorschau).")
+@app_commands.describe(category="Nur Tickets dieser Kategorie", older_than_hours="Nur Tickets, die älter als so viele Stunden sind",
+                       creator="Nur Tickets dieses Erstellers", claimed_by="Nur Tickets, die dieser Moderator geclaimed hat",
+                       name_prefix="Nur Threads, deren Name so beginnt, z.B. [Offen]", reason="Grund für Ersteller und Log",
+                       confirm="True: ausführen, sonst nur Vorschau")
+@app_commands.autocomplete(category=ticket_category_autocomplete)
+async def tickets_bulk_close_command(interaction: discord.Interaction, category: str = None, older_than_hours: app_commands.Range[int, 0, 8760] = 0,
+                                     creator: discord.User = None, claimed_by: discord.User = None, name_prefix: str = None,
+                                     reason: str = "Massenschließung durch das Team.", confirm: bool = False):
+    selection = bulk_selection(category, older_than_hours, creator, claimed_by, name_prefix)
+    closer = interaction.user
+    async def close(record: TicketRecord) -> str:
+        resolved = await resolve_bulk_ticket(record, selection)
+        if resolved is None:
+            return RESULT_SKIPPED
+        thread, message = resolved
+        return RESULT_DONE if await client.ticket_actions.close_ticket(thread, message, closer, reason) else RESULT_SKIPPED
+    await run_bulk_command(interaction, "Schließen", selection, close, confirm)
+
+@tickets_group.command(name="bulk_claim", description="Claimt alle passenden ungeclaimten Tickets für dich (ohne confirm nur Vorschau).")
+@app_commands.describe(category="Nur Tickets dieser Kategorie", older_than_hours="Nur Tickets, die älter als so viele Stunden sind",
+                       creator="Nur Tickets dieses Erstellers", name_prefix="Nur Threads, deren Name so beginnt, z.B. [Offen]",
+                       confirm="True: ausführen, sonst nur Vorschau")
+@app_commands.autocomplete(category=ticket_category_autocomplete)
+async def tickets_bulk_claim_command(interaction: discord.Interaction, category: str = None, older_than_hours: app_commands.Range[int, 0, 8760] = 0,
+                                     creator: discord.User = None, name_prefix: str = None, confirm: bool = False):
+    selection = bulk_selection(category, older_than_hours, creator, name_prefix=name_prefix, unclaimed_only=True)
+    claimer = interaction.user
+    async def claim(record: TicketRecord) -> str:
+        resolved = await resolve_bulk_ticket(record, selection)
+        if resolved is None or await client.ticket_actions.claim_ticket(record, claimer, f"{claimer.id}:{interaction.id}") != CLAIM_OK:
+            return RESULT_SKIPPED
+        thread, message = resolved
+        if message:
+            await message.edit(embed=claimed_embed(message, claimer), view=render_ticket_actions(STATUS_CLAIMED))
+        client.ticket_log.submit(interaction.guild_id, claimer, "Ticket Geclaimed",
+                                 f"Ticket von <@{record.creator_id}> wurde von {claimer.mention} geclaimed (Massenaktion).", discord.Color.green(), thread.id)
+        return RESULT_DONE
+    await run_bulk_command(interaction, "Claimen", selection, claim, confirm)
+
+@tickets_group.command(name="bulk_reassign", description="Weist alle passenden offenen Tickets einem Moderator zu (ohne confirm nur Vorschau).")
+@app_commands.describe(moderator="Neuer zuständiger Moderator", category="Nur Tickets dieser Kategorie",
+                       older_than_hours="Nur Tickets, die älter als so viele Stunden sind", creator="Nur Tickets dieses Erstellers",
+                       claimed_by="Nur Tickets, die dieser Moderator geclaimed hat (z.B. abwesend)",
+                       name_prefix="Nur Threads, deren Name so beginnt, z.B. [Offen]", confirm="True: ausführen, sonst nur Vorschau")
+@app_commands.autocomplete(category=ticket_category_autocomplete)
+async def tickets_bulk_reassign_command(interaction: discord.Interaction, moderator: discord.Member, category: str = None,
+                                        older_than_hours: app_commands.Range[int, 0, 8760] = 0, creator: discord.User = None,
+                                        claimed_by: discord.User = None, name_prefix: str = None, confirm: bool = False):
+    if moderator.bot:
+        await interaction.response.send_message("Fehler: Tickets können keinem Bot zugewiesen werden.", ephemeral=True)
+        return
+    selection = bulk_selection(category, older_than_hours, creator, claimed_by, name_prefix)
+    async def reassign(record: TicketRecord) -> str:
+        previous = f"<@{record.claimer_id}>" if record.claimer_id else "niemandem"
+        resolved = await resolve_bulk_ticket(record, selection)
+        if resolved is None or not await client.ticket_actions.reassign_ticket(record, moderator):
+            return RESULT_SKIPPED
+        thread, message = resolved
+        if message:
+            await message.edit(embed=claimed_embed(message, moderator), view=render_ticket_actions(STATUS_CLAIMED))
+        client.ticket_log.submit(interaction.guild_id, interaction.user, "Ticket Neu Zugewiesen",
+                                 f"Ticket von <@{record.creator_id}> wurde von {previous} an {moderator.mention} übergeben.", discord.Color.green(), thread.id)
+        return RESULT_DONE
+    await run_bulk_command(interaction, "Neu zuweisen", selection, reassign, confirm)
+
+client.tree.add_command(tickets_group)
+
+# --- Slash-Befehl: Ticket-Statistiken ---
+STATS_GROUP_TITLES = {"category": "Pro Kategorie", "moderator": "Pro Moderator", "hour": "Pro Stunde der Erstellung (UTC)"}
+STATS_MAX_ROWS = 10
+
+@client.tree.command(name="ticket_stats", description="Zeigt Zeit bis Claim und bis Schließen der Tickets dieses Servers.")
+@app_commands.describe(days="Nur Tickets der letzten so vielen Tage", group="Gruppierung der Tabelle")
+@app_commands.choices(group=[app_commands.Choice(name="Kategorie", value="category"),
+                             app_commands.Choice(name="Moderator", value="moderator"),
+                             app_commands.Choice(name="Stunde der Erstellung", value="hour")])
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_threads=True)
+async def ticket_stats_command(interaction: discord.Interaction, days: app_commands.Range[int, 1, 3650] = 30, group: str = "category"):
+    structured_log.bind_interaction(interaction)
+    if not is_ticket_staff(client, interaction):
+        await interaction.response.send_message("Du hast nicht die erforderlichen Berechtigungen, um diese Aktion auszuführen.", ephemeral=True)
+        return
+    if client.ticket_events is None or group not in GROUPS:
+        await interaction.response.send_message("Ticket-Statistiken sind deaktiviert (TICKET_EVENTS_DIR).", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    await client.ticket_events.flush() # Gepufferte Ereignisse mit auswerten
+    since = time.time() - days * 86400
+    # Laden und Auswerten blockieren nicht die Event-Loop (NumPy, sonst array-Modul)
+    result = await asyncio.to_thread(lambda: compute_stats(load_events(client.ticket_events.directory), interaction.guild_id, since))
+
+    registry = client.get_category_registry(interaction.guild_id)
+    def label(key) -> str:
+        if group == "moderator":
+            return f"<@{key}>"
+        if group == "hour":
+            return f"{key:02d} Uhr"
+        category = registry.get(key)
+        return category.label if category else str(key)
+
+    embed = Embed(title=f"Ticket-Statistiken (letzte {days} Tage)", color=discord.Color.blue(),
+                  description=format_row("Gesamt", result["time_to_claim"]["all"], result["time_to_close"]["all"]))
+    lines = [format_row(label(key), claim, close) for key, claim, close in group_rows(result, group, STATS_MAX_ROWS)]
+    value = ""
+    for line in lines: # Feldwert ist auf 1024 Zeichen begrenzt
+        if len(value) + len(line) + 1 > 1024:
+            break
+        value += line + "\n"
+    embed.add_field(name=STATS_GROUP_TITLES[group], value=value or "Keine Daten.", inline=False)
+    embed.set_footer(text=f"{result['tickets']} Tickets erstellt · Median und 90. Perzentil")
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
 # --- Start des Bots ---
 if __name__ == "__main__":
     if not DISCORD_TOKEN:
-        print("FEHLER: DISCORD_TOKEN nicht in .env gefunden.")
-    elif not OPEN_TICKET_CHANNEL_ID:
-        print("FEHLER: OPEN_TICKET_CHANNEL_ID nicht in .env gefunden oder ist 0.")
-    elif not APPEALS_FORUM_ID:
-        print("FEHLER: APPEALS_FORUM_ID nicht in .env gefunden oder ist 0.")
+        log.error("DISCORD_TOKEN nicht in .env gefunden.")
     else:
-        client.run(DISCORD_TOKEN)
+        if not APPEALS_FORUM_ID and not any(True for _ in client.guild_configs):
+            log.warning("Weder APPEALS_FORUM_ID in .env noch Einträge in guild_configs.json gefunden. Server können mit /ticket_config eingerichtet werden.")
+        # --force-sync: Slash-Befehle auch ohne Änderung am Befehlsbaum synchronisieren
+        client.force_sync = "--force-sync" in sys.argv[1:]
+        # log_handler=None: discord.py schreibt über das eingerichtete Logging statt eines eigenen Handlers
+        client.run(DISCORD_TOKEN, log_handler=None)
+    log_pipeline.stop()
@@ -0,0 +1,145 @@
+"""
+Massenaktionen für Moderatoren (/tickets bulk_close, bulk_claim, bulk_reassign).
+
+Die Auswahl läuft über den Speicher-Index der Guild wie bei den Ticket-Listen (ticket_queue.py); der Thread-Name wird
+nur geprüft, wenn der Thread bekannt ist. Ausgeführt wird mit höchstens `concurrency` Tickets gleichzeitig; die
+REST-Aufrufe laufen zusätzlich durch den REST-Scheduler und bleiben so unter dem globalen Limit. Der Fortschritt wird
+in festen Abständen gemeldet, nicht pro Ticket.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from category_registry import CategoryRegistry
+from ticket_store import STATUS_OPEN, TicketRecord, TicketStore
+
+log = logging.getLogger(__name__)
+
+# Ergebnis einer Aktion für ein Ticket
+RESULT_DONE = "done"
+RESULT_SKIPPED = "skipped" # z.B. schon geschlossen, schon geclaimed, Name passt nicht
+RESULT_FAILED = "failed"
+
+MAX_REPORTED_ERRORS = 5
+
+
+@dataclass(frozen=True)
+class BulkSelection:
+    """Filter einer Massenaktion; leere Werte filtern nicht."""
+    category_id: str = ""
+    created_before: float = 0 # Unix-Zeit
+    creator_id: Optional[int] = None
+    claimer_id: Optional[int] = None
+    name_prefix: str = ""      # z.B. "[Offen]"
+    unclaimed_only: bool = False
+
+    def matches(self, record: TicketRecord) -> bool:
+        if not record.is_open:
+            return False
+        if self.unclaimed_only and record.status != STATUS_OPEN:
+            return False
+        if self.category_id and record.category_id != self.category_id:
+            return False
+        if self.created_before and record.created_at >= self.created_before:
+            return False
+        if self.creator_id is not None and record.creator_id != self.creator_id:
+            return False
+        return self.claimer_id is None or record.claimer_id == self.claimer_id
+
+    def matches_name(self, name: Optional[str]) -> bool:
+        """Namensfilter; ein unbekannter Name (Thread nicht im Cache) passt vorerst und wird beim Ausführen geprüft."""
+        return not self.name_prefix or name is None or name.startswith(self.name_prefix)
+
+    def describe(self, registry: Optional[CategoryRegistry] = None) -> str:
+        filters = []
+        if self.category_id:
+            category = registry.get(self.category_id) if registry else None
+            filters.append(f"Kategorie: {category.label if category else self.category_id}")
+        if self.created_before:
+            filters.append(f"erstellt vor {time.strftime('%d.%m.%Y %H:%M', time.gmtime(self.created_before))} UTC")
+        if self.creator_id is not None:
+            filters.append(f"Ersteller: <@{self.creator_id}>")
+        if self.claimer_id is not None:
+            filters.append(f"geclaimed von <@{self.claimer_id}>")
+        if self.name_prefix:
+            filters.append(f"Name beginnt mit „{self.name_prefix}“")
+        if self.unclaimed_only:
+            filters.append("nur ungeclaimte")
+        return " · ".join(filters) or "alle offenen Tickets"
+
+
+def select_tickets(store: TicketStore, guild_id: int, selection: BulkSelection,
+                   thread_name: Callable[[int], Optional[str]] = lambda thread_id: None) -> List[TicketRecord]:
+    """Passende offene Tickets der Guild, älteste zuerst. `thread_name` liefert den Namen aus dem Cache (kein REST-Aufruf)."""
+    records = [record for record in store.open_in_guild(guild_id)
+               if selection.matches(record) and selection.matches_name(thread_name(record.thread_id))]
+    records.sort(key=lambda record: record.created_at)
+    return records
+
+
+@dataclass
+class BulkProgress:
+    total: int
+    done: int = 0
+    skipped: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.monotonic)
+    errors: List[str] = field(default_factory=list) # Die ersten MAX_REPORTED_ERRORS Fehler
+
+    @property
+    def finished(self) -> int:
+        return self.done + self.skipped + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def record(self, result: str):
+        if result == RESULT_DONE:
+            self.done += 1
+        elif result == RESULT_SKIPPED:
+            self.skipped += 1
+        else:
+            self.failed += 1
+
+    def summary(self) -> str:
+        return (f"{self.finished}/{self.total} bearbeitet in {self.elapsed:.0f}s: {self.done} erledigt, "
+                f"{self.skipped} übersprungen, {self.failed} fehlgeschlagen")
+
+
+async def run_bulk(records: Iterable[TicketRecord], action: Callable[[TicketRecord], Awaitable[str]], progress: BulkProgress,
+                   concurrency: int = 5, report: Callable[[BulkProgress], Awaitable[None]] = None, report_interval: float = 5.0):
+    """
+    Führt `action` für alle Tickets aus, höchstens `concurrency` gleichzeitig (feste Zahl an Workern statt eines Tasks
+    pro Ticket). `action` liefert RESULT_DONE oder RESULT_SKIPPED; Ausnahmen zählen als fehlgeschlagen und brechen die
+    übrigen Tickets nicht ab. `report` wird alle `report_interval` Sekunden aufgerufen, Fehler darin werden nur geloggt.
+    """
+    pending = iter(records)
+
+    async def worker():
+        for record in pending: # Gemeinsamer Iterator: jedes Ticket wird genau einem Worker zugeteilt
+            try:
+                progress.record(await action(record))
+            except Exception as e:
+                progress.record(RESULT_FAILED)
+                log.warning("Massenaktion für Ticket %s fehlgeschlagen: %s", record.thread_id, e)
+                if len(progress.errors) < MAX_REPORTED_ERRORS:
+                    progress.errors.append(f"<#{record.thread_id}>: {e}")
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(report_interval)
+            try:
+                await report(progress)
+            except Exception as e:
+                log.warning("Fortschritt der Massenaktion konnte nicht gemeldet werden: %s", e)
+
+    reporter_task = asyncio.create_task(reporter(), name="bulk-progress") if report else None
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        if reporter_task:
+            reporter_task.cancel()
+    return progress
@@ -0,0 +1,134 @@
+import os
+
+import discord
+from discord.ui import Modal, TextInput
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Discord erlaubt max. 100 Zeichen für Custom IDs
+MAX_CUSTOM_ID_LENGTH = 100
+# Nicht abgeschickte Modals werden nach dieser Zeit aus dem View-Store entfernt
+MODAL_TIMEOUT_SECONDS = 15 * 60
+
+
+def categories_file_path(directory: str, name: str) -> str:
+    """
+    Pfad einer eigenen Kategorien-Datei, die ein Server-Admin per /ticket_config wählt. Erlaubt ist nur ein Dateiname
+    (`*.json`) im Kategorien-Verzeichnis, keine Pfade. Wirft ValueError mit einer Meldung für den Admin.
+    """
+    name = name.strip()
+    if (not name or name != os.path.basename(name) or "/" in name or "\\" in name or name.startswith(".")
+            or not name.lower().endswith(".json")):
+        raise ValueError("Nur ein Dateiname mit Endung `.json` aus dem Kategorien-Verzeichnis ist erlaubt, kein Pfad.")
+    path = os.path.join(directory, name)
+    root = os.path.realpath(directory)
+    if os.path.dirname(os.path.realpath(path)) != root: # z.B. symbolischer Link aus dem Verzeichnis heraus
+        raise ValueError("Nur Dateien direkt im Kategorien-Verzeichnis sind erlaubt.")
+    return path
+
+
+class DynamicTicketModal(Modal):
+    """
+    Ticket-Modal für eine Kategorie. Die Klasse existiert nur einmal; pro Klick wird lediglich eine Instanz
+    mit den vorab berechneten Feldern der Kategorie erzeugt.
+    """
+
+    def __init__(self, category: 'CompiledCategory', final_callback: Callable, instance_key: int):
+        # Pro Interaktion eine eigene Custom ID, da discord.py Modals nur nach Custom ID zuordnet
+        # und sich gleichzeitige Eingaben verschiedener Benutzer sonst gegenseitig überschreiben würden.
+        suffix = f":{instance_key}"
+        custom_id = category.modal_custom_id[:MAX_CUSTOM_ID_LENGTH - len(suffix)] + suffix
+        super().__init__(title=category.modal_title, custom_id=custom_id, timeout=MODAL_TIMEOUT_SECONDS)
+        self.final_submit_callback = final_callback # z.B. create_ticket_thread_after_modal
+        self.category_id = category.category_id
+
+        for field_kwargs in category.text_inputs:
+            self.add_item(TextInput(**field_kwargs))
+
+    async def on_submit(self, interaction: discord.Interaction):
+        # Extrahiere Antworten aus dem Modal
+        responses = {item.custom_id: item.value for item in self.children if isinstance(item, TextInput)}
+
+        # Wichtig: Die Interaktion vom Modal muss zunächst bestätigt werden (defer oder send_message)
+        # bevor der langlaufende Thread-Erstellungsprozess beginnt.
+        await interaction.response.defer(ephemeral=True, thinking=True) # Zeigt "Bot denkt nach..."
+
+        await self.final_submit_callback(interaction, self.category_id, responses)
+
+
+class CompiledCategory:
+    """Vorberechnete Darstellung einer Kategorie aus ticket_categories.json."""
+    __slots__ = ("category_id", "config", "button_custom_id", "button_label", "button_style",
+                 "forum_tag_name", "modal_title", "modal_custom_id", "questions", "text_inputs")
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.category_id: str = config["category_id"]
+        self.button_custom_id: str = config["button_custom_id"]
+
+        button_label = config.get("button_label", "N/A")
+        if config.get("button_emoji"):
+            button_label = f"{config['button_emoji']} {button_label}"
+        self.button_label: str = button_label
+        style_str = config.get("button_style", "secondary").lower()
+        self.button_style: discord.ButtonStyle = getattr(discord.ButtonStyle, style_str, discord.ButtonStyle.secondary)
+
+        self.forum_tag_name: Optional[str] = config.get("forum_tag_name")
+        self.modal_title: str = config.get("modal_title", "Ticket Details")[:45] # Discord-Limit für Modal-Titel
+        self.modal_custom_id: str = f"ticket_modal_{self.category_id}"
+        self.questions: List[dict] = config.get("modal_questions", [])
+
+        # Argumente der TextInputs einmalig berechnen; Instanzen entstehen pro Modal, da sie die Eingaben halten
+        self.text_inputs: List[dict] = []
+        for q_config in self.questions:
+            text_style = discord.TextStyle.short
+            if q_config.get("style", "short").lower() == "paragraph":
+                text_style = discord.TextStyle.paragraph
+            self.text_inputs.append(dict(
+                label=q_config["label"],
+                custom_id=q_config["id"], # Eindeutige ID für dieses Feld
+                style=text_style,
+                placeholder=q_config.get("placeholder"),
+                required=q_config.get("required", False),
+                max_length=q_config.get("max_length"), # Discord erlaubt bis zu 4000 Zeichen
+            ))
+
+    @property
+    def label(self) -> str:
+        """Button-Label ohne Emoji, wird als Ticket-Typ-Name verwendet."""
+        return self.config["button_label"]
+
+    def build_modal(self, final_callback: Callable, instance_key: int) -> DynamicTicketModal:
+        return DynamicTicketModal(self, final_callback, instance_key)
+
+
+class CategoryRegistry:
+    """
+    Einmalig kompilierte Ticket-Kategorien mit O(1)-Zugriff über category_id und button_custom_id.
+    Die Reihenfolge der Kategorien (für das Panel) bleibt erhalten.
+    """
+
+    def __init__(self, categories: List[dict]):
+        self._ordered: List[CompiledCategory] = [CompiledCategory(cat) for cat in categories]
+        self.by_id: Dict[str, CompiledCategory] = {cat.category_id: cat for cat in self._ordered}
+        self.by_custom_id: Dict[str, CompiledCategory] = {cat.button_custom_id: cat for cat in self._ordered}
+
+    @classmethod
+    def union(cls, registries: Iterable['CategoryRegistry']) -> 'CategoryRegistry':
+        """Vereinigt mehrere Registries; jede button_custom_id kommt nur einmal vor (erste gewinnt)."""
+        merged: Dict[str, dict] = {}
+        for registry in registries:
+            for category in registry:
+                merged.setdefault(category.button_custom_id, category.config)
+        return cls(list(merged.values()))
+
+    def __iter__(self) -> Iterator[CompiledCategory]:
+        return iter(self._ordered)
+
+    def __len__(self) -> int:
+        return len(self._ordered)
+
+    def get(self, category_id: str) -> Optional[CompiledCategory]:
+        return self.by_id.get(category_id)
+
+    def get_by_custom_id(self, custom_id: str) -> Optional[CompiledCategory]:
+        return self.by_custom_id.get(custom_id)
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+import discord
+from discord import app_commands
+
+
+def compute_command_hash(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """
+    SHA-256 über die serialisierten Befehle, genau so wie sie bei tree.sync(guild=guild) an Discord gesendet würden:
+    Slash-Befehle und Kontextmenüs des Ziels. Globale Befehle gehören zum Ziel "global" und haben ihren eigenen Hash.
+    """
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+    serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class CommandSyncState:
+    """
+    Merkt sich pro Anwendung und Ziel (global oder Guild) den Hash des zuletzt synchronisierten Befehlsbaums.
+    tree.sync() ist ein stark rate-limitierter REST-Aufruf und wird nur noch ausgeführt, wenn sich der Hash ändert.
+    """
+
+    def __init__(self, path: str = "command_sync.json"):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._hashes = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._hashes = {}
+
+    @staticmethod
+    def _key(application_id: int, guild: Optional[discord.abc.Snowflake]) -> str:
+        return f"{application_id}:{guild.id if guild else 'global'}"
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._hashes, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    async def sync(self, tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None, force: bool = False) -> bool:
+        """Synchronisiert den Befehlsbaum, falls er sich seit dem letzten Sync geändert hat. Gibt True zurück, wenn synchronisiert wurde."""
+        key = self._key(tree.client.application_id, guild)
+        command_hash = compute_command_hash(tree, guild)
+        if not force and self._hashes.get(key) == command_hash:
+            return False
+        await tree.sync(guild=guild)
+        # Erst nach erfolgreichem Sync speichern, sonst wird beim nächsten Start erneut versucht
+        self._hashes[key] = command_hash
+        self._save()
+        return True
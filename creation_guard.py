@@ -0,0 +1,117 @@
+import asyncio
+import os
+import socket
+import time
+from typing import Dict, Optional, Tuple
+
+from ticket_store import TicketStore
+
+# So lange gilt eine Erstellung als laufend bzw. wird ihr Ergebnis für erneute Absendungen gemerkt (Sekunden)
+CREATION_TTL_SECONDS = 30.0
+# Prüfintervall, während ein anderer Prozess dasselbe Ticket erstellt
+FOREIGN_POLL_INTERVAL_SECONDS = 0.5
+
+CreationKey = Tuple[Optional[int], int, str] # (Guild-ID, Ersteller-ID, Kategorie-ID)
+
+
+class _InFlight:
+    __slots__ = ("future", "expires_at")
+
+    def __init__(self, future: asyncio.Future, expires_at: float):
+        self.future = future
+        self.expires_at = expires_at
+
+
+class CreationGuard:
+    """
+    Verhindert doppelte Ticket-Threads, wenn ein Benutzer unter Lag mehrfach absendet oder Discord eine Interaktion
+    wiederholt. Pro (Guild, Benutzer, Kategorie) darf nur eine Erstellung laufen; weitere Absendungen warten auf deren
+    Ergebnis. Ein bereits offenes Ticket in der Kategorie wird zurückgegeben, statt ein neues zu erstellen.
+    Über eine Reservierungstabelle in der Ticket-Datenbank gilt das auch für mehrere Bot-Prozesse.
+    """
+
+    def __init__(self, store: TicketStore, ttl: float = CREATION_TTL_SECONDS):
+        self.store = store
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._in_flight: Dict[CreationKey, _InFlight] = {}
+        self._last_sweep = time.monotonic()
+        # Zähler
+        self.created = 0
+        self.deduplicated = 0
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._in_flight), "created": self.created, "deduplicated": self.deduplicated}
+
+    def _sweep(self, now: float):
+        for key in [key for key, entry in self._in_flight.items() if entry.future.done() and entry.expires_at <= now]:
+            del self._in_flight[key]
+        self._last_sweep = now
+
+    def _open_thread_id(self, thread_id: Optional[int]) -> Optional[int]:
+        record = self.store.get(thread_id) if thread_id else None
+        return thread_id if record and record.is_open else None
+
+    async def acquire(self, key: CreationKey) -> Optional[int]:
+        """
+        Liefert die Thread-ID eines bestehenden oder gerade entstehenden Tickets für `key`.
+        None bedeutet: der Aufrufer soll das Ticket erstellen und muss danach `finish(key, thread_id)` aufrufen.
+        """
+        while True:
+            now = time.monotonic()
+            if now - self._last_sweep >= self.ttl:
+                self._sweep(now)
+
+            entry = self._in_flight.get(key)
+            if entry and (not entry.future.done() or entry.expires_at > now):
+                if not entry.future.done():
+                    thread_id = await asyncio.shield(entry.future)
+                else:
+                    thread_id = entry.future.result()
+                thread_id = self._open_thread_id(thread_id)
+                if thread_id:
+                    self.deduplicated += 1
+                    return thread_id
+                if self._in_flight.get(key) is entry:
+                    del self._in_flight[key] # Fehlgeschlagen oder inzwischen geschlossen: neu prüfen
+                continue
+
+            record = self.store.find_open(*key)
+            if record:
+                self.deduplicated += 1
+                return record.thread_id
+
+            # Zwischen Prüfung und Eintragen liegt kein await, gleichzeitige Absendungen in diesem Prozess warten ab hier
+            self._in_flight[key] = _InFlight(asyncio.get_running_loop().create_future(), now + self.ttl)
+            if self.store.try_lock_creation(*key, owner=self.owner, ttl=self.ttl):
+                return None
+
+            # Ein anderer Prozess erstellt dieses Ticket gerade: auf sein Ergebnis in der Datenbank warten
+            del self._in_flight[key]
+            thread_id = await self._wait_for_foreign(key)
+            if thread_id:
+                self.deduplicated += 1
+                return thread_id
+
+    async def _wait_for_foreign(self, key: CreationKey) -> Optional[int]:
+        deadline = time.monotonic() + self.ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(FOREIGN_POLL_INTERVAL_SECONDS)
+            record = self.store.find_open(*key)
+            if record:
+                return record.thread_id
+            if not self.store.is_creation_locked(*key):
+                return None # Der andere Prozess ist fertig, ohne ein Ticket zu erstellen
+        return None
+
+    def finish(self, key: CreationKey, thread_id: Optional[int]):
+        """Beendet eine mit `acquire` begonnene Erstellung; wartende Absendungen erhalten `thread_id`."""
+        entry = self._in_flight.get(key)
+        if entry and not entry.future.done():
+            entry.future.set_result(thread_id)
+            entry.expires_at = time.monotonic() + self.ttl
+            if not thread_id:
+                del self._in_flight[key]
+        if thread_id:
+            self.created += 1
+        self.store.unlock_creation(*key, owner=self.owner)
@@ -0,0 +1,124 @@
+"""
+Nachweise (Logs, Screenshots, ...), die Benutzer in ihrem Ticket-Thread hochladen.
+
+Jeder Anhang wird vor dem Download anhand von Dateiname, Content-Type und angegebener Größe geprüft und dann in
+Blöcken vom CDN gelesen: der SHA-256 wird beim Lesen berechnet, jeder Block sofort (in einem Worker-Thread) in eine
+temporäre Datei geschrieben, und der Download bricht ab, sobald mehr als `max_bytes` ankommen. Im Speicher liegt damit
+höchstens ein Block pro Download. Abgelegt wird nach Inhalt (`<guild>/<sha256[:2]>/<sha256>`), dieselbe Datei in
+mehreren Tickets derselben Guild liegt also nur einmal auf der Platte; der Index pro Ticket steht in der Ticket-Datenbank.
+CDN-Downloads zählen nicht zum REST-Limit des Bots und laufen daher nicht über den REST-Scheduler, sind aber auf
+`max_concurrent` gleichzeitige Downloads begrenzt.
+"""
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import aiohttp
+import discord
+
+# Größe der Blöcke beim Lesen vom CDN
+CHUNK_SIZE = 256 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 120
+# Standard für TICKET_EVIDENCE_TYPES: Präfixe (enden auf "/"), vollständige Content-Types oder Dateiendungen (mit ".")
+DEFAULT_ALLOWED_TYPES = "image/,text/,video/mp4,application/pdf,application/json,application/zip,.log,.txt,.zip"
+
+
+class EvidenceRejected(ValueError):
+    """Anhang wird nicht übernommen (zu groß, Typ nicht erlaubt, ...); die Meldung ist für den Benutzer gedacht."""
+
+
+@dataclass(frozen=True)
+class EvidenceFile:
+    sha256: str
+    path: str
+    size_bytes: int
+    content_type: str
+    existed: bool # Gleicher Inhalt lag schon im Archiv (z.B. aus einem anderen Ticket)
+
+
+def parse_allowed_types(value: Optional[str]) -> Tuple[str, ...]:
+    """Liest die kommagetrennte Liste erlaubter Typen, z.B. "image/,application/pdf,.log"."""
+    return tuple(entry.strip().lower() for entry in (value or DEFAULT_ALLOWED_TYPES).split(",") if entry.strip())
+
+
+class EvidenceStore:
+    def __init__(self, directory: str = "evidence", max_bytes: int = 8 * 1024 * 1024,
+                 allowed_types: Tuple[str, ...] = parse_allowed_types(None), max_concurrent: int = 4):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.allowed_types = allowed_types
+        self._downloads = asyncio.Semaphore(max_concurrent)
+        self._session = None # aiohttp.ClientSession, wird beim ersten Download erzeugt
+
+    def path_for(self, guild_id: int, sha256: str) -> str:
+        return os.path.join(self.directory, str(guild_id), sha256[:2], sha256)
+
+    def content_type_of(self, attachment: discord.Attachment) -> str:
+        return (attachment.content_type or "application/octet-stream").split(";")[0].strip().lower()
+
+    def check(self, attachment: discord.Attachment):
+        """Prüft die Angaben des Anhangs ohne Download. Wirft EvidenceRejected."""
+        if attachment.size > self.max_bytes:
+            raise EvidenceRejected(f"größer als {self.max_bytes // (1024 * 1024)} MB")
+        content_type = self.content_type_of(attachment)
+        extension = os.path.splitext(attachment.filename)[1].lower()
+        for allowed in self.allowed_types:
+            if allowed.startswith("."):
+                if extension == allowed:
+                    return
+            elif content_type == allowed or (allowed.endswith("/") and content_type.startswith(allowed)):
+                return
+        raise EvidenceRejected(f"Dateityp `{content_type}` ist nicht erlaubt")
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT_SECONDS))
+        return self._session
+
+    async def store(self, guild_id: int, attachment: discord.Attachment) -> EvidenceFile:
+        """Prüft, lädt und speichert einen Anhang. Wirft EvidenceRejected; Netzwerkfehler (OSError, Timeout) wiederholbar."""
+        self.check(attachment)
+        async with self._downloads:
+            session = await self._get_session()
+            tmp_path = os.path.join(self.directory, str(guild_id), f".{attachment.id}.part")
+            await asyncio.to_thread(os.makedirs, os.path.dirname(tmp_path), exist_ok=True)
+            output = await asyncio.to_thread(open, tmp_path, "wb")
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                async with session.get(attachment.url) as response:
+                    if response.status >= 500:
+                        raise ConnectionError(f"CDN antwortete mit {response.status}")
+                    if response.status != 200:
+                        raise EvidenceRejected(f"Download fehlgeschlagen ({response.status})")
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_bytes: # Angabe im Anhang war falsch, nicht weiter lesen
+                            raise EvidenceRejected(f"größer als {self.max_bytes // (1024 * 1024)} MB")
+                        digest.update(chunk)
+                        await asyncio.to_thread(output.write, chunk)
+            except aiohttp.ClientError as e: # Abgebrochene Verbindung o.ä.: als ConnectionError wiederholbar
+                await asyncio.to_thread(output.close)
+                await asyncio.to_thread(os.remove, tmp_path)
+                raise ConnectionError(f"Download von {attachment.filename} fehlgeschlagen: {e}") from e
+            except BaseException:
+                await asyncio.to_thread(output.close)
+                await asyncio.to_thread(os.remove, tmp_path)
+                raise
+            await asyncio.to_thread(output.close)
+
+        sha256 = digest.hexdigest()
+        path = self.path_for(guild_id, sha256)
+        existed = os.path.exists(path)
+        if existed:
+            await asyncio.to_thread(os.remove, tmp_path)
+        else:
+            await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+            await asyncio.to_thread(os.replace, tmp_path, path) # Erst vollständige Dateien erscheinen im Archiv
+        return EvidenceFile(sha256, path, size, self.content_type_of(attachment), existed)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
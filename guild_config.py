@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict, replace
+from typing import Dict, FrozenSet, Optional
+
+log = logging.getLogger(__name__)
+
+try:
+    import fcntl # Nur Unix; unter Windows wird ohne Dateisperre geschrieben
+except ImportError:
+    fcntl = None
+
+
+@dataclass(frozen=True)
+class GuildConfig:
+    """Ticket-Konfiguration einer Guild (Kanäle, Rollen, Kategorien-Datei)."""
+    guild_id: Optional[int] # None = Standard-Konfiguration aus der .env
+    open_ticket_channel_id: Optional[int] = None
+    appeals_forum_id: Optional[int] = None
+    log_channel_id: Optional[int] = None
+    ping_role_id: Optional[int] = None
+    closer_role_ids: FrozenSet[int] = field(default_factory=frozenset)
+    # Eigene Kategorien-Datei; None = ticket_categories.json
+    categories_file: Optional[str] = None
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        data.pop("guild_id")
+        data["closer_role_ids"] = sorted(self.closer_role_ids)
+        return data
+
+    @classmethod
+    def from_json(cls, guild_id: int, data: dict) -> 'GuildConfig':
+        def opt_int(key):
+            value = data.get(key)
+            return int(value) if value not in (None, "") else None
+        return cls(
+            guild_id=guild_id,
+            open_ticket_channel_id=opt_int("open_ticket_channel_id"),
+            appeals_forum_id=opt_int("appeals_forum_id"),
+            log_channel_id=opt_int("log_channel_id"),
+            ping_role_id=opt_int("ping_role_id"),
+            closer_role_ids=frozenset(int(r) for r in data.get("closer_role_ids", [])),
+            categories_file=data.get("categories_file") or None,
+        )
+
+
+class GuildConfigStore:
+    """
+    Guild-Konfigurationen aus guild_configs.json, im Speicher nach Guild-ID gehalten.
+    Guilds ohne eigenen Eintrag verwenden die Standard-Konfiguration aus der .env; Kanäle werden immer über
+    die jeweilige Guild aufgelöst, sodass die Standard-Konfiguration nur auf dem Server greift, dem die Kanäle gehören.
+    """
+
+    def __init__(self, default: GuildConfig, path: str = "guild_configs.json"):
+        self.default = default
+        self.path = path
+        self._configs: Dict[int, GuildConfig] = {}
+        self.load()
+
+    def load(self, verbose: bool = True):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError as e:
+            log.error("%s ist nicht valides JSON: %s", self.path, e)
+            return
+        configs = {}
+        for guild_id_str, data in raw.items():
+            try:
+                configs[int(guild_id_str)] = GuildConfig.from_json(int(guild_id_str), data)
+            except (TypeError, ValueError) as e:
+                log.error("Ungültige Konfiguration für Guild %s in %s: %s", guild_id_str, self.path, e)
+        self._configs = configs
+        if verbose:
+            log.info("%d Guild-Konfigurationen aus %s geladen.", len(self._configs), self.path)
+
+    @contextmanager
+    def _locked(self):
+        """Sperrt die Konfigurationsdatei prozessübergreifend (mehrere Shard-Prozesse teilen sich dieselbe Datei)."""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        data = {str(guild_id): cfg.to_json() for guild_id, cfg in self._configs.items()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path) # Atomar ersetzen, damit ein Absturz keine halbe Datei hinterlässt
+
+    def __iter__(self):
+        return iter(self._configs.values())
+
+    def get(self, guild_id: Optional[int]) -> GuildConfig:
+        return self._configs.get(guild_id, self.default) if guild_id is not None else self.default
+
+    def has_own_config(self, guild_id: int) -> bool:
+        return guild_id in self._configs
+
+    def update(self, guild_id: int, **changes) -> GuildConfig:
+        """
+        Ändert (oder erstellt) die Konfiguration einer Guild und speichert sie sofort.
+        Die Datei wird vorher neu eingelesen, damit Änderungen anderer Prozesse nicht überschrieben werden.
+        Ein neuer Eintrag enthält nur die angegebenen Werte: Kanäle und Rollen der Standard-Konfiguration gehören zum
+        Server aus der .env und werden nicht in andere Guilds übernommen.
+        """
+        with self._locked():
+            self.load(verbose=False)
+            base = self._configs.get(guild_id) or GuildConfig(guild_id=guild_id)
+            cfg = replace(base, **changes)
+            self._configs[guild_id] = cfg
+            self._save()
+        return cfg
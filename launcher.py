@@ -0,0 +1,156 @@
+"""
+Startet den Ticket-Bot in mehreren Worker-Prozessen (Shard-Clustern).
+
+Jeder Worker ist ein eigener `bot.py`-Prozess mit eigener Gateway-Verbindung pro Shard; über SHARD_COUNT/SHARD_IDS
+wird festgelegt, welche Shards er übernimmt. Da Discord jede Guild genau einem Shard zuordnet, verarbeitet jeder
+Prozess nur die Interaktionen seiner Guilds; persistente Views und Ticket-Speicher funktionieren daher unverändert.
+
+Beispiele:
+    python launcher.py                         # Shard-Anzahl von Discord, ein Worker pro CPU-Kern
+    python launcher.py --shards 16 --workers 4 # 16 Shards auf 4 Prozesse verteilt (je 4 Shards)
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from dotenv import load_dotenv
+
+import structured_log
+
+log = logging.getLogger("launcher")
+
+# Discord erlaubt pro max_concurrency-Bucket nur ein IDENTIFY alle 5 Sekunden
+IDENTIFY_INTERVAL_SECONDS = 5.5
+# Wartezeit vor dem Neustart eines abgestürzten Workers (verdoppelt sich bis max.)
+RESTART_BACKOFF_SECONDS = 5
+MAX_RESTART_BACKOFF_SECONDS = 300
+
+
+def fetch_gateway_info(token: str) -> dict:
+    """Fragt die empfohlene Shard-Anzahl und max_concurrency bei Discord ab (GET /gateway/bot)."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (ticket-bot launcher, 1.0)"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def split_shards(shard_count: int, workers: int) -> list:
+    """Verteilt die Shard-IDs möglichst gleichmäßig auf die Worker, z.B. 10 Shards / 3 Worker -> [0-3], [4-6], [7-9]."""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    clusters, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        clusters.append(list(range(start, start + size)))
+        start += size
+    return clusters
+
+
+class Worker:
+    def __init__(self, cluster_id: int, shard_ids: list, shard_count: int, bot_args: list):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.bot_args = bot_args
+        self.process = None
+        self.backoff = RESTART_BACKOFF_SECONDS
+        self.restart_at = None
+        self.started_at = 0.0
+
+    def start(self):
+        env = dict(os.environ)
+        env["SHARD_COUNT"] = str(self.shard_count)
+        env["SHARD_IDS"] = ",".join(str(shard_id) for shard_id in self.shard_ids)
+        env["CLUSTER_ID"] = str(self.cluster_id)
+        bot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+        self.process = subprocess.Popen([sys.executable, bot_path] + self.bot_args, env=env)
+        self.started_at = time.monotonic()
+        log.info("Worker %d gestartet (PID %d, Shards %s).", self.cluster_id, self.process.pid, self.shard_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startet den Ticket-Bot verteilt auf mehrere Prozesse (Shard-Cluster).")
+    parser.add_argument("--shards", type=int, default=None, help="Gesamtanzahl der Shards (Standard: Empfehlung von Discord)")
+    parser.add_argument("--force-sync", action="store_true", help="Slash-Befehle auch ohne Änderung synchronisieren")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Anzahl der Worker-Prozesse (Standard: Anzahl CPU-Kerne)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    log_pipeline = structured_log.setup_logging_from_env()
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        log.error("DISCORD_TOKEN nicht in .env gefunden.")
+        sys.exit(1)
+
+    shard_count = args.shards
+    max_concurrency = 1
+    try:
+        info = fetch_gateway_info(token)
+        max_concurrency = info.get("session_start_limit", {}).get("max_concurrency", 1)
+        if shard_count is None:
+            shard_count = info["shards"]
+    except Exception as e:
+        if shard_count is None:
+            log.error("Empfohlene Shard-Anzahl konnte nicht abgefragt werden (%s). Bitte --shards angeben.", e)
+            sys.exit(1)
+        log.warning("Gateway-Informationen konnten nicht abgefragt werden (%s), verwende max_concurrency=1.", e)
+
+    clusters = split_shards(shard_count, args.workers)
+    bot_args = ["--force-sync"] if args.force_sync else []
+    workers = [Worker(i, shard_ids, shard_count, bot_args) for i, shard_ids in enumerate(clusters)]
+    log.info("%d Shards auf %d Worker verteilt (max_concurrency=%d).", shard_count, len(workers), max_concurrency)
+
+    stopping = False
+
+    def handle_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    # Worker gestaffelt starten, damit die IDENTIFY-Limits von Discord nicht überschritten werden
+    for worker in workers:
+        if stopping:
+            break
+        worker.start()
+        time.sleep(len(worker.shard_ids) * IDENTIFY_INTERVAL_SECONDS / max_concurrency)
+
+    # Überwachung: abgestürzte Worker mit steigender Wartezeit neu starten
+    while not stopping:
+        for worker in workers:
+            if worker.process is None or worker.process.poll() is None:
+                continue
+            if worker.restart_at is None:
+                # Lief der Worker lange stabil, beginnt die Wartezeit wieder von vorne
+                if time.monotonic() - worker.started_at > MAX_RESTART_BACKOFF_SECONDS:
+                    worker.backoff = RESTART_BACKOFF_SECONDS
+                log.warning("Worker %d beendet (Code %s), Neustart in %ss.", worker.cluster_id, worker.process.returncode, worker.backoff)
+                worker.restart_at = time.monotonic() + worker.backoff
+                worker.backoff = min(worker.backoff * 2, MAX_RESTART_BACKOFF_SECONDS)
+            elif time.monotonic() >= worker.restart_at:
+                worker.restart_at = None
+                worker.start()
+        time.sleep(1)
+
+    log.info("Beende Worker...")
+    for worker in workers:
+        if worker.process and worker.process.poll() is None:
+            worker.process.send_signal(signal.SIGINT) # bot.py beendet sich sauber (Log-Queue wird geleert)
+    for worker in workers:
+        if worker.process:
+            try:
+                worker.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+    log_pipeline.stop()
+
+
+if __name__ == "__main__":
+    main()
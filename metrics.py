@@ -0,0 +1,269 @@
+"""
+Metriken im Prometheus-Textformat, ohne zusätzliche Abhängigkeit.
+
+Histogramme messen die Dauer einzelner Stufen (Callbacks, create_thread, Schließen, Log-Versand), Zähler die
+Ticket-Aktionen und 429-Antworten von Discord, Gauges werden beim Abruf über Callbacks berechnet. Der HTTP-Endpunkt
+(/metrics) läuft im Event-Loop des Bots auf aiohttp, das ohnehin mit discord.py installiert ist.
+"""
+import abc
+import functools
+import logging
+import math
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from aiohttp import web # Zur Laufzeit erst beim Start des Endpunkts importiert (spart Importzeit ohne METRICS_PORT)
+
+log = logging.getLogger(__name__)
+
+# Sekunden; deckt schnelle Antworten bis hin zu Wartezeiten durch Rate-Limits ab
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} erwartet die Labels {self.labelnames}, erhalten: {labels}")
+        return tuple(str(label) for label in labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"] + self._samples()
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Gauge, deren Werte beim Abruf von einer Funktion geliefert werden (Zahl oder Dict Label-Tupel -> Zahl)."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), function: Optional[Callable] = None):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+
+    def set_function(self, function: Callable):
+        self.function = function
+
+    def _samples(self) -> List[str]:
+        if self.function is None:
+            return []
+        try:
+            values = self.function()
+        except Exception as e:
+            return [f"# Fehler beim Berechnen von {self.name}: {e}"]
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, self._key(key if isinstance(key, tuple) else (key,)))} {_format_value(value)}"
+                for key, value in values.items() if value is not None]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[tuple, List[int]] = {}
+        self._sums: Dict[tuple, float] = {}
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * len(self.buckets)
+            self._sums[key] = 0.0
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        self._sums[key] += value
+
+    def time(self, *labels) -> '_Timer':
+        """Misst die Dauer eines Blocks (`with histogram.time("x"):`) oder einer async-Funktion (`@histogram.time("x")`)."""
+        return _Timer(self, labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self._started, *self.labels)
+        return False
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with _Timer(self.histogram, self.labels):
+                return await function(*args, **kwargs)
+        return wrapper
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metrik {metric.name} ist bereits registriert.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Lokaler HTTP-Endpunkt (/metrics) für Prometheus, läuft im Event-Loop des Bots."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional['web.AppRunner'] = None
+
+    async def _handle(self, request: 'web.Request') -> 'web.Response':
+        from aiohttp import web
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def start(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info("Metriken unter http://%s:%s/metrics verfügbar.", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# --- Metriken des Ticket-Bots ---
+REGISTRY = MetricsRegistry()
+
+CALLBACK_SECONDS = REGISTRY.histogram(
+    "ticket_callback_seconds", "Dauer der Interaktions-Callbacks.", ["callback"])
+INTERACTION_DEFER_SECONDS = REGISTRY.histogram(
+    "ticket_interaction_defer_seconds", "Zeit von der Erstellung der Interaktion bei Discord bis zur Bestätigung (defer/Antwort).", ["action"])
+CREATE_THREAD_SECONDS = REGISTRY.histogram(
+    "ticket_create_thread_seconds", "Dauer von ForumChannel.create_thread.")
+CLOSE_SECONDS = REGISTRY.histogram(
+    "ticket_close_seconds", "Dauer des kritischen Pfads beim Schließen (Antwort, Embed, Archivieren).")
+LOG_WRITE_SECONDS = REGISTRY.histogram(
+    "ticket_log_write_seconds", "Dauer des Sendens einer gebündelten Log-Nachricht.")
+ACTIONS_TOTAL = REGISTRY.counter(
+    "ticket_actions_total", "Ticket-Aktionen pro Aktion und Kategorie.", ["action", "category"])
+RATE_LIMITED_TOTAL = REGISTRY.counter(
+    "discord_rate_limited_total", "Von Discord mit 429 beantwortete REST-Aufrufe.", ["scope", "method"])
+OPEN_TICKETS = REGISTRY.gauge(
+    "ticket_open_tickets", "Offene (auch geclaimte) Tickets im Ticket-Speicher.")
+GATEWAY_LATENCY_SECONDS = REGISTRY.gauge(
+    "discord_gateway_latency_seconds", "Heartbeat-Latenz pro Shard.", ["shard"])
+LOG_QUEUE_DEPTH = REGISTRY.gauge(
+    "ticket_log_queue_depth", "Wartende Einträge in der Log-Pipeline.")
+BACKGROUND_TASKS_PENDING = REGISTRY.gauge(
+    "ticket_background_tasks_pending", "Laufende Hintergrundaufgaben (DMs, Transkripte).")
+SLA_DEADLINES = REGISTRY.gauge(
+    "ticket_sla_deadlines", "Geplante SLA-Fristen (Ping bei ungeclaimten Tickets, automatisches Schließen).")
+STARTUP_PHASE_SECONDS = REGISTRY.gauge(
+    "ticket_startup_phase_seconds", "Dauer der Startphasen (Import, Konfiguration, Login, Ready, ...).", ["phase"])
+EVIDENCE_FILES_TOTAL = REGISTRY.counter(
+    "ticket_evidence_files_total", "Anhänge in Ticket-Threads pro Ergebnis (stored, duplicate, rejected).", ["result"])
+EVIDENCE_BYTES_TOTAL = REGISTRY.counter(
+    "ticket_evidence_bytes_total", "Neu im Nachweis-Archiv abgelegte Bytes (ohne Duplikate).")
+RECONCILED_TOTAL = REGISTRY.counter(
+    "ticket_reconciled_total", "Beim Abgleich nach dem Start geprüfte Forum-Threads pro Ergebnis.", ["result"])
+REST_REQUESTS_TOTAL = REGISTRY.counter(
+    "discord_rest_requests_total", "REST-Aufrufe pro Spur (high/low) und Route.", ["lane", "route"])
+REST_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "discord_rest_queue_wait_seconds", "Wartezeit im REST-Scheduler vor dem Senden, pro Spur.", ["lane"])
+REST_QUEUE_DEPTH = REGISTRY.gauge(
+    "discord_rest_queue_depth", "Im REST-Scheduler wartende Aufrufe pro Spur.", ["lane"])
+REST_IN_FLIGHT = REGISTRY.gauge(
+    "discord_rest_in_flight", "Laufende REST-Aufrufe pro Spur.", ["lane"])
+REST_RATE_LIMIT_WAIT_SECONDS = REGISTRY.counter(
+    "discord_rest_rate_limit_wait_seconds_total", "Wegen 429-Antworten gewartete Zeit pro Route (global: globales Limit).", ["route"])
+
+
+def snowflake_age(snowflake_id: int) -> float:
+    """Sekunden seit dem Zeitstempel einer Discord-ID (z.B. Interaktions-ID), mindestens 0."""
+    created_ms = (snowflake_id >> 22) + 1420070400000
+    return max(0.0, time.time() - created_ms / 1000)
@@ -0,0 +1,113 @@
+import logging
+
+import discord
+from typing import Dict, FrozenSet, Optional
+from guild_config import GuildConfigStore
+
+log = logging.getLogger(__name__)
+
+
+def parse_id_list(raw: Optional[str], name: str) -> FrozenSet[int]:
+    """Parst eine (komma-separierte) Liste von IDs aus einer Umgebungsvariable. Ungültige Einträge werden übersprungen."""
+    ids = set()
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            ids.add(int(part))
+        except ValueError:
+            log.warning("%s ('%s') ist keine gültige ID.", name, part)
+    return frozenset(ids)
+
+
+def parse_optional_id(raw: Optional[str], name: str) -> Optional[int]:
+    """Parst eine einzelne optionale ID aus einer Umgebungsvariable."""
+    ids = parse_id_list(raw, name)
+    return next(iter(ids)) if len(ids) == 1 else None
+
+
+class ResolvedGuildConfig:
+    """Aufgelöste Discord-Objekte einer Guild: Ticket-Forum, Forum-Tags nach Name, Ping-Rolle und erlaubte Rollen-IDs."""
+    __slots__ = ("forum", "tags_by_name", "ping_role", "closer_role_ids")
+
+    def __init__(self, forum: Optional[discord.ForumChannel], tags_by_name: Dict[str, discord.ForumTag],
+                 ping_role: Optional[discord.Role], closer_role_ids: FrozenSet[int]):
+        self.forum = forum
+        self.tags_by_name = tags_by_name
+        self.ping_role = ping_role
+        self.closer_role_ids = closer_role_ids
+
+    def member_has_closer_role(self, member: discord.Member) -> bool:
+        # Member.get_role ist ein Lookup in der sortierten Rollenliste des Members, kein Durchlaufen von member.roles
+        return any(member.get_role(role_id) for role_id in self.closer_role_ids)
+
+
+class ResolvedConfigCache:
+    """
+    Cache für aufgelöste Konfiguration (Forum, Forum-Tags, Rollen) pro Guild. Die Einträge werden beim ersten Zugriff
+    aus der Guild-Konfiguration aufgebaut und über die Gateway-Events on_guild_channel_update / on_guild_role_update
+    invalidiert, sodass der Hot Path weder Konfiguration parst noch Listen durchsucht. Ein Eintrag, in dem ein
+    konfiguriertes Forum bzw. eine Ping-Rolle fehlt (z.B. weil der Cache der Guild beim ersten Zugriff noch unvollständig
+    war), wird zusätzlich bei on_guild_channel_create / on_guild_role_create verworfen und neu aufgelöst.
+    """
+
+    def __init__(self, guild_configs: GuildConfigStore):
+        self.guild_configs = guild_configs
+        self._guilds: Dict[int, ResolvedGuildConfig] = {}
+
+    def get(self, guild: discord.Guild) -> ResolvedGuildConfig:
+        resolved = self._guilds.get(guild.id)
+        if resolved is None:
+            resolved = self._resolve(guild)
+            self._guilds[guild.id] = resolved
+        return resolved
+
+    def _resolve(self, guild: discord.Guild) -> ResolvedGuildConfig:
+        cfg = self.guild_configs.get(guild.id)
+        forum = guild.get_channel(cfg.appeals_forum_id) if cfg.appeals_forum_id else None
+        tags_by_name = {}
+        if isinstance(forum, discord.ForumChannel):
+            tags_by_name = {tag.name: tag for tag in forum.available_tags}
+        else:
+            forum = None
+
+        ping_role = None
+        if cfg.ping_role_id:
+            ping_role = guild.get_role(cfg.ping_role_id)
+            if not ping_role:
+                log.warning("Ping-Rolle %s nicht auf dem Server %s gefunden.", cfg.ping_role_id, guild.id)
+
+        return ResolvedGuildConfig(forum, tags_by_name, ping_role, cfg.closer_role_ids)
+
+    def invalidate(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+    def _has_misses(self, guild_id: int) -> bool:
+        resolved = self._guilds.get(guild_id)
+        if resolved is None:
+            return False
+        cfg = self.guild_configs.get(guild_id)
+        return (bool(cfg.appeals_forum_id) and resolved.forum is None) or \
+            (bool(cfg.ping_role_id) and resolved.ping_role is None)
+
+    def on_channel_created(self, channel: discord.abc.GuildChannel):
+        """Ein Kanal wurde angelegt; ein zuvor nicht gefundenes Ticket-Forum wird beim nächsten Zugriff neu gesucht."""
+        if self._has_misses(channel.guild.id):
+            self.invalidate(channel.guild.id)
+
+    def on_role_created(self, role: discord.Role):
+        """Eine Rolle wurde angelegt; eine zuvor nicht gefundene Ping-Rolle wird beim nächsten Zugriff neu gesucht."""
+        if self._has_misses(role.guild.id):
+            self.invalidate(role.guild.id)
+
+    def on_channel_changed(self, channel: discord.abc.GuildChannel):
+        """Das Ticket-Forum (bzw. dessen Tags) wurde (evtl.) geändert oder gelöscht."""
+        if channel.id == self.guild_configs.get(channel.guild.id).appeals_forum_id:
+            self.invalidate(channel.guild.id)
+
+    def on_role_changed(self, role: discord.Role):
+        """Eine Rolle wurde geändert oder gelöscht; betrifft nur die Ping-Rolle bzw. die erlaubten Rollen."""
+        cfg = self.guild_configs.get(role.guild.id)
+        if role.id == cfg.ping_role_id or role.id in cfg.closer_role_ids:
+            self.invalidate(role.guild.id)
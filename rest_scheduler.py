@@ -0,0 +1,275 @@
+"""
+Zentrale Reihenfolge der REST-Aufrufe an Discord mit zwei Spuren.
+
+Alle Aufrufe des Bots laufen über `HTTPClient.request` bzw. (Interaktions-Antworten und Followups) über den
+Webhook-Adapter von discord.py; `RestScheduler.install` hängt sich an beide Stellen. Die Spur ergibt sich aus dem
+asyncio-Kontext: Interaktions-Handler laufen in der hohen Spur (Standard), Hintergrundarbeit wie Log-Nachrichten, DMs,
+Transkripte, SLA-Fristen und der Abgleich nach dem Start ruft `background()` auf und läuft in der niedrigen Spur.
+Von Tasks, die danach gestartet werden, wird die Spur mitgenommen.
+
+Anfragen mit dem Bot-Token teilen sich einen Token-Bucket (`rate` pro Sekunde, unter dem globalen Limit von Discord);
+wartende Anfragen der hohen Spur werden immer zuerst bedient. Die niedrige Spur hat höchstens `low_concurrency` Anfragen
+gleichzeitig offen, solange Anfragen der hohen Spur laufen nur eine. Interaktions-Antworten zählen nicht zum globalen
+Limit und warten nie, zählen aber als laufende Anfragen der hohen Spur.
+Pro Route (Methode und Pfad-Vorlage) werden Anfragen, 429-Antworten und die darauf gewartete Zeit gezählt. 429-Antworten
+wartet discord.py intern ab; gezählt werden sie an den HTTP-Antworten selbst, über eine aiohttp-TraceConfig
+(`RestScheduler.http_trace`, an den Client als `http_trace` übergeben). Sie sieht jede Antwort der Session von
+discord.py, auch die der Interaktions-Antworten, und wertet Status und Rate-Limit-Header aus, nicht die Log-Meldungen
+von discord.py. Sie ist die einzige Quelle für discord_rate_limited_total und die Wartezeit pro Route.
+
+Der Webhook-Adapter für Interaktions-Antworten (`discord.webhook.async_.async_context`) ist prozessweit; `install` ersetzt
+dessen `request` einmal pro Prozess und leitet ihn über den ersten installierten Scheduler. Mehrere Clients in einem
+Prozess teilen sich damit diesen Scheduler für Interaktions-Antworten (launcher.py startet pro Shard-Cluster einen
+eigenen Prozess und ist davon nicht betroffen).
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+import aiohttp
+import discord
+import discord.webhook.async_
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+LANE_HIGH = "high" # Interaktions-Antworten und alles, worauf ein Benutzer gerade wartet
+LANE_LOW = "low"   # Log-Nachrichten, DMs, Transkripte, SLA-Fristen, Abgleich
+LANES = (LANE_HIGH, LANE_LOW)
+
+GLOBAL_ROUTE = "global"
+
+_lane: contextvars.ContextVar[str] = contextvars.ContextVar("rest_lane", default=LANE_HIGH)
+_route: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("rest_route", default=None)
+
+
+def background():
+    """Setzt die niedrige Spur für den aktuellen asyncio-Task (und alle danach daraus gestarteten Tasks)."""
+    _lane.set(LANE_LOW)
+
+
+@contextlib.contextmanager
+def lane(name: str):
+    """Wie `background`, aber mit beliebiger Spur und nur für die Dauer des with-Blocks."""
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane() -> str:
+    return _lane.get()
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    in_flight: int = 0
+    rate_limited: int = 0
+    rate_limit_wait: float = 0.0 # Summe der retry_after-Wartezeiten (Sekunden)
+
+
+def retry_after_from_headers(headers) -> float:
+    """Wartezeit einer 429-Antwort in Sekunden: X-RateLimit-Reset-After (genau), sonst Retry-After."""
+    for name in ("X-RateLimit-Reset-After", "Retry-After"):
+        try:
+            return float(headers[name])
+        except (KeyError, ValueError):
+            continue
+    return 0.0
+
+
+def is_global_rate_limit(headers) -> bool:
+    return headers.get("X-RateLimit-Global", "").lower() == "true" or headers.get("X-RateLimit-Scope", "").lower() == "global"
+
+
+class RestScheduler:
+    def __init__(self, rate: float = 40.0, low_concurrency: int = 4):
+        self.rate = rate
+        self.low_concurrency = low_concurrency
+        self._tokens = float(rate)
+        self._refilled = time.monotonic()
+        self._blocked_until = 0.0 # Globales 429: keine Anfragen mit dem Bot-Token bis dahin
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in LANES}
+        self._in_flight = Counter()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.routes: Dict[str, RouteStats] = {}
+        self.wait_seconds = Counter() # Wartezeit im Scheduler pro Spur
+        self.sent = Counter()
+        self.global_rate_limited = 0
+        # Für den Client (discord.Client(http_trace=...)): zählt 429-Antworten an der HTTP-Antwort
+        self.http_trace = aiohttp.TraceConfig()
+        self.http_trace.on_request_end.append(self._on_request_end)
+
+    def depth(self) -> Dict[Tuple[str], int]:
+        return {(name,): len(waiters) for name, waiters in self._waiters.items()}
+
+    def in_flight(self) -> Dict[Tuple[str], int]:
+        return {(name,): self._in_flight[name] for name in LANES}
+
+    def stats(self) -> dict:
+        return {
+            "queued": {name: len(waiters) for name, waiters in self._waiters.items()},
+            "in_flight": dict(self._in_flight),
+            "sent": dict(self.sent),
+            "wait_seconds": {name: round(seconds, 3) for name, seconds in self.wait_seconds.items()},
+            "global_rate_limited": self.global_rate_limited,
+            "routes": {route: asdict(stats) for route, stats in sorted(self.routes.items())},
+        }
+
+    def _route_stats(self, route: str) -> RouteStats:
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats()
+        return stats
+
+    def record_rate_limit(self, route: str, retry_after: float):
+        stats = self._route_stats(route)
+        stats.rate_limited += 1
+        stats.rate_limit_wait += retry_after
+        metrics.RATE_LIMITED_TOTAL.inc("route", route.split(" ", 1)[0])
+        metrics.REST_RATE_LIMIT_WAIT_SECONDS.inc(route, amount=retry_after)
+
+    def record_global_rate_limit(self, retry_after: float):
+        self.global_rate_limited += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        metrics.RATE_LIMITED_TOTAL.inc("global", "-")
+        metrics.REST_RATE_LIMIT_WAIT_SECONDS.inc(GLOBAL_ROUTE, amount=retry_after)
+
+    async def _on_request_end(self, session: aiohttp.ClientSession, context, params: aiohttp.TraceRequestEndParams):
+        # Läuft im Task der Anfrage, die Route aus `slot` ist also noch gesetzt
+        response = params.response
+        if response.status != 429:
+            return
+        if is_global_rate_limit(response.headers):
+            self.record_global_rate_limit(retry_after_from_headers(response.headers))
+        else:
+            self.record_rate_limit(_route.get() or "unbekannt", retry_after_from_headers(response.headers))
+
+    # --- Vergabe ---
+
+    def _refill(self, now: float):
+        self._tokens = min(float(self.rate), self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _may_start(self, name: str, now: float) -> bool:
+        if name == LANE_LOW:
+            limit = 1 if self._in_flight[LANE_HIGH] else self.low_concurrency
+            if self._waiters[LANE_HIGH] or self._in_flight[LANE_LOW] >= limit:
+                return False
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        return self._tokens >= 1 and now >= self._blocked_until
+
+    def _start(self, name: str):
+        if self.rate > 0:
+            self._tokens -= 1
+        self._in_flight[name] += 1
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self):
+        """Startet wartende Anfragen, hohe Spur zuerst; wartet per Timer, wenn der Token-Bucket leer ist."""
+        now = time.monotonic()
+        for name in LANES:
+            waiters = self._waiters[name]
+            while waiters:
+                if waiters[0].done(): # Abgebrochene Wartende überspringen
+                    waiters.popleft()
+                elif self._may_start(name, now):
+                    self._start(name)
+                    waiters.popleft().set_result(None)
+                else:
+                    break
+            if waiters:
+                break # Strikte Reihenfolge: die niedrige Spur wartet, solange die hohe nicht leer ist
+        if self.rate > 0 and self._timer is None and any(self._waiters.values()):
+            # Auf freie Plätze (Freigabe einer Anfrage) wird ohne Timer gewartet, nur auf Tokens und globale 429
+            self._refill(now)
+            delay = max((1 - self._tokens) / self.rate, self._blocked_until - now)
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    async def _acquire(self, name: str):
+        queued = self._waiters[LANE_HIGH] if name == LANE_HIGH else any(self._waiters.values())
+        if not queued and self._may_start(name, time.monotonic()):
+            self._start(name)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[name].append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(name) # Platz war schon vergeben
+            raise
+
+    def _release(self, name: str):
+        self._in_flight[name] -= 1
+        if any(self._waiters.values()):
+            self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, route: str, exempt: bool = False):
+        """
+        Wartet, bis eine Anfrage auf `route` in der Spur des aktuellen Kontexts gesendet werden darf.
+        `exempt`: zählt nicht zum globalen Limit (Interaktions-Antworten), läuft sofort in der hohen Spur.
+        """
+        name = LANE_HIGH if exempt else _lane.get()
+        started = time.monotonic()
+        if exempt:
+            self._in_flight[name] += 1
+        else:
+            await self._acquire(name)
+        waited = time.monotonic() - started
+        self.wait_seconds[name] += waited
+        self.sent[name] += 1
+        metrics.REST_QUEUE_WAIT_SECONDS.observe(waited, name)
+        metrics.REST_REQUESTS_TOTAL.inc(name, route)
+        stats = self._route_stats(route)
+        stats.requests += 1
+        stats.in_flight += 1
+        token = _route.set(route)
+        try:
+            yield
+        finally:
+            _route.reset(token)
+            stats.in_flight -= 1
+            self._release(name)
+
+    # --- Anbindung an discord.py ---
+
+    def install(self, http: discord.http.HTTPClient):
+        """
+        Leitet alle REST-Aufrufe des Clients und die Interaktions-Antworten über den Scheduler. Der Webhook-Adapter ist
+        prozessweit und wird nur beim ersten Aufruf ersetzt (siehe Modul-Docstring). 429-Antworten zählt `http_trace`,
+        das dem Client beim Erzeugen übergeben werden muss.
+        """
+        request = http.request
+
+        async def scheduled_request(route, **kwargs):
+            async with self.slot(f"{route.method} {route.path}"):
+                return await request(route, **kwargs)
+        http.request = scheduled_request
+
+        # Interaktions-Antworten und Followups laufen über einen gemeinsamen Webhook-Adapter (nicht über HTTPClient)
+        adapter = discord.webhook.async_.async_context.get()
+        if not getattr(adapter, "_rest_scheduler", None):
+            webhook_request = adapter.request
+
+            async def scheduled_webhook_request(route, *args, **kwargs):
+                async with self.slot(f"{route.method} {route.path}", exempt=True):
+                    return await webhook_request(route, *args, **kwargs)
+            adapter.request = scheduled_webhook_request
+            adapter._rest_scheduler = self
@@ -0,0 +1,412 @@
+"""
+Geteilter Zustand für mehrere Bot-Instanzen (Replikas) mit demselben Token bzw. denselben Shards.
+
+Enthält atomare Sperren (Claim und Schließen eines Tickets), die offenen Tickets pro Benutzer (für
+TICKET_MAX_OPEN_PER_USER) und die zuletzt geladenen Ticket-Kategorien mit Versionsnummer. Standard ist ein Backend im
+Prozess (eine Instanz, kein zusätzlicher Dienst). Mit SHARED_STATE_URL=redis://... wird ein Redis-kompatibler Server
+verwendet (Redis, Valkey, KeyDB, fakeredis); das RESP-Protokoll ist hier direkt implementiert, eine zusätzliche
+Abhängigkeit ist nicht nötig.
+
+Alle Methoden sind Coroutinen, damit beide Backends dieselbe Schnittstelle haben. Ist der Server nicht erreichbar,
+wird SharedStateError geworfen; Aufrufer entscheiden, ob sie abbrechen (Claim) oder lokal weitermachen (Zähler).
+"""
+import abc
+import asyncio
+import json
+import logging
+import time
+import urllib.parse
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PREFIX = "ticketbot:"
+# Lebensdauer der Sperren; der Claim wird beim Schließen freigegeben, die Schließen-Sperre läuft ab
+CLAIM_LOCK_TTL_SECONDS = 30 * 86400
+CLOSE_LOCK_TTL_SECONDS = 7 * 86400
+# Lebensdauer der Mengen offener Tickets pro Benutzer auf dem Server; jedes neue Ticket und jeder Abgleich verlängert sie
+OPEN_TICKETS_TTL_SECONDS = 30 * 86400
+# Zeitlimit pro Anfrage an den Server (Sekunden); Interaktionen müssen innerhalb von 3 Sekunden beantwortet werden
+REQUEST_TIMEOUT_SECONDS = 2.0
+
+OpenTicket = Tuple[Optional[int], int, int] # (Guild-ID, Ersteller-ID, Thread-ID)
+
+
+class SharedStateError(Exception):
+    """Der geteilte Zustand ist nicht erreichbar oder hat mit einem Fehler geantwortet."""
+
+
+def _glob_escape(text: str) -> str:
+    """Maskiert Platzhalter für SCAN MATCH, z.B. in einem frei gewählten SHARED_STATE_PREFIX."""
+    return "".join("\\" + char if char in "*?[]\\" else char for char in text)
+
+
+def claim_lock(thread_id: int) -> str:
+    return f"claim:{thread_id}"
+
+
+def close_lock(thread_id: int) -> str:
+    return f"close:{thread_id}"
+
+
+class SharedState(abc.ABC):
+    """Schnittstelle der Backends."""
+    shared = False # True: mehrere Prozesse sehen denselben Zustand
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abc.abstractmethod
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Setzt die Sperre `name` atomar, falls sie nicht schon besteht. False: eine andere Instanz war schneller.
+        `owner` muss pro Versuch eindeutig sein (z.B. Benutzer- und Interaktions-ID).
+        """
+        ...
+
+    @abc.abstractmethod
+    async def assign(self, name: str, owner: str, ttl: float):
+        """Setzt die Sperre unabhängig vom bisherigen Besitzer (z.B. Ticket einem anderen Moderator zuweisen)."""
+        ...
+
+    @abc.abstractmethod
+    async def owner(self, name: str) -> Optional[str]:
+        ...
+
+    @abc.abstractmethod
+    async def release(self, name: str):
+        ...
+
+    @abc.abstractmethod
+    async def add_open(self, tickets: Iterable[OpenTicket]):
+        ...
+
+    @abc.abstractmethod
+    async def remove_open(self, guild_id: Optional[int], creator_id: int, thread_id: int):
+        ...
+
+    @abc.abstractmethod
+    async def count_open(self, guild_id: Optional[int], creator_id: int) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def rebuild_open(self, guild_id: int, tickets: Iterable[OpenTicket], before_thread_id: int) -> int:
+        """
+        Ersetzt die offenen Tickets einer Guild durch `tickets` (z.B. nach dem Abgleich des Ticket-Forums). Tickets mit
+        einer Thread-ID ab `before_thread_id` bleiben erhalten: sie wurden nach Beginn des Abgleichs erstellt, ggf. von
+        einer anderen Instanz. Liefert die Anzahl der entfernten veralteten Einträge.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def publish_categories(self, categories: Dict[str, List[dict]]) -> int:
+        """Speichert die Kategorien pro Kategorien-Datei und liefert die neue Version."""
+        ...
+
+    @abc.abstractmethod
+    async def categories_version(self) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def get_categories(self) -> Tuple[int, Dict[str, List[dict]]]:
+        ...
+
+
+class InProcessState(SharedState):
+    """Zustand im Speicher dieses Prozesses; Prüfen und Setzen laufen ohne await dazwischen und sind damit atomar."""
+
+    def __init__(self):
+        self._locks: Dict[str, Tuple[str, float]] = {} # Name -> (Besitzer, Ablaufzeitpunkt)
+        self._open: Dict[Tuple[Optional[int], int], Set[int]] = {}
+        self._categories: Dict[str, List[dict]] = {}
+        self._version = 0
+
+    def _lock(self, name: str) -> Optional[Tuple[str, float]]:
+        lock = self._locks.get(name)
+        if lock and lock[1] <= time.time():
+            del self._locks[name]
+            return None
+        return lock
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        if self._lock(name):
+            return False
+        self._locks[name] = (owner, time.time() + ttl)
+        return True
+
+    async def assign(self, name: str, owner: str, ttl: float):
+        self._locks[name] = (owner, time.time() + ttl)
+
+    async def owner(self, name: str) -> Optional[str]:
+        lock = self._lock(name)
+        return lock[0] if lock else None
+
+    async def release(self, name: str):
+        self._locks.pop(name, None)
+
+    async def add_open(self, tickets: Iterable[OpenTicket]):
+        for guild_id, creator_id, thread_id in tickets:
+            self._open.setdefault((guild_id, creator_id), set()).add(thread_id)
+
+    async def remove_open(self, guild_id: Optional[int], creator_id: int, thread_id: int):
+        threads = self._open.get((guild_id, creator_id))
+        if threads is not None:
+            threads.discard(thread_id)
+            if not threads:
+                del self._open[(guild_id, creator_id)]
+
+    async def count_open(self, guild_id: Optional[int], creator_id: int) -> int:
+        return len(self._open.get((guild_id, creator_id), ()))
+
+    async def rebuild_open(self, guild_id: int, tickets: Iterable[OpenTicket], before_thread_id: int) -> int:
+        tickets = set(tickets)
+        removed = 0
+        for key in [key for key in self._open if key[0] == guild_id]:
+            stale = {thread_id for thread_id in self._open[key]
+                     if thread_id < before_thread_id and (guild_id, key[1], thread_id) not in tickets}
+            removed += len(stale)
+            self._open[key] -= stale
+            if not self._open[key]:
+                del self._open[key]
+        await self.add_open(tickets)
+        return removed
+
+    async def publish_categories(self, categories: Dict[str, List[dict]]) -> int:
+        self._categories.update(categories)
+        self._version += 1
+        return self._version
+
+    async def categories_version(self) -> int:
+        return self._version
+
+    async def get_categories(self) -> Tuple[int, Dict[str, List[dict]]]:
+        return self._version, dict(self._categories)
+
+
+class SharedStateUnavailable(SharedStateError, ConnectionError):
+    """Server nicht erreichbar oder Zeitlimit überschritten; als ConnectionError von Hintergrund-Tasks wiederholbar."""
+
+
+class RedisError(SharedStateError):
+    """Fehlerantwort des Servers (-ERR ...)."""
+
+
+class RedisConnection:
+    """
+    Minimaler RESP2-Client über eine einzelne Verbindung. Befehle werden unter einem Lock nacheinander gesendet; mehrere
+    Befehle können als Pipeline in einem Schreibvorgang gesendet werden. Ist die bestehende Verbindung getrennt, wird
+    einmal neu verbunden und erneut gesendet; alle Befehle müssen deshalb wiederholbar sein.
+    """
+
+    def __init__(self, url: str, timeout: float = REQUEST_TIMEOUT_SECONDS):
+        parsed = urllib.parse.urlparse(url)
+        if parsed.scheme not in ("redis", "rediss"):
+            raise ValueError(f"SHARED_STATE_URL: unbekanntes Schema '{parsed.scheme}' (erwartet redis:// oder rediss://)")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.ssl = parsed.scheme == "rediss"
+        self.username = urllib.parse.unquote(parsed.username) if parsed.username else None
+        self.password = urllib.parse.unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode(command: tuple) -> bytes:
+        parts = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readuntil(b"\r\n")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(payload)
+            return None if count < 0 else [await self._read_reply() for _ in range(count)]
+        raise SharedStateError(f"Unerwartete Antwort vom Server: {line[:50]!r}")
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.username, self.password) if self.username else ("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            await self._send(setup)
+
+    async def _send(self, commands: List[tuple]) -> list:
+        self._writer.write(b"".join(self._encode(command) for command in commands))
+        await self._writer.drain()
+        replies = [await self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def _disconnect(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _connect_and_send(self, commands: List[tuple]) -> list:
+        if self._writer is not None:
+            try:
+                return await self._send(commands)
+            except (OSError, asyncio.IncompleteReadError):
+                # Bestehende Verbindung vom Server getrennt (Neustart, Idle-Timeout): einmal neu verbinden
+                await self._disconnect()
+        await self._connect()
+        return await self._send(commands)
+
+    async def pipeline(self, commands: List[tuple]) -> list:
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._connect_and_send(commands), timeout=self.timeout)
+            except RedisError:
+                raise
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                # Antworten könnten sonst beim nächsten Befehl falsch zugeordnet werden
+                await self._disconnect()
+                raise SharedStateUnavailable(f"{self.host}:{self.port} nicht erreichbar: {e or type(e).__name__}") from e
+            except asyncio.CancelledError:
+                if self._writer is not None: # Abbruch mitten in einer Anfrage: Verbindung verwerfen
+                    self._writer.close()
+                    self._reader = self._writer = None
+                raise
+
+    async def execute(self, *command):
+        return (await self.pipeline([command]))[0]
+
+    async def close(self):
+        async with self._lock:
+            await self._disconnect()
+
+
+class RedisState(SharedState):
+    """Geteilter Zustand auf einem Redis-kompatiblen Server; alle Schlüssel beginnen mit `prefix`."""
+    shared = True
+
+    def __init__(self, url: str, prefix: str = DEFAULT_PREFIX):
+        self.connection = RedisConnection(url)
+        self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return self.prefix + ":".join(str(part) for part in parts)
+
+    def _open_key(self, guild_id: Optional[int], creator_id: int) -> str:
+        return self._key("open", guild_id or 0, creator_id)
+
+    async def start(self):
+        try:
+            await self.connection.execute("PING")
+            log.info("Geteilter Zustand: verbunden mit %s:%d.", self.connection.host, self.connection.port)
+        except SharedStateError as e:
+            log.error("Geteilter Zustand nicht erreichbar, neuer Versuch bei der nächsten Anfrage: %s", e)
+
+    async def close(self):
+        await self.connection.close()
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        # Erfolg am Besitzer erkennen statt an der Antwort auf SET: bleibt bei einer Wiederholung nach Verbindungsabbruch korrekt
+        key = self._key("lock", name)
+        _, current = await self.connection.pipeline([("SET", key, owner, "NX", "PX", int(ttl * 1000)), ("GET", key)])
+        return current == owner
+
+    async def assign(self, name: str, owner: str, ttl: float):
+        await self.connection.execute("SET", self._key("lock", name), owner, "PX", int(ttl * 1000))
+
+    async def owner(self, name: str) -> Optional[str]:
+        return await self.connection.execute("GET", self._key("lock", name))
+
+    async def release(self, name: str):
+        await self.connection.execute("DEL", self._key("lock", name))
+
+    async def add_open(self, tickets: Iterable[OpenTicket]):
+        # Ohne Ablauf blieben Tickets, deren Schließen eine Instanz nicht mehr eintragen konnte, für immer gezählt
+        commands = []
+        for guild_id, creator_id, thread_id in tickets:
+            key = self._open_key(guild_id, creator_id)
+            commands += [("SADD", key, thread_id), ("EXPIRE", key, OPEN_TICKETS_TTL_SECONDS)]
+        if commands:
+            await self.connection.pipeline(commands)
+
+    async def remove_open(self, guild_id: Optional[int], creator_id: int, thread_id: int):
+        await self.connection.execute("SREM", self._open_key(guild_id, creator_id), thread_id)
+
+    async def count_open(self, guild_id: Optional[int], creator_id: int) -> int:
+        return await self.connection.execute("SCARD", self._open_key(guild_id, creator_id))
+
+    async def rebuild_open(self, guild_id: int, tickets: Iterable[OpenTicket], before_thread_id: int) -> int:
+        # Nur veraltete Einträge per SREM entfernen statt die Mengen zu löschen: Tickets, die eine andere Instanz
+        # währenddessen einträgt, gehen so nicht verloren
+        pattern = _glob_escape(self._key("open", guild_id, "")) + "*"
+        keys, cursor = [], "0"
+        while True:
+            cursor, batch = await self.connection.execute("SCAN", cursor, "MATCH", pattern, "COUNT", 1000)
+            keys += batch
+            if cursor == "0":
+                break
+        keys = list(dict.fromkeys(keys)) # SCAN kann Schlüssel mehrfach liefern
+        wanted: Dict[str, Set[str]] = {}
+        for ticket_guild_id, creator_id, thread_id in tickets:
+            wanted.setdefault(self._open_key(ticket_guild_id, creator_id), set()).add(str(thread_id))
+        members = await self.connection.pipeline([("SMEMBERS", key) for key in keys]) if keys else []
+        commands, removed = [], 0
+        for key, thread_ids in zip(keys, members):
+            stale = [thread_id for thread_id in thread_ids
+                     if int(thread_id) < before_thread_id and thread_id not in wanted.get(key, ())]
+            if stale:
+                commands.append(("SREM", key, *stale))
+                removed += len(stale)
+        for key, thread_ids in wanted.items():
+            commands += [("SADD", key, *sorted(thread_ids)), ("EXPIRE", key, OPEN_TICKETS_TTL_SECONDS)]
+        if commands:
+            await self.connection.pipeline(commands)
+        return removed
+
+    async def publish_categories(self, categories: Dict[str, List[dict]]) -> int:
+        # MULTI/EXEC: andere Instanzen sehen die neue Version nie ohne die zugehörigen Kategorien
+        fields = [item for path, data in categories.items() for item in (path, json.dumps(data, ensure_ascii=False))]
+        replies = await self.connection.pipeline([
+            ("MULTI",), ("HSET", self._key("categories"), *fields), ("INCR", self._key("categories", "version")), ("EXEC",)])
+        return replies[-1][-1]
+
+    async def categories_version(self) -> int:
+        return int(await self.connection.execute("GET", self._key("categories", "version")) or 0)
+
+    async def get_categories(self) -> Tuple[int, Dict[str, List[dict]]]:
+        replies = await self.connection.pipeline([
+            ("MULTI",), ("GET", self._key("categories", "version")), ("HGETALL", self._key("categories")), ("EXEC",)])
+        version, flat = replies[-1]
+        return int(version or 0), {flat[i]: json.loads(flat[i + 1]) for i in range(0, len(flat), 2)}
+
+
+def create_shared_state(url: str, prefix: str = DEFAULT_PREFIX) -> SharedState:
+    """Backend für SHARED_STATE_URL: leer = im Prozess, redis://[:passwort@]host:port/db = Redis-kompatibler Server."""
+    if not url:
+        return InProcessState()
+    return RedisState(url, prefix)
@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import rest_scheduler
+import structured_log
+from ticket_store import TicketRecord, TicketStore
+
+log = logging.getLogger(__name__)
+
+# Arten von Fristen
+KIND_UNCLAIMED = "unclaimed" # Ping, wenn ein Ticket nicht rechtzeitig geclaimed wurde
+KIND_IDLE = "idle"           # Automatisches Schließen nach Inaktivität
+
+# So viele fällige Fristen werden gleichzeitig bearbeitet (z.B. nach einem längeren Ausfall)
+BATCH_SIZE = 10
+# Erneuter Versuch nach einem Fehler im Handler (Sekunden)
+RETRY_DELAY_SECONDS = 300.0
+# Längste Wartezeit am Stück, fängt Sprünge der Systemuhr ab (Sekunden)
+MAX_SLEEP_SECONDS = 300.0
+# Aktivität wird höchstens so oft pro Ticket gespeichert (Sekunden); nach einem Neustart fehlt höchstens dieser Zeitraum
+ACTIVITY_SAVE_INTERVAL_SECONDS = 60.0
+
+# Ein Handler bearbeitet eine fällige Frist und liefert optional einen neuen Fälligkeitszeitpunkt (Unix-Zeit)
+DeadlineHandler = Callable[[TicketRecord], Awaitable[Optional[float]]]
+
+
+class SlaScheduler:
+    """
+    Fristen pro Ticket (z.B. Ping bei ungeclaimten Tickets, automatisches Schließen) in einem Min-Heap.
+    Fristen werden bei Erstellung, Claim und Schließen gesetzt bzw. entfernt und in der Ticket-Datenbank gespeichert;
+    ein einzelner Task schläft bis zur nächsten Frist. Es werden weder alle Threads durchsucht noch die API abgefragt,
+    auch bei zehntausenden offenen Tickets kostet eine Frist nur O(log n).
+    Geänderte oder entfernte Fristen bleiben als veraltete Heap-Einträge liegen und werden beim Entnehmen übersprungen.
+    """
+
+    def __init__(self, store: TicketStore, handlers: Dict[str, DeadlineHandler], batch_size: int = BATCH_SIZE):
+        self.store = store
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[Tuple[int, str], float] = {} # Gültige Fristen; Heap-Einträge ohne Gegenstück sind veraltet
+        self._activity: Dict[int, float] = {} # Letzte Nachricht eines Benutzers pro Ticket
+        self._activity_saved: Dict[int, float] = {} # Zuletzt in der Ticket-Datenbank gespeicherter Wert
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Zähler pro Art
+        self.fired = Counter()
+        self.rescheduled = Counter()
+        self.failed = Counter()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self._due),
+            "heap": len(self._heap),
+            "fired": dict(self.fired),
+            "rescheduled": dict(self.rescheduled),
+            "failed": dict(self.failed),
+        }
+
+    def _push(self, thread_id: int, kind: str, due_at: float):
+        self._due[(thread_id, kind)] = due_at
+        heapq.heappush(self._heap, (due_at, thread_id, kind))
+        if self._heap[0][0] == due_at:
+            self._wakeup.set() # Neue früheste Frist: Schlafenszeit neu berechnen
+        # Bei vielen veralteten Einträgen den Heap neu aufbauen, damit er nicht unbegrenzt wächst
+        if len(self._heap) > 2 * len(self._due) + 1024:
+            self._heap = [(due, thread_id, kind) for (thread_id, kind), due in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def schedule(self, thread_id: int, kind: str, due_at: float):
+        """Setzt (oder verschiebt) eine Frist und speichert sie."""
+        self.store.set_deadline(thread_id, kind, due_at)
+        self._push(thread_id, kind, due_at)
+
+    def cancel(self, thread_id: int, kind: Optional[str] = None):
+        """Entfernt eine Frist oder (ohne `kind`) alle Fristen eines Tickets."""
+        kinds = [kind] if kind else list(self.handlers)
+        for entry_kind in kinds:
+            self._due.pop((thread_id, entry_kind), None)
+        if kind is None:
+            self._activity.pop(thread_id, None)
+            if self._activity_saved.pop(thread_id, None) is not None:
+                self.store.remove_activity(thread_id)
+        self.store.remove_deadline(thread_id, kind)
+
+    def has(self, thread_id: int, kind: str) -> bool:
+        return (thread_id, kind) in self._due
+
+    def note_activity(self, thread_id: int, timestamp: Optional[float] = None):
+        """
+        Merkt sich die Nachricht eines Benutzers (nicht des Bots) in einem Ticket; ausgewertet erst, wenn die Frist fällig
+        wird. Gespeichert wird höchstens alle ACTIVITY_SAVE_INTERVAL_SECONDS pro Ticket, nicht bei jeder Nachricht.
+        """
+        if (thread_id, KIND_IDLE) not in self._due:
+            return
+        timestamp = timestamp or time.time()
+        self._activity[thread_id] = timestamp
+        if timestamp - self._activity_saved.get(thread_id, 0.0) >= ACTIVITY_SAVE_INTERVAL_SECONDS:
+            self.store.set_activity(thread_id, timestamp)
+            self._activity_saved[thread_id] = timestamp
+
+    def last_activity(self, thread_id: int) -> Optional[float]:
+        return self._activity.get(thread_id)
+
+    def load(self, include: Callable[[TicketRecord], bool]):
+        """Lädt die gespeicherten Fristen der Tickets, für die `include` True liefert (z.B. Guilds dieses Prozesses)."""
+        for thread_id, kind, due_at in self.store.deadlines():
+            record = self.store.get(thread_id)
+            if not record or not record.is_open or kind not in self.handlers:
+                self.store.remove_deadline(thread_id, kind)
+                continue
+            if include(record):
+                self._push(thread_id, kind, due_at)
+        for thread_id, last_at in self.store.activity().items():
+            record = self.store.get(thread_id)
+            if not record or not record.is_open:
+                self.store.remove_activity(thread_id)
+            elif include(record):
+                self._activity[thread_id] = self._activity_saved[thread_id] = last_at
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="sla-scheduler")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _pop_due(self, now: float) -> List[Tuple[int, str]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            due_at, thread_id, kind = heapq.heappop(self._heap)
+            if self._due.get((thread_id, kind)) == due_at:
+                del self._due[(thread_id, kind)]
+                due.append((thread_id, kind))
+        return due
+
+    async def _fire(self, thread_id: int, kind: str):
+        record = self.store.get(thread_id)
+        if not record or not record.is_open:
+            self.store.remove_deadline(thread_id, kind)
+            return
+        try:
+            with structured_log.log_context(ticket_id=thread_id, guild_id=record.guild_id, category=record.category_id):
+                next_due = await self.handlers[kind](record)
+        except Exception as e:
+            self.failed[kind] += 1
+            log.error("Frist '%s' für Ticket %s fehlgeschlagen, neuer Versuch in %ds: %s", kind, thread_id, RETRY_DELAY_SECONDS, e,
+                      extra={"ticket_id": thread_id, "guild_id": record.guild_id, "category": record.category_id})
+            next_due = time.time() + RETRY_DELAY_SECONDS
+        else:
+            self.fired[kind] += 1
+        if (thread_id, kind) in self._due:
+            return # Der Handler hat die Frist bereits neu gesetzt
+        if next_due is None or not self.store.get(thread_id).is_open:
+            self.store.remove_deadline(thread_id, kind)
+        else:
+            self.rescheduled[kind] += 1
+            self.schedule(thread_id, kind, next_due)
+
+    async def _run(self):
+        rest_scheduler.background() # Pings und automatisches Schließen sind Hintergrundarbeit
+        while True:
+            due = self._pop_due(time.time())
+            if due:
+                await asyncio.gather(*(self._fire(thread_id, kind) for thread_id, kind in due))
+                continue
+            self._wakeup.clear()
+            timeout = min(self._heap[0][0] - time.time(), MAX_SLEEP_SECONDS) if self._heap else MAX_SLEEP_SECONDS
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,58 @@
+"""
+Startzeiten pro Phase (Import, Konfiguration, Client, Login, Views, Ready, erste Interaktion).
+
+Die Messung beginnt beim Import dieses Moduls, bot.py importiert es deshalb als Erstes. Phasen werden nacheinander mit
+`mark` abgeschlossen; Arbeit, die parallel im Hintergrund läuft (z.B. Kategorien kompilieren, Befehls-Sync), wird mit
+`record` separat erfasst. Im Profil-Modus (STARTUP_PROFILE=1 oder --profile-startup) wird nach der ersten Interaktion
+eine Tabelle aller Phasen geloggt, sonst nur eine Zeile beim ersten Ready.
+"""
+import logging
+import time
+from typing import Dict, List, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = [] # Aufeinanderfolgende Phasen
+        self.background: Dict[str, float] = {}    # Parallel gelaufene Arbeit
+        self.enabled = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def has(self, phase: str) -> bool:
+        return any(name == phase for name, _ in self.phases)
+
+    def mark(self, phase: str):
+        """Schließt eine Phase ab; ihre Dauer reicht bis zur vorherigen Marke."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def record(self, phase: str, seconds: float):
+        self.background[phase] = seconds
+
+    def seconds(self) -> Dict[str, float]:
+        """Dauer pro Phase (auch Hintergrundarbeit), z.B. für Metriken."""
+        return {**dict(self.phases), **self.background}
+
+    def report(self) -> str:
+        lines, total = [], 0.0
+        for phase, seconds in self.phases:
+            total += seconds
+            lines.append(f"  {phase:<20} {seconds * 1000:9.1f} ms   (gesamt {total * 1000:9.1f} ms)")
+        for phase, seconds in self.background.items():
+            lines.append(f"  {phase:<20} {seconds * 1000:9.1f} ms   (im Hintergrund)")
+        return "\n".join(lines)
+
+    def log_report(self, title: str):
+        if self.enabled:
+            log.info("%s:\n%s", title, self.report())
+
+
+# Wird beim ersten Import angelegt, damit die Messung so früh wie möglich beginnt
+PROFILE = StartupProfile()
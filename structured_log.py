@@ -0,0 +1,248 @@
+"""
+Strukturiertes Logging (JSON-Zeilen) ohne blockierende Ausgabe im Event-Loop.
+
+Log-Aufrufe legen den Eintrag nur in eine Queue (QueueHandler); Formatieren und Schreiben nach stdout bzw. in die
+Log-Datei übernimmt ein QueueListener in einem eigenen Thread. Ein langsamer Log-Collector verzögert so keine
+Interaktionen mehr. Ist die Queue voll, werden Einträge verworfen und gezählt, statt zu warten.
+
+Kontextfelder (ticket_id, guild_id, user_id, category) werden über `bind`/`log_context` pro asyncio-Task gesetzt und
+beim Log-Aufruf in den Eintrag übernommen. Von Tasks, die danach gestartet werden, werden sie mitgenommen.
+Häufige INFO-/DEBUG-Zeilen werden pro Logger und Meldungsvorlage gesampelt: höchstens `sample_burst` Zeilen je
+`sample_interval` Sekunden, die verworfene Anzahl steht im nächsten durchgelassenen Eintrag (`sampled_out`).
+"""
+import atexit
+import contextlib
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+CONTEXT_FIELDS = ("ticket_id", "guild_id", "user_id", "category")
+LOG_FORMATS = ("json", "text")
+
+_context: contextvars.ContextVar[Dict[str, object]] = contextvars.ContextVar("log_context", default={})
+
+
+def bind(**fields):
+    """Setzt Kontextfelder für den aktuellen asyncio-Task (und alle danach daraus gestarteten Tasks)."""
+    _context.set({**_context.get(), **{key: value for key, value in fields.items() if value is not None}})
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Wie `bind`, aber nur für die Dauer des with-Blocks."""
+    token = _context.set({**_context.get(), **{key: value for key, value in fields.items() if value is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind_interaction(interaction, **fields):
+    """Übernimmt Guild und Benutzer einer Interaktion (und weitere Felder) in den Log-Kontext."""
+    bind(guild_id=interaction.guild_id, user_id=interaction.user.id if interaction.user else None, **fields)
+
+
+class ContextFilter(logging.Filter):
+    """Überträgt die Kontextfelder des aufrufenden Tasks in den Eintrag; Werte aus `extra=` haben Vorrang."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Lässt pro (Logger, Meldungsvorlage) höchstens `burst` INFO-/DEBUG-Einträge je `interval` Sekunden durch."""
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, str], list] = {} # Schlüssel -> [Fensterbeginn, durchgelassen, verworfen]
+        self._last_sweep = time.monotonic()
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        if now - self._last_sweep >= self.interval:
+            self._windows = {key: window for key, window in self._windows.items() if now - window[0] < self.interval}
+            self._last_sweep = now
+        key = (record.name, str(record.msg))
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            dropped = window[2] if window else 0
+            window = self._windows[key] = [now, 0, 0]
+            if dropped:
+                record.sampled_out = dropped
+        if window[1] >= self.burst:
+            window[2] += 1
+            self.sampled_out += 1
+            return False
+        window[1] += 1
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Eine JSON-Zeile pro Eintrag mit Zeitstempel, Level, Logger, Meldung, Kontextfeldern und ggf. Traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS + ("sampled_out",):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Lesbare Zeilen für die lokale Entwicklung, Kontextfelder als key=value am Ende."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = " ".join(f"{key}={getattr(record, key)}" for key in CONTEXT_FIELDS + ("sampled_out",)
+                           if getattr(record, key, None) is not None)
+        if not context:
+            return line
+        first, newline, rest = line.partition("\n") # Traceback nach dem Kontext
+        return f"{first} [{context}]{newline}{rest}"
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Nur die Meldung auflösen (Argumente könnten sich bis zur Ausgabe ändern); formatiert wird im Listener-Thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel) # Beim Beenden warten, statt bei voller Queue einen Fehler zu werfen
+
+
+class LogPipeline:
+    """Hält Queue, Handler und Listener, damit sie beim Beenden geleert und geschlossen werden können."""
+
+    def __init__(self, handler: _NonBlockingQueueHandler, listener: _Listener, sampler: SamplingFilter):
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
+        self._stopped = False
+
+    @property
+    def depth(self) -> int:
+        return self.handler.queue.qsize()
+
+    def stats(self) -> dict:
+        return {"queued": self.depth, "dropped": self.handler.dropped, "sampled_out": self.sampler.sampled_out}
+
+    def stop(self):
+        """Schreibt alle wartenden Einträge und beendet den Listener-Thread."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.listener.stop()
+        for output in self.listener.handlers:
+            output.close()
+
+
+def parse_levels(raw: Optional[str]) -> Dict[str, int]:
+    """Liest Logger-Level im Format "discord=WARNING,ticket_store=DEBUG"."""
+    levels = {}
+    for part in (raw or "").split(","):
+        name, _, level = part.partition("=")
+        if not name.strip():
+            continue
+        value = logging.getLevelName(level.strip().upper())
+        if isinstance(value, int):
+            levels[name.strip()] = value
+        else:
+            logging.getLogger(__name__).warning("LOG_LEVELS: '%s' ist kein gültiges Level.", part.strip())
+    return levels
+
+
+def setup_logging(level: str = "INFO", levels: Optional[Dict[str, int]] = None, fmt: str = "json",
+                  log_file: Optional[str] = None, queue_size: int = 10000,
+                  sample_burst: int = 20, sample_interval: float = 60.0) -> LogPipeline:
+    """Richtet das Root-Logging über Queue und Listener-Thread ein. Bereits vorhandene Root-Handler werden ersetzt."""
+    formatter = TextFormatter() if fmt == "text" else JsonFormatter()
+    outputs = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        outputs.append(logging.handlers.WatchedFileHandler(log_file, encoding="utf-8")) # verträgt logrotate
+    for output in outputs:
+        output.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=max(0, queue_size))
+    handler = _NonBlockingQueueHandler(log_queue)
+    sampler = SamplingFilter(sample_burst, sample_interval)
+    handler.addFilter(sampler) # vor dem Kontextfilter, verworfene Einträge kosten so möglichst wenig
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root_level = logging.getLevelName(level.strip().upper())
+    root.setLevel(root_level if isinstance(root_level, int) else logging.INFO)
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    listener = _Listener(log_queue, *outputs, respect_handler_level=True)
+    listener.start()
+    pipeline = LogPipeline(handler, listener, sampler)
+    atexit.register(pipeline.stop)
+    if not isinstance(root_level, int):
+        logging.getLogger(__name__).warning("LOG_LEVEL ('%s') ist kein gültiges Level, verwende INFO.", level)
+    return pipeline
+
+
+def setup_logging_from_env() -> LogPipeline:
+    """Liest LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_FILE, LOG_QUEUE_SIZE, LOG_SAMPLE_BURST und LOG_SAMPLE_INTERVAL."""
+    fmt = os.getenv("LOG_FORMAT", "json").strip().lower()
+    pipeline = setup_logging(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        levels=parse_levels(os.getenv("LOG_LEVELS")),
+        fmt=fmt if fmt in LOG_FORMATS else "json",
+        log_file=os.getenv("LOG_FILE") or None,
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        sample_burst=int(os.getenv("LOG_SAMPLE_BURST", "20")),
+        sample_interval=float(os.getenv("LOG_SAMPLE_INTERVAL", "60")),
+    )
+    if fmt not in LOG_FORMATS:
+        logging.getLogger(__name__).warning("LOG_FORMAT ('%s') wird nicht unterstützt, verwende json.", fmt)
+    return pipeline
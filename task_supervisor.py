@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Optional, Set
+
+import discord
+
+import rest_scheduler
+
+log = logging.getLogger(__name__)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Vorübergehende Fehler (Serverfehler, Rate-Limits, Timeouts, Verbindungsabbrüche) lohnen einen neuen Versuch."""
+    if isinstance(error, discord.HTTPException):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (asyncio.TimeoutError, OSError))
+
+
+class TaskSupervisor:
+    """
+    Führt Nebenwirkungen (Log, DM, Transkript, ...) als überwachte Hintergrund-Tasks aus, damit sie die Antwort an den
+    Benutzer nicht verzögern und sich nicht gegenseitig blockieren. Vorübergehende Fehler werden mit exponentiellem
+    Backoff wiederholt; Erfolge, Wiederholungen und endgültige Fehler werden pro Task-Name gezählt.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._tasks: Set[asyncio.Task] = set() # Starke Referenzen, sonst kann der Garbage Collector Tasks beenden
+        # Zähler pro Task-Name
+        self.succeeded = Counter()
+        self.retried = Counter()
+        self.failed = Counter()
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "succeeded": dict(self.succeeded),
+            "retried": dict(self.retried),
+            "failed": dict(self.failed),
+        }
+
+    def spawn(self, name: str, factory: Callable[[], Awaitable], retries: Optional[int] = None) -> asyncio.Task:
+        """
+        Startet `factory()` im Hintergrund. `factory` muss bei jedem Aufruf eine neue Coroutine liefern,
+        da eine Coroutine nur einmal ausgeführt werden kann.
+        """
+        task = asyncio.create_task(self._run(name, factory, self.max_retries if retries is None else retries), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, name: str, factory: Callable[[], Awaitable], retries: int):
+        rest_scheduler.background() # REST-Aufrufe der Nebenwirkungen warten hinter den Interaktionen
+        attempt = 0
+        while True:
+            try:
+                await factory()
+                self.succeeded[name] += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= retries or not is_retryable(e):
+                    self.failed[name] += 1
+                    log.error("Hintergrundaufgabe '%s' fehlgeschlagen (Versuch %d): %s", name, attempt + 1, e)
+                    return
+                delay = getattr(e, "retry_after", None) or self.base_delay * 2 ** attempt
+                attempt += 1
+                self.retried[name] += 1
+                await asyncio.sleep(delay)
+
+    async def stop(self, timeout: float = 10.0):
+        """Wartet beim Beenden bis zu `timeout` Sekunden auf laufende Tasks und bricht den Rest ab."""
+        if not self._tasks:
+            return
+        _, still_running = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            log.warning("%d Hintergrundaufgabe(n) beim Beenden abgebrochen.", len(still_running))
+            await asyncio.gather(*still_running, return_exceptions=True)
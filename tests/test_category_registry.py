@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from category_registry import categories_file_path
+
+
+@pytest.mark.parametrize("name", ["../secret.json", "/etc/passwd", "..", "sub/server.json", "sub\\server.json",
+                                  ".hidden.json", "server.txt", ""])
+def test_categories_file_rejects_paths(tmp_path, name):
+    with pytest.raises(ValueError):
+        categories_file_path(str(tmp_path), name)
+
+
+def test_categories_file_inside_directory(tmp_path):
+    assert categories_file_path(str(tmp_path), " server2.json ") == os.path.join(str(tmp_path), "server2.json")
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="Keine symbolischen Links")
+def test_categories_file_rejects_symlink_out_of_directory(tmp_path):
+    directory = tmp_path / "ticket_categories"
+    directory.mkdir()
+    (tmp_path / "outside.json").write_text("[]")
+    os.symlink(str(tmp_path / "outside.json"), str(directory / "server.json"))
+    with pytest.raises(ValueError):
+        categories_file_path(str(directory), "server.json")
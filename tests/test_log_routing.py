@@ -0,0 +1,92 @@
+import asyncio
+
+import discord
+
+from audit_log import AuditLogWriter, guild_log_channel
+from guild_config import GuildConfig, GuildConfigStore
+
+HOME_GUILD_ID = 1
+OTHER_GUILD_ID = 2
+HOME_LOG_CHANNEL_ID = 10
+OTHER_LOG_CHANNEL_ID = 20
+
+
+class FakeLogChannel(discord.TextChannel):
+    def __init__(self, guild, channel_id: int):
+        self.guild = guild
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content=None, embeds=None, **kwargs):
+        self.sent.append(embeds)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.channels = {}
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+
+class FakeClient:
+    def __init__(self, *guilds):
+        self.guilds = {guild.id: guild for guild in guilds}
+        # Globaler Cache über alle Guilds; darf für Log-Kanäle nicht verwendet werden
+        self.channels = {channel_id: channel for guild in guilds for channel_id, channel in guild.channels.items()}
+
+    def get_guild(self, guild_id: int):
+        return self.guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+
+def make_guilds():
+    home, other = FakeGuild(HOME_GUILD_ID), FakeGuild(OTHER_GUILD_ID)
+    home.channels[HOME_LOG_CHANNEL_ID] = FakeLogChannel(home, HOME_LOG_CHANNEL_ID)
+    other.channels[OTHER_LOG_CHANNEL_ID] = FakeLogChannel(other, OTHER_LOG_CHANNEL_ID)
+    return home, other
+
+
+def test_new_guild_config_does_not_inherit_default(tmp_path):
+    default = GuildConfig(guild_id=None, open_ticket_channel_id=1, appeals_forum_id=2, log_channel_id=3, ping_role_id=4,
+                          closer_role_ids=frozenset({5}))
+    store = GuildConfigStore(default, str(tmp_path / "guild_configs.json"))
+    cfg = store.update(999, appeals_forum_id=77, open_ticket_channel_id=78)
+    assert (cfg.appeals_forum_id, cfg.open_ticket_channel_id) == (77, 78)
+    assert cfg.log_channel_id is None
+    assert cfg.ping_role_id is None
+    assert cfg.closer_role_ids == frozenset()
+    # Weitere Änderungen behalten die bisherigen Werte der Guild
+    assert store.update(999, log_channel_id=80).appeals_forum_id == 77
+
+
+def test_guild_log_channel_only_in_own_guild():
+    home, other = make_guilds()
+    assert guild_log_channel(home, HOME_LOG_CHANNEL_ID) is home.channels[HOME_LOG_CHANNEL_ID]
+    assert guild_log_channel(other, HOME_LOG_CHANNEL_ID) is None
+    assert guild_log_channel(other, None) is None
+    # Auch ein Kanal-Objekt einer anderen Guild im Cache dieser Guild wird abgelehnt
+    other.channels[HOME_LOG_CHANNEL_ID] = home.channels[HOME_LOG_CHANNEL_ID]
+    assert guild_log_channel(other, HOME_LOG_CHANNEL_ID) is None
+
+
+def test_audit_log_routes_per_guild():
+    home, other = make_guilds()
+
+    async def scenario():
+        writer = AuditLogWriter(FakeClient(home, other), flush_interval=0.01)
+        writer.start()
+        writer.submit(HOME_GUILD_ID, HOME_LOG_CHANNEL_ID, discord.Embed(title="home"))
+        writer.submit(OTHER_GUILD_ID, OTHER_LOG_CHANNEL_ID, discord.Embed(title="other"))
+        # Guild ohne eigenen Log-Kanal, die die Kanal-ID der Standard-Konfiguration erbt
+        writer.submit(OTHER_GUILD_ID, HOME_LOG_CHANNEL_ID, discord.Embed(title="leak"))
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert [[embed.title for embed in embeds] for embeds in home.channels[HOME_LOG_CHANNEL_ID].sent] == [["home"]]
+    assert [[embed.title for embed in embeds] for embeds in other.channels[OTHER_LOG_CHANNEL_ID].sent] == [["other"]]
+    assert writer.stats()["failed"] == 1
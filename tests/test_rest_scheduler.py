@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import discord
+import pytest
+from aiohttp import web
+
+import metrics
+from rest_scheduler import GLOBAL_ROUTE, RestScheduler
+
+ROUTE = "GET /channels/{channel_id}"
+
+
+def rate_limited(retry_after: float, is_global: bool = False) -> web.Response:
+    # Wie Discord: JSON-Body mit retry_after, Header mit Wartezeit und Scope, Via (sonst hält discord.py es für Cloudflare)
+    headers = {"Via": "1.1 google", "Retry-After": "1", "X-RateLimit-Reset-After": str(retry_after),
+               "X-RateLimit-Scope": "global" if is_global else "user"}
+    if is_global:
+        headers["X-RateLimit-Global"] = "true"
+    headers["Content-Type"] = "application/json" # Ohne charset, sonst liest discord.py den Body als Text
+    return web.Response(status=429, headers=headers,
+                        body=json.dumps({"message": "You are being rate limited.", "retry_after": retry_after, "global": is_global}).encode())
+
+
+def run_against_fake_discord(monkeypatch, replies: list) -> RestScheduler:
+    """Sendet eine Anfrage mit dem echten HTTPClient von discord.py an einen lokalen Server mit den gegebenen Antworten."""
+    async def me(request):
+        return web.json_response({"id": "1", "username": "bot", "discriminator": "0", "avatar": None})
+
+    async def channel(request):
+        return replies.pop(0)() if replies else web.json_response({"id": request.match_info["channel_id"]})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/api/v10/users/@me", me)
+        app.router.add_get("/api/v10/channels/{channel_id}", channel)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(discord.http.Route, "BASE", f"http://127.0.0.1:{port}/api/v10")
+
+        scheduler = RestScheduler(rate=0)
+        http = discord.http.HTTPClient(asyncio.get_running_loop(), http_trace=scheduler.http_trace)
+        scheduler.install(http)
+        try:
+            await http.static_login("token")
+            await http.request(discord.http.Route("GET", "/channels/{channel_id}", channel_id=5))
+        finally:
+            await http.close()
+            await runner.cleanup()
+        return scheduler
+
+    return asyncio.run(scenario())
+
+
+def test_route_rate_limit_counted_from_response(monkeypatch):
+    before = metrics.RATE_LIMITED_TOTAL.value("route", "GET")
+    scheduler = run_against_fake_discord(monkeypatch, [lambda: rate_limited(0.05), lambda: rate_limited(0.05)])
+    stats = scheduler.routes[ROUTE]
+    assert stats.requests == 1
+    assert stats.rate_limited == 2
+    assert stats.rate_limit_wait == pytest.approx(0.1)
+    assert metrics.RATE_LIMITED_TOTAL.value("route", "GET") - before == 2
+    assert scheduler.global_rate_limited == 0
+
+
+def test_global_rate_limit_counted_from_response(monkeypatch):
+    before = metrics.REST_RATE_LIMIT_WAIT_SECONDS.value(GLOBAL_ROUTE)
+    scheduler = run_against_fake_discord(monkeypatch, [lambda: rate_limited(0.05, is_global=True)])
+    assert scheduler.global_rate_limited == 1
+    assert scheduler.routes[ROUTE].rate_limited == 0
+    assert metrics.REST_RATE_LIMIT_WAIT_SECONDS.value(GLOBAL_ROUTE) - before == pytest.approx(0.05)
+
+
+def test_counting_does_not_depend_on_discord_logging(monkeypatch):
+    # Weder der Wortlaut noch das Level der Log-Meldungen von discord.py dürfen die Zählung beeinflussen
+    import logging
+    monkeypatch.setattr(logging.getLogger("discord.http"), "disabled", True)
+    scheduler = run_against_fake_discord(monkeypatch, [lambda: rate_limited(0.05)])
+    assert scheduler.routes[ROUTE].rate_limited == 1
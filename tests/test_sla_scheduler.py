@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+import sla_scheduler
+from sla_scheduler import KIND_IDLE, KIND_UNCLAIMED, SlaScheduler
+from ticket_store import TicketStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TicketStore(str(tmp_path / "tickets.db"))
+    for thread_id in (1, 2, 3):
+        store.create(thread_id, 10, 100 + thread_id, "bug")
+    yield store
+    store.close()
+
+
+async def _noop(record):
+    return None
+
+
+def make_scheduler(store, **handlers) -> SlaScheduler:
+    return SlaScheduler(store, {KIND_UNCLAIMED: handlers.get("unclaimed", _noop), KIND_IDLE: handlers.get("idle", _noop)})
+
+
+def test_pop_due_in_order_and_skips_stale_entries(store):
+    sla = make_scheduler(store)
+    sla.schedule(1, KIND_UNCLAIMED, 300.0)
+    sla.schedule(2, KIND_UNCLAIMED, 100.0)
+    sla.schedule(3, KIND_UNCLAIMED, 200.0)
+    sla.schedule(2, KIND_UNCLAIMED, 400.0) # Verschoben: der Eintrag bei 100 ist veraltet
+    sla.cancel(3, KIND_UNCLAIMED)
+    assert sla._pop_due(250.0) == []
+    assert sla._pop_due(1000.0) == [(1, KIND_UNCLAIMED), (2, KIND_UNCLAIMED)]
+    assert len(sla) == 0
+
+
+def test_pop_due_respects_batch_size(store):
+    sla = SlaScheduler(store, {KIND_UNCLAIMED: _noop}, batch_size=2)
+    for thread_id in (1, 2, 3):
+        sla.schedule(thread_id, KIND_UNCLAIMED, float(thread_id))
+    assert sla._pop_due(10.0) == [(1, KIND_UNCLAIMED), (2, KIND_UNCLAIMED)]
+    assert sla._pop_due(10.0) == [(3, KIND_UNCLAIMED)]
+
+
+def test_load_skips_closed_tickets(store):
+    sla = make_scheduler(store)
+    sla.schedule(1, KIND_UNCLAIMED, 100.0)
+    sla.schedule(2, KIND_IDLE, 200.0)
+    store.mark_closed(2, 1)
+
+    reloaded = make_scheduler(store)
+    reloaded.load(lambda record: True)
+    assert reloaded.has(1, KIND_UNCLAIMED)
+    assert not reloaded.has(2, KIND_IDLE)
+    assert store.deadlines() == [(1, KIND_UNCLAIMED, 100.0)]
+
+
+def test_run_fires_due_deadlines_in_order(store):
+    fired = []
+
+    async def handler(record):
+        fired.append(record.thread_id)
+        return time.time() + 3600 if record.thread_id == 2 else None
+
+    async def scenario():
+        sla = make_scheduler(store, unclaimed=handler)
+        now = time.time()
+        sla.schedule(1, KIND_UNCLAIMED, now - 1)
+        sla.schedule(2, KIND_UNCLAIMED, now - 3)
+        sla.schedule(3, KIND_UNCLAIMED, now - 2)
+        sla.start()
+        for _ in range(100):
+            if len(fired) == 3:
+                break
+            await asyncio.sleep(0.01)
+        await sla.stop()
+        return sla
+
+    sla = asyncio.run(scenario())
+    assert fired == [2, 3, 1]
+    assert sla.has(2, KIND_UNCLAIMED) # Neu gesetzt vom Handler
+    assert not sla.has(1, KIND_UNCLAIMED)
+    assert [thread_id for thread_id, _, _ in store.deadlines()] == [2]
+    assert sla.stats()["rescheduled"] == {KIND_UNCLAIMED: 1}
+
+
+def test_failed_handler_is_retried_later(store):
+    async def handler(record):
+        raise RuntimeError("Discord nicht erreichbar")
+
+    async def scenario():
+        sla = make_scheduler(store, unclaimed=handler)
+        sla.schedule(1, KIND_UNCLAIMED, time.time() - 1)
+        await sla._fire(*sla._pop_due(time.time())[0])
+        return sla
+
+    before = time.time()
+    sla = asyncio.run(scenario())
+    assert sla.stats()["failed"] == {KIND_UNCLAIMED: 1}
+    assert sla._due[(1, KIND_UNCLAIMED)] >= before + sla_scheduler.RETRY_DELAY_SECONDS
+
+
+def test_activity_only_tracked_with_idle_deadline(store):
+    sla = make_scheduler(store)
+    sla.note_activity(1, 500.0)
+    assert sla.last_activity(1) is None
+    sla.schedule(1, KIND_IDLE, 10000.0)
+    sla.note_activity(1, 500.0)
+    assert sla.last_activity(1) == 500.0
+
+
+def test_activity_saved_at_most_once_per_interval(store):
+    sla = make_scheduler(store)
+    sla.schedule(1, KIND_IDLE, 10000.0)
+    sla.note_activity(1, 1000.0)
+    sla.note_activity(1, 1010.0)
+    assert sla.last_activity(1) == 1010.0
+    assert store.activity() == {1: 1000.0}
+    sla.note_activity(1, 1000.0 + sla_scheduler.ACTIVITY_SAVE_INTERVAL_SECONDS)
+    assert store.activity() == {1: 1000.0 + sla_scheduler.ACTIVITY_SAVE_INTERVAL_SECONDS}
+
+
+def test_activity_restored_on_load_and_removed_on_cancel(store):
+    sla = make_scheduler(store)
+    sla.schedule(1, KIND_IDLE, 10000.0)
+    sla.schedule(2, KIND_IDLE, 10000.0)
+    sla.note_activity(1, 1000.0)
+    sla.note_activity(2, 2000.0)
+    store.mark_closed(2, 1)
+
+    reloaded = make_scheduler(store)
+    reloaded.load(lambda record: True)
+    assert reloaded.last_activity(1) == 1000.0
+    assert reloaded.last_activity(2) is None
+    assert store.activity() == {1: 1000.0}
+
+    reloaded.cancel(1)
+    assert reloaded.last_activity(1) is None
+    assert store.activity() == {}
@@ -0,0 +1,82 @@
+import pytest
+
+import throttle
+from throttle import RateLimit, TicketThrottle
+
+GUILD_ID = 1
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(throttle.time, "monotonic", clock)
+    return clock
+
+
+def test_parse():
+    default = RateLimit(3, 600)
+    assert RateLimit.parse("5/60", "X", default) == RateLimit(5, 60.0)
+    assert RateLimit.parse(None, "X", default) is default
+    assert RateLimit.parse(" ", "X", default) is default
+    assert RateLimit.parse("0", "X", default) is None
+    assert RateLimit.parse("off", "X", default) is None
+    assert RateLimit.parse("abc", "X", default) is default
+
+
+def test_user_bucket_refills(clock):
+    limiter = TicketThrottle(RateLimit(2, 60), None, None)
+    assert limiter.acquire(GUILD_ID, 100, "bug", 0).allowed
+    assert limiter.acquire(GUILD_ID, 100, "bug", 0).allowed
+    result = limiter.acquire(GUILD_ID, 100, "bug", 0)
+    assert not result.allowed
+    assert result.scope == "user"
+    assert result.retry_after == pytest.approx(30.0)
+    assert limiter.acquire(GUILD_ID, 101, "bug", 0).allowed # Anderer Benutzer hat eigenen Bucket
+
+    clock.now += 30
+    assert limiter.acquire(GUILD_ID, 100, "bug", 0).allowed
+    assert not limiter.acquire(GUILD_ID, 100, "bug", 0).allowed
+
+
+def test_denied_request_consumes_no_tokens(clock):
+    limiter = TicketThrottle(RateLimit(5, 60), None, RateLimit(1, 60))
+    assert limiter.acquire(GUILD_ID, 100, "bug", 0).allowed
+    assert limiter.acquire(GUILD_ID, 100, "bug", 0).scope == "guild"
+    # Der Benutzer-Bucket wurde bei der Ablehnung nicht belastet
+    assert limiter._buckets["user"][(GUILD_ID, 100)].tokens == 4
+    assert limiter.stats()["throttled"] == {"guild": 1}
+
+
+def test_category_bucket_per_guild(clock):
+    limiter = TicketThrottle(None, RateLimit(1, 60), None)
+    assert limiter.acquire(GUILD_ID, 100, "bug", 0).allowed
+    assert limiter.acquire(GUILD_ID, 101, "bug", 0).scope == "category"
+    assert limiter.acquire(GUILD_ID, 101, "help", 0).allowed
+    assert limiter.acquire(GUILD_ID + 1, 101, "bug", 0).allowed
+
+
+def test_max_open_tickets(clock):
+    limiter = TicketThrottle(RateLimit(5, 60), None, None, max_open_per_user=2)
+    assert limiter.acquire(GUILD_ID, 100, "bug", 1).allowed
+    result = limiter.acquire(GUILD_ID, 100, "bug", 2)
+    assert not result.allowed and result.scope == "open_tickets"
+    assert limiter._buckets["user"][(GUILD_ID, 100)].tokens == 4
+    assert TicketThrottle(None, None, None).check_open_tickets(100).allowed
+
+
+def test_sweep_drops_full_buckets(clock):
+    limiter = TicketThrottle(RateLimit(2, 2 * throttle.SWEEP_INTERVAL_SECONDS), None, None)
+    limiter.acquire(GUILD_ID, 100, "bug", 0)
+    limiter.acquire(GUILD_ID, 101, "bug", 0)
+    limiter.acquire(GUILD_ID, 101, "bug", 0)
+    clock.now += throttle.SWEEP_INTERVAL_SECONDS # 100 ist wieder voll, 101 noch nicht
+    limiter.acquire(GUILD_ID, 102, "bug", 0)
+    assert set(limiter._buckets["user"]) == {(GUILD_ID, 101), (GUILD_ID, 102)}
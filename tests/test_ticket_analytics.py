@@ -0,0 +1,123 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+from dataclasses import asdict
+
+import pytest
+
+import ticket_analytics
+from ticket_analytics import (COLUMNS, EVENT_CLAIMED, EVENT_CLOSED, EVENT_CREATED, TicketEventLog, compute_stats,
+                              load_events)
+
+GUILD_ID = 1
+OTHER_GUILD_ID = 2
+START = 1_700_000_000.0
+
+
+def write_events(directory: str, segment: str, events: list):
+    async def write():
+        event_log = TicketEventLog(directory, segment)
+        await event_log.start()
+        for event in events:
+            event_log.record(*event)
+        await event_log.stop()
+    asyncio.run(write())
+
+
+def random_events(seed: int, tickets: int, first_thread_id: int) -> list:
+    rng = random.Random(seed)
+    events = []
+    for thread_id in range(first_thread_id, first_thread_id + tickets):
+        guild_id = rng.choice((GUILD_ID, OTHER_GUILD_ID))
+        category = rng.choice(("bug", "help", "report"))
+        created = START + rng.uniform(0, 7 * 86400)
+        events.append((EVENT_CREATED, thread_id, guild_id, 500, category, created))
+        if rng.random() < 0.8:
+            claimed = created + rng.uniform(10, 7200)
+            events.append((EVENT_CLAIMED, thread_id, guild_id, rng.choice((200, 201, 202)), category, claimed))
+            if rng.random() < 0.7:
+                events.append((EVENT_CLOSED, thread_id, guild_id, rng.choice((200, 201)), category, claimed + rng.uniform(60, 86400)))
+    return events
+
+
+def assert_same_stats(left: dict, right: dict):
+    assert left["tickets"] == right["tickets"]
+    for name in ("time_to_claim", "time_to_close"):
+        assert (left[name]["all"] is None) == (right[name]["all"] is None)
+        if left[name]["all"] is not None:
+            assert asdict(left[name]["all"]) == pytest.approx(asdict(right[name]["all"]))
+        for group in ticket_analytics.GROUPS:
+            assert left[name][group].keys() == right[name][group].keys()
+            for key, stats in left[name][group].items():
+                assert asdict(stats) == pytest.approx(asdict(right[name][group][key]))
+
+
+def test_durations_and_groups(tmp_path):
+    directory = str(tmp_path)
+    write_events(directory, "cluster-0", [
+        (EVENT_CREATED, 10, GUILD_ID, 500, "bug", START),
+        (EVENT_CREATED, 11, GUILD_ID, 501, "help", START + 3600),
+        (EVENT_CLAIMED, 10, GUILD_ID, 200, "bug", START + 60),
+        (EVENT_CLAIMED, 11, GUILD_ID, 201, "help", START + 3600 + 180),
+        (EVENT_CLOSED, 10, GUILD_ID, 200, "bug", START + 600),
+        (EVENT_CREATED, 12, OTHER_GUILD_ID, 502, "bug", START),
+    ])
+    result = compute_stats(load_events(directory, use_numpy=False), guild_id=GUILD_ID)
+    assert result["tickets"] == 2
+    claim = result["time_to_claim"]
+    assert asdict(claim["all"]) == {"count": 2, "mean": 120.0, "p50": 120.0, "p90": 168.0}
+    assert claim["category"]["bug"].mean == 60.0
+    assert claim["category"]["help"].mean == 180.0
+    assert set(claim["moderator"]) == {200, 201}
+    assert result["time_to_close"]["all"].count == 1
+    assert result["time_to_close"]["all"].mean == 600.0
+
+
+def test_since_filters_by_creation_time(tmp_path):
+    directory = str(tmp_path)
+    write_events(directory, "cluster-0", [
+        (EVENT_CREATED, 10, GUILD_ID, 500, "bug", START),
+        (EVENT_CLAIMED, 10, GUILD_ID, 200, "bug", START + 7200),
+        (EVENT_CREATED, 11, GUILD_ID, 500, "bug", START + 3600),
+        (EVENT_CLAIMED, 11, GUILD_ID, 200, "bug", START + 3660),
+    ])
+    result = compute_stats(load_events(directory, use_numpy=False), since=START + 1800)
+    assert result["tickets"] == 1
+    assert result["time_to_claim"]["all"].mean == 60.0
+
+
+@pytest.mark.skipif(ticket_analytics._load_numpy() is None, reason="NumPy nicht installiert")
+@pytest.mark.parametrize("guild_id", [None, GUILD_ID])
+def test_numpy_and_array_results_match(tmp_path, guild_id):
+    directory = str(tmp_path)
+    # Zwei Segmente mit unterschiedlicher Reihenfolge der Kategorien, damit die Codes zusammengeführt werden müssen
+    write_events(directory, "cluster-0", random_events(1, 300, 1000))
+    write_events(directory, "cluster-1", random_events(2, 300, 5000))
+    since = START + 86400
+    with_numpy = compute_stats(load_events(directory, use_numpy=True), guild_id, since)
+    with_array = compute_stats(load_events(directory, use_numpy=False), guild_id, since)
+    assert with_numpy["tickets"] > 0
+    assert_same_stats(with_numpy, with_array)
+
+
+def test_open_truncates_partial_rows(tmp_path):
+    directory = str(tmp_path)
+    write_events(directory, "cluster-0", [(EVENT_CREATED, 10, GUILD_ID, 500, "bug", START)])
+    # Abgebrochener Schreibvorgang: nur die erste Spalte der zweiten Zeile wurde geschrieben
+    with open(os.path.join(directory, "cluster-0", COLUMNS[0][0] + ".bin"), "ab") as f:
+        f.write(b"\0" * 8)
+    write_events(directory, "cluster-0", [(EVENT_CREATED, 11, GUILD_ID, 500, "help", START)])
+    events = load_events(directory, use_numpy=False)
+    assert len(events) == 2
+    assert list(events.columns["thread_id"]) == [10, 11]
+    assert events.categories == ["bug", "help"]
+
+
+def test_import_does_not_load_numpy():
+    # Der Bot importiert das Modul beim Start; NumPy darf erst bei der ersten Auswertung geladen werden
+    code = "import sys, ticket_analytics; print('numpy' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
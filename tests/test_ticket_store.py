@@ -0,0 +1,128 @@
+import pytest
+
+from ticket_store import STATUS_CLAIMED, STATUS_CLOSED, STATUS_OPEN, TicketStore
+
+GUILD_ID = 1
+CREATOR_ID = 100
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TicketStore(str(tmp_path / "tickets.db"))
+    yield store
+    store.close()
+
+
+def test_create_indexes_open_ticket(store):
+    store.create(10, GUILD_ID, CREATOR_ID, "bug")
+    assert store.get(10).status == STATUS_OPEN
+    assert store.count_open(GUILD_ID, CREATOR_ID) == 1
+    assert store.find_open(GUILD_ID, CREATOR_ID, "bug").thread_id == 10
+    assert store.find_open(GUILD_ID, CREATOR_ID, "help") is None
+    assert [record.thread_id for record in store.open_in_guild(GUILD_ID)] == [10]
+
+
+def test_claim_only_once(store):
+    store.create(10, GUILD_ID, CREATOR_ID, "bug")
+    assert store.mark_claimed(10, 200)
+    assert not store.mark_claimed(10, 201)
+    record = store.get(10)
+    assert record.status == STATUS_CLAIMED
+    assert record.claimer_id == 200
+    assert not store.mark_claimed(99, 200) # Unbekanntes Ticket
+
+
+def test_reassign_keeps_first_claim_time(store):
+    store.create(10, GUILD_ID, CREATOR_ID, "bug")
+    store.mark_claimed(10, 200)
+    claimed_at = store.get(10).claimed_at
+    assert store.reassign(10, 201)
+    assert store.get(10).claimer_id == 201
+    assert store.get(10).claimed_at == claimed_at
+
+
+def test_reassign_claims_unclaimed_ticket(store):
+    store.create(10, GUILD_ID, CREATOR_ID, "bug")
+    assert store.reassign(10, 201)
+    assert store.get(10).status == STATUS_CLAIMED
+    assert store.get(10).claimed_at is not None
+
+
+def test_close_only_once_and_updates_indexes(store):
+    store.create(10, GUILD_ID, CREATOR_ID, "bug")
+    assert store.mark_closed(10, 200)
+    assert not store.mark_closed(10, 201)
+    assert store.get(10).status == STATUS_CLOSED
+    assert store.get(10).closer_id == 200
+    assert store.count_open(GUILD_ID, CREATOR_ID) == 0
+    assert store.count_all_open() == 0
+    assert not store.mark_claimed(10, 200)
+    assert not store.reassign(10, 200)
+
+
+def test_reopen_restores_claim_and_indexes(store):
+    store.create(10, GUILD_ID, CREATOR_ID, "bug")
+    store.create(11, GUILD_ID, CREATOR_ID, "help")
+    store.mark_claimed(10, 200)
+    store.mark_closed(10, 200)
+    store.mark_closed(11, 200)
+
+    assert store.reopen(10)
+    assert store.reopen(11)
+    assert not store.reopen(11) # Nicht geschlossen
+    assert store.get(10).status == STATUS_CLAIMED
+    assert store.get(10).claimer_id == 200
+    assert store.get(11).status == STATUS_OPEN
+    assert store.get(10).closer_id is None and store.get(10).closed_at is None
+    assert store.count_open(GUILD_ID, CREATOR_ID) == 2
+
+
+def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "tickets.db")
+    store = TicketStore(path)
+    store.create(10, GUILD_ID, CREATOR_ID, "bug")
+    store.create(11, GUILD_ID, CREATOR_ID, "help")
+    store.mark_claimed(10, 200)
+    store.mark_closed(11, 200)
+    store.set_activity(10, 1234.5)
+    store.close()
+
+    store = TicketStore(path)
+    assert store.get(10).claimer_id == 200
+    assert store.get(11).status == STATUS_CLOSED
+    assert store.count_open(GUILD_ID, CREATOR_ID) == 1
+    assert store.activity() == {10: 1234.5}
+    store.close()
+
+
+def test_creation_lock(store):
+    assert store.try_lock_creation(GUILD_ID, CREATOR_ID, "bug", "a", ttl=60)
+    assert not store.try_lock_creation(GUILD_ID, CREATOR_ID, "bug", "b", ttl=60)
+    store.unlock_creation(GUILD_ID, CREATOR_ID, "bug", "b") # Fremder Besitzer gibt nicht frei
+    assert store.is_creation_locked(GUILD_ID, CREATOR_ID, "bug")
+    store.unlock_creation(GUILD_ID, CREATOR_ID, "bug", "a")
+    assert store.try_lock_creation(GUILD_ID, CREATOR_ID, "bug", "b", ttl=60)
+
+
+def test_processes_sharing_the_database_do_not_overwrite_each_other(tmp_path):
+    path = str(tmp_path / "tickets.db")
+    first = TicketStore(path)
+    first.create(10, GUILD_ID, CREATOR_ID, "bug")
+    second = TicketStore(path) # Zweiter Bot-Prozess, Speicher ab hier nicht mehr aktuell
+    assert first.mark_claimed(10, 200)
+    assert not second.mark_claimed(10, 201) # Bereits von first geclaimed
+    assert second.get(10).claimer_id == 200 # Neu aus der Datenbank gelesen
+
+    assert second.mark_closed(10, 201)
+    assert not first.reassign(10, 202) # Veralteter Speicher: Schließung bleibt erhalten
+    record = first.get(10)
+    assert (record.status, record.claimer_id, record.closer_id) == (STATUS_CLOSED, 200, 201)
+    assert first.count_open(GUILD_ID, CREATOR_ID) == 0
+    assert not first.mark_closed(10, 202)
+    first.close()
+    second.close()
+
+    store = TicketStore(path)
+    record = store.get(10)
+    assert (record.status, record.claimer_id, record.closer_id) == (STATUS_CLOSED, 200, 201)
+    store.close()
@@ -0,0 +1,132 @@
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional
+
+log = logging.getLogger(__name__)
+
+# Volle Buckets werden höchstens so oft aus dem Speicher entfernt (Sekunden)
+SWEEP_INTERVAL_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Token-Bucket-Grenze: höchstens `capacity` Tickets am Stück, danach eines pro `period / capacity` Sekunden."""
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, raw: Optional[str], name: str, default: Optional['RateLimit']) -> Optional['RateLimit']:
+        """Liest eine Grenze im Format "Anzahl/Sekunden" (z.B. "3/600"). "0" oder "off" schaltet sie ab."""
+        if raw is None or not raw.strip():
+            return default
+        raw = raw.strip().lower()
+        if raw in ("0", "off"):
+            return None
+        try:
+            capacity, period = raw.split("/", 1)
+            limit = cls(int(capacity), float(period))
+        except ValueError:
+            log.warning("%s ('%s') hat nicht das Format Anzahl/Sekunden, verwende Standard.", name, raw)
+            return default
+        if limit.capacity <= 0 or limit.period <= 0:
+            return None
+        return limit
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+@dataclass(frozen=True)
+class ThrottleResult:
+    allowed: bool
+    scope: Optional[str] = None # "user", "category", "guild" oder "open_tickets"
+    retry_after: float = 0.0
+
+
+class TicketThrottle:
+    """
+    Begrenzt die Ticket-Erstellung vollständig im Speicher, bevor das Modal angezeigt wird:
+    Token-Buckets pro Benutzer, pro Kategorie einer Guild und pro Guild sowie eine Höchstzahl offener Tickets pro Benutzer.
+    Ein Token wird nur verbraucht, wenn alle Buckets eines haben; Prüfen und Verbrauchen laufen ohne await dazwischen.
+    Buckets, die wieder voll sind, tragen keine Information mehr und werden regelmäßig entfernt.
+    """
+
+    def __init__(self, user_limit: Optional[RateLimit], category_limit: Optional[RateLimit],
+                 guild_limit: Optional[RateLimit], max_open_per_user: int = 0):
+        self.limits = {"user": user_limit, "category": category_limit, "guild": guild_limit}
+        self.max_open_per_user = max_open_per_user
+        self._buckets: Dict[str, Dict[Hashable, _Bucket]] = {scope: {} for scope in self.limits}
+        self._last_sweep = time.monotonic()
+        # Zähler
+        self.allowed = 0
+        self.throttled = Counter()
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "throttled": dict(self.throttled),
+            "buckets": {scope: len(buckets) for scope, buckets in self._buckets.items()},
+        }
+
+    @staticmethod
+    def _refill(bucket: _Bucket, limit: RateLimit, now: float):
+        bucket.tokens = min(limit.capacity, bucket.tokens + (now - bucket.updated) * limit.rate)
+        bucket.updated = now
+
+    def _sweep(self, now: float):
+        for scope, buckets in self._buckets.items():
+            limit = self.limits[scope]
+            for key in [key for key, bucket in buckets.items()
+                        if limit is None or bucket.tokens + (now - bucket.updated) * limit.rate >= limit.capacity]:
+                del buckets[key]
+        self._last_sweep = now
+
+    def _deny(self, scope: str, retry_after: float = 0.0) -> ThrottleResult:
+        self.throttled[scope] += 1
+        return ThrottleResult(False, scope, retry_after)
+
+    def check_open_tickets(self, open_tickets: int) -> ThrottleResult:
+        """Prüft nur die Höchstzahl offener Tickets (z.B. erneut beim Absenden des Modals)."""
+        if self.max_open_per_user and open_tickets >= self.max_open_per_user:
+            return self._deny("open_tickets")
+        return ThrottleResult(True)
+
+    def acquire(self, guild_id: Optional[int], user_id: int, category_id: str, open_tickets: int) -> ThrottleResult:
+        """Verbraucht ein Token aus jedem Bucket, falls alle eines haben. Sonst bleibt alles unverändert."""
+        result = self.check_open_tickets(open_tickets)
+        if not result.allowed:
+            return result
+
+        now = time.monotonic()
+        if now - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+            self._sweep(now)
+
+        keys = {"user": (guild_id, user_id), "category": (guild_id, category_id), "guild": guild_id}
+        buckets = []
+        for scope, limit in self.limits.items():
+            if limit is None:
+                continue
+            bucket = self._buckets[scope].get(keys[scope])
+            if bucket is None:
+                bucket = self._buckets[scope][keys[scope]] = _Bucket(limit.capacity, now)
+            else:
+                self._refill(bucket, limit, now)
+            if bucket.tokens < 1:
+                return self._deny(scope, (1 - bucket.tokens) / limit.rate)
+            buckets.append(bucket)
+
+        for bucket in buckets:
+            bucket.tokens -= 1
+        self.allowed += 1
+        return ThrottleResult(True)
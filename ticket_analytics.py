@@ -0,0 +1,460 @@
+"""
+Ticket-Statistiken (Zeit bis Claim, Zeit bis Schließen) pro Kategorie, Moderator und Stunde.
+
+Erstellen, Claimen und Schließen werden als Ereignisse in Spalten-Dateien fester Breite geschrieben (ein Segment pro
+Bot-Prozess, `<verzeichnis>/<segment>/<spalte>.bin`, 35 Bytes pro Ereignis). Der Bot puffert Ereignisse im Speicher und
+hängt sie gebündelt in einem Worker-Thread an. Zum Auswerten werden die Spalten direkt als Arrays geladen
+(numpy.fromfile bzw. array.fromfile) und in einem Durchlauf verknüpft und gruppiert; mit NumPy (requirements.txt)
+vektorisiert. NumPy wird erst bei der ersten Auswertung importiert. Fehlt NumPy, rechnet das array-Modul mit denselben
+Ergebnissen, aber rund fünfmal langsamer.
+
+Auswertung ohne laufenden Bot:
+    python ticket_analytics.py [--dir ticket_events] [--guild ID] [--days 30] [--group category|moderator|hour] [--json]
+Bestehende Tickets aus der Ticket-Datenbank einmalig als Ereignisse übernehmen:
+    python ticket_analytics.py --import-db tickets.db
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import operator
+import os
+import sqlite3
+import time
+from array import array
+from collections import Counter
+from dataclasses import asdict, dataclass
+from itertools import compress, repeat
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# NumPy wird erst bei der ersten Auswertung importiert (_load_numpy): der Bot braucht beim Start nur TicketEventLog,
+# der Import kostet sonst bei jedem Start rund 100 ms für einen selten genutzten Befehl
+np = None
+_numpy_checked = False
+
+
+def _load_numpy():
+    """Importiert NumPy beim ersten Aufruf. None, wenn NumPy fehlt (steht in requirements.txt; sonst rechnet das array-Modul)."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np
+
+# Arten von Ereignissen
+EVENT_CREATED = 1
+EVENT_CLAIMED = 2
+EVENT_CLOSED = 3
+
+# Spalten (Name, Typcode des array-Moduls bzw. NumPy-dtype), in nativer Byte-Reihenfolge
+COLUMNS = (("ts", "d"), ("thread_id", "q"), ("guild_id", "q"), ("actor_id", "q"), ("kind", "B"), ("category", "H"))
+CATEGORIES_FILE = "categories.json"
+IMPORT_SEGMENT = "import"
+GROUPS = ("category", "moderator", "hour")
+
+
+@dataclass
+class DurationStats:
+    count: int
+    mean: float
+    p50: float
+    p90: float
+
+
+def _column_path(segment_dir: str, name: str) -> str:
+    return os.path.join(segment_dir, f"{name}.bin")
+
+
+def _row_count(segment_dir: str) -> int:
+    """Vollständige Zeilen eines Segments (nach einem Absturz während des Schreibens können Spalten ungleich lang sein)."""
+    counts = []
+    for name, typecode in COLUMNS:
+        try:
+            counts.append(os.path.getsize(_column_path(segment_dir, name)) // array(typecode).itemsize)
+        except OSError:
+            counts.append(0)
+    return min(counts)
+
+
+class TicketEventLog:
+    """
+    Schreibt Ticket-Ereignisse in ein eigenes Segment. `record` hängt nur an Arrays im Speicher an und ist damit billig
+    genug für den Hot Path; ein Task schreibt den Puffer alle `flush_interval` Sekunden in einem Worker-Thread.
+    """
+
+    def __init__(self, directory: str = "ticket_events", segment: str = "cluster-0", flush_interval: float = 5.0):
+        self.directory = directory
+        self.segment_dir = os.path.join(directory, segment)
+        self.flush_interval = flush_interval
+        self._buffer = {name: array(typecode) for name, typecode in COLUMNS}
+        self._categories: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._categories_dirty = False
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer["ts"])
+
+    def open(self):
+        """Legt das Segment an, lädt dessen Kategorien und kürzt unvollständige Zeilen eines früheren Absturzes."""
+        os.makedirs(self.segment_dir, exist_ok=True)
+        try:
+            with open(os.path.join(self.segment_dir, CATEGORIES_FILE), "r", encoding="utf-8") as f:
+                self._categories = json.load(f)
+        except FileNotFoundError:
+            self._categories = []
+        self._codes = {category: code for code, category in enumerate(self._categories)}
+        rows = _row_count(self.segment_dir)
+        for name, typecode in COLUMNS:
+            path = _column_path(self.segment_dir, name)
+            if os.path.exists(path) and os.path.getsize(path) != rows * array(typecode).itemsize:
+                os.truncate(path, rows * array(typecode).itemsize)
+
+    def record(self, kind: int, thread_id: int, guild_id: Optional[int], actor_id: int, category_id: str,
+               timestamp: Optional[float] = None):
+        code = self._codes.get(category_id)
+        if code is None:
+            code = self._codes[category_id] = len(self._categories)
+            self._categories.append(category_id)
+            self._categories_dirty = True
+        buffer = self._buffer
+        buffer["ts"].append(timestamp or time.time())
+        buffer["thread_id"].append(thread_id)
+        buffer["guild_id"].append(guild_id or 0)
+        buffer["actor_id"].append(actor_id or 0)
+        buffer["kind"].append(kind)
+        buffer["category"].append(code)
+
+    def _write(self, columns: Dict[str, array], categories: Optional[List[str]]):
+        if categories is not None: # Zuerst das Wörterbuch, damit jede geschriebene Zeile einen bekannten Code hat
+            tmp_path = os.path.join(self.segment_dir, CATEGORIES_FILE + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(categories, f, ensure_ascii=False)
+            os.replace(tmp_path, os.path.join(self.segment_dir, CATEGORIES_FILE))
+        for name, _ in COLUMNS:
+            with open(_column_path(self.segment_dir, name), "ab") as f:
+                columns[name].tofile(f)
+
+    async def flush(self):
+        """Schreibt alle gepufferten Ereignisse (z.B. vor einer Auswertung mit /ticket_stats)."""
+        async with self._lock:
+            if not self.pending and not self._categories_dirty:
+                return
+            columns, self._buffer = self._buffer, {name: array(typecode) for name, typecode in COLUMNS}
+            categories = list(self._categories) if self._categories_dirty else None
+            self._categories_dirty = False
+            try:
+                await asyncio.to_thread(self._write, columns, categories)
+                self.written += len(columns["ts"])
+            except OSError as e:
+                self.failed += len(columns["ts"])
+                log.error("Ticket-Ereignisse konnten nicht geschrieben werden (%d verworfen): %s", len(columns["ts"]), e)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        await asyncio.to_thread(self.open)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="ticket-event-log")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+class EventColumns:
+    """Alle Ereignisse aller Segmente als Spalten (NumPy-Arrays oder array.array) mit gemeinsamen Kategorie-Codes."""
+
+    def __init__(self, columns: Dict[str, object], categories: List[str]):
+        self.columns = columns
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.columns["ts"])
+
+
+def load_events(directory: str, use_numpy: bool = True) -> EventColumns:
+    use_numpy = use_numpy and _load_numpy() is not None
+    codes: Dict[str, int] = {} # Gemeinsame Codes über alle Segmente
+    parts: Dict[str, list] = {name: [] for name, _ in COLUMNS}
+    segments = sorted(entry for entry in os.listdir(directory) if os.path.isdir(os.path.join(directory, entry))) if os.path.isdir(directory) else []
+    for segment in segments:
+        segment_dir = os.path.join(directory, segment)
+        rows = _row_count(segment_dir)
+        if not rows:
+            continue
+        with open(os.path.join(segment_dir, CATEGORIES_FILE), "r", encoding="utf-8") as f:
+            segment_categories = json.load(f)
+        remap = [codes.setdefault(category, len(codes)) for category in segment_categories]
+        for name, typecode in COLUMNS:
+            path = _column_path(segment_dir, name)
+            if use_numpy:
+                values = np.fromfile(path, dtype=np.dtype(typecode), count=rows)
+            else:
+                values = array(typecode)
+                with open(path, "rb") as f:
+                    values.fromfile(f, rows)
+            if name == "category" and remap != list(range(len(remap))):
+                values = np.asarray(remap, dtype=np.uint16)[values] if use_numpy else array("H", (remap[code] for code in values))
+            parts[name].append(values)
+    columns = {}
+    for name, typecode in COLUMNS:
+        if use_numpy:
+            columns[name] = np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=np.dtype(typecode))
+        else:
+            merged = array(typecode)
+            for values in parts[name]:
+                merged.extend(values)
+            columns[name] = merged
+    return EventColumns(columns, list(codes))
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    """Lineare Interpolation wie numpy.percentile."""
+    position = (len(sorted_values) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _stats_sorted(values: list) -> DurationStats:
+    return DurationStats(len(values), sum(values) / len(values), _percentile(values, 0.5), _percentile(values, 0.9))
+
+
+def _stats_numpy(values) -> DurationStats:
+    p50, p90 = np.percentile(values, [50, 90])
+    return DurationStats(int(values.size), float(values.mean()), float(p50), float(p90))
+
+
+def _group_numpy(keys, values) -> Dict[int, DurationStats]:
+    if not values.size:
+        return {}
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    unique_keys, starts = np.unique(keys, return_index=True)
+    ends = list(starts[1:]) + [keys.size]
+    return {int(key): _stats_numpy(values[start:end]) for key, start, end in zip(unique_keys, starts, ends)}
+
+
+def _durations_numpy(columns: dict, created_mask, kind: int, guild_mask):
+    """Verknüpft Claim- bzw. Close-Ereignisse über die Thread-ID mit dem Erstellen: (Dauer, Kategorie, Akteur, Stunde)."""
+    created_threads = columns["thread_id"][created_mask]
+    order = np.argsort(created_threads)
+    created_threads = created_threads[order]
+    created_ts = columns["ts"][created_mask][order]
+    created_category = columns["category"][created_mask][order]
+
+    mask = (columns["kind"] == kind) & guild_mask
+    threads, ts, actors = columns["thread_id"][mask], columns["ts"][mask], columns["actor_id"][mask]
+    if not created_threads.size or not threads.size:
+        empty = np.zeros(0, dtype=np.int64)
+        return np.zeros(0), empty, empty, empty
+    index = np.minimum(np.searchsorted(created_threads, threads), created_threads.size - 1)
+    found = created_threads[index] == threads
+    index = index[found]
+    origin = created_ts[index]
+    return ts[found] - origin, created_category[index].astype(np.int64), actors[found], ((origin // 3600) % 24).astype(np.int64)
+
+
+def _compute_numpy(events: EventColumns, guild_id: Optional[int], since: Optional[float]) -> dict:
+    columns = events.columns
+    guild_mask = columns["guild_id"] == guild_id if guild_id is not None else np.ones(len(events), dtype=bool)
+    created_mask = (columns["kind"] == EVENT_CREATED) & guild_mask
+    if since is not None:
+        created_mask &= columns["ts"] >= since
+    result = {"tickets": int(created_mask.sum())}
+    for name, kind in (("time_to_claim", EVENT_CLAIMED), ("time_to_close", EVENT_CLOSED)):
+        durations, categories, actors, hours = _durations_numpy(columns, created_mask, kind, guild_mask)
+        result[name] = {
+            "all": _stats_numpy(durations) if durations.size else None,
+            "category": _group_numpy(categories, durations),
+            "moderator": _group_numpy(actors, durations),
+            "hour": _group_numpy(hours, durations),
+        }
+    return result
+
+
+def _kind_mask(kinds: array, kind: int) -> bytes:
+    """Maske (ein Byte 0/1 pro Ereignis) über bytes.translate, ohne Python-Schleife."""
+    table = bytearray(256)
+    table[kind] = 1
+    return kinds.tobytes().translate(table)
+
+
+def _and(mask: bytes, other: Optional[bytes]) -> bytes:
+    return mask if other is None else bytes(map(operator.and_, mask, other))
+
+
+def _group_python(keys: list, sorted_values: list) -> Dict[int, DurationStats]:
+    """`sorted_values` ist aufsteigend sortiert; die stabile Sortierung nach Schlüssel erhält diese Ordnung je Gruppe."""
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    values = list(map(sorted_values.__getitem__, order))
+    groups, start = {}, 0
+    for key, count in sorted(Counter(keys).items()):
+        groups[key] = _stats_sorted(values[start:start + count])
+        start += count
+    return groups
+
+
+def _compute_python(events: EventColumns, guild_id: Optional[int], since: Optional[float]) -> dict:
+    # Ohne NumPy: Filtern, Verknüpfen und Gruppieren über bytes.translate, itertools.compress, map und sorted,
+    # also in C-Schleifen statt einer Python-Schleife pro Ereignis
+    columns = events.columns
+    guild_mask = bytes(map(guild_id.__eq__, columns["guild_id"])) if guild_id is not None else None
+    created_mask = _and(_kind_mask(columns["kind"], EVENT_CREATED), guild_mask)
+    created = [list(compress(columns[name], created_mask)) for name in ("thread_id", "ts", "category")]
+    if since is not None:
+        recent = bytes(map(float(since).__le__, created[1]))
+        created = [list(compress(values, recent)) for values in created]
+    ts_by_thread = dict(zip(created[0], created[1]))
+    category_by_thread = dict(zip(created[0], created[2]))
+
+    result = {"tickets": len(ts_by_thread)}
+    for name, kind in (("time_to_claim", EVENT_CLAIMED), ("time_to_close", EVENT_CLOSED)):
+        mask = _and(_kind_mask(columns["kind"], kind), guild_mask)
+        threads = list(compress(columns["thread_id"], mask))
+        origins = list(map(ts_by_thread.get, threads))
+        found = bytes(map(operator.is_not, origins, repeat(None)))
+        threads, origins = list(compress(threads, found)), list(compress(origins, found))
+        durations = list(map(operator.sub, compress(compress(columns["ts"], mask), found), origins))
+        group_keys = {
+            "category": list(map(category_by_thread.__getitem__, threads)),
+            "moderator": list(compress(compress(columns["actor_id"], mask), found)),
+            "hour": list(map(int, map(operator.mod, map(operator.floordiv, origins, repeat(3600)), repeat(24)))),
+        }
+        order = sorted(range(len(durations)), key=durations.__getitem__)
+        sorted_durations = list(map(durations.__getitem__, order))
+        result[name] = {"all": _stats_sorted(sorted_durations) if durations else None}
+        for group, keys in group_keys.items():
+            result[name][group] = _group_python(list(map(keys.__getitem__, order)), sorted_durations)
+    return result
+
+
+def compute_stats(events: EventColumns, guild_id: Optional[int] = None, since: Optional[float] = None) -> dict:
+    """
+    Zeit bis Claim und bis Schließen (Anzahl, Mittelwert, Median, 90. Perzentil in Sekunden), gesamt und pro Kategorie,
+    Moderator (Claimer bzw. Schließender) und Stunde der Erstellung (UTC). `since` filtert nach Erstellungszeitpunkt.
+    Kategorien werden als category_id zurückgegeben.
+    """
+    if _load_numpy() is not None and isinstance(events.columns["ts"], np.ndarray):
+        result = _compute_numpy(events, guild_id, since)
+    else:
+        if np is None and len(events) > 100000:
+            log.warning("NumPy ist nicht installiert, Auswertung von %d Ereignissen mit dem array-Modul (deutlich langsamer).", len(events))
+        result = _compute_python(events, guild_id, since)
+    for name in ("time_to_claim", "time_to_close"):
+        result[name]["category"] = {events.categories[code]: stats for code, stats in result[name]["category"].items()}
+    return result
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} s"
+    minutes, hours, days = seconds // 60, seconds // 3600, seconds // 86400
+    if days:
+        return f"{days} Tg {hours % 24} Std"
+    if hours:
+        return f"{hours} Std {minutes % 60} Min"
+    return f"{minutes} Min"
+
+
+def format_row(label: str, claim: Optional[DurationStats], close: Optional[DurationStats]) -> str:
+    def part(name: str, stats: Optional[DurationStats]) -> str:
+        if stats is None:
+            return f"{name}: —"
+        return f"{name}: {stats.count}× Median {format_duration(stats.p50)} (p90 {format_duration(stats.p90)})"
+    return f"{label} · {part('Claim', claim)} · {part('Schließen', close)}"
+
+
+def group_rows(result: dict, group: str, limit: Optional[int] = None) -> List[Tuple[object, Optional[DurationStats], Optional[DurationStats]]]:
+    """Zeilen (Schlüssel, Claim-Statistik, Close-Statistik) einer Gruppierung, Stunden chronologisch, sonst nach Anzahl."""
+    claims, closes = result["time_to_claim"][group], result["time_to_close"][group]
+    keys = set(claims) | set(closes)
+    if group == "hour":
+        ordered = sorted(keys)
+    else:
+        ordered = sorted(keys, key=lambda key: -max(getattr(claims.get(key), "count", 0), getattr(closes.get(key), "count", 0)))
+    return [(key, claims.get(key), closes.get(key)) for key in ordered[:limit]]
+
+
+def import_ticket_db(db_path: str, directory: str) -> int:
+    """Übernimmt Erstellen, Claim und Schließen der Tickets aus der Ticket-Datenbank in ein eigenes Segment (einmalig)."""
+    event_log = TicketEventLog(directory, IMPORT_SEGMENT)
+    if os.path.isdir(event_log.segment_dir) and _row_count(event_log.segment_dir):
+        raise SystemExit(f"FEHLER: {event_log.segment_dir} existiert bereits, die Tickets wurden schon übernommen.")
+    event_log.open()
+    connection = sqlite3.connect(db_path)
+    rows = connection.execute("SELECT thread_id, guild_id, creator_id, category_id, claimer_id, closer_id,"
+                              " created_at, claimed_at, closed_at FROM tickets ORDER BY created_at").fetchall()
+    connection.close()
+    for thread_id, guild_id, creator_id, category_id, claimer_id, closer_id, created_at, claimed_at, closed_at in rows:
+        event_log.record(EVENT_CREATED, thread_id, guild_id, creator_id, category_id, created_at)
+        if claimed_at:
+            event_log.record(EVENT_CLAIMED, thread_id, guild_id, claimer_id, category_id, claimed_at)
+        if closed_at:
+            event_log.record(EVENT_CLOSED, thread_id, guild_id, closer_id, category_id, closed_at)
+    asyncio.run(event_log.flush())
+    return event_log.written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticket-Statistiken aus den Ereignis-Dateien des Bots.")
+    parser.add_argument("--dir", default=os.getenv("TICKET_EVENTS_DIR") or "ticket_events", help="Verzeichnis der Ereignis-Dateien")
+    parser.add_argument("--guild", type=int, help="Nur diese Guild")
+    parser.add_argument("--days", type=float, default=0, help="Nur Tickets der letzten N Tage (0 = alle)")
+    parser.add_argument("--group", choices=GROUPS + ("all",), default="all", help="Gruppierung der Ausgabe")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    parser.add_argument("--no-numpy", action="store_true", help="Auch mit installiertem NumPy das array-Modul verwenden")
+    parser.add_argument("--import-db", metavar="TICKETS_DB", help="Bestehende Tickets aus der Ticket-Datenbank übernehmen und beenden")
+    args = parser.parse_args()
+
+    if args.import_db:
+        print(f"{import_ticket_db(args.import_db, args.dir)} Ereignisse nach {os.path.join(args.dir, IMPORT_SEGMENT)} übernommen.")
+        return
+
+    started = time.perf_counter()
+    events = load_events(args.dir, use_numpy=not args.no_numpy)
+    loaded = time.perf_counter()
+    result = compute_stats(events, args.guild, time.time() - args.days * 86400 if args.days else None)
+    computed = time.perf_counter()
+
+    if args.json:
+        def convert(value):
+            if isinstance(value, DurationStats):
+                return asdict(value)
+            if isinstance(value, dict):
+                return {str(key): convert(item) for key, item in value.items()}
+            return value
+        print(json.dumps(convert(result), ensure_ascii=False, indent=2))
+        return
+
+    backend = "NumPy" if not args.no_numpy and _load_numpy() is not None else "array"
+    print(f"{len(events)} Ereignisse, {result['tickets']} Tickets (Laden {loaded - started:.3f}s, Auswertung {computed - loaded:.3f}s, {backend})")
+    print(format_row("Gesamt", result["time_to_claim"]["all"], result["time_to_close"]["all"]))
+    titles = {"category": "Pro Kategorie", "moderator": "Pro Moderator (User-ID)", "hour": "Pro Stunde der Erstellung (UTC)"}
+    for group in (GROUPS if args.group == "all" else (args.group,)):
+        print(f"\n{titles[group]}:")
+        for key, claim, close in group_rows(result, group):
+            print("  " + format_row(f"{key:02d} Uhr" if group == "hour" else str(key), claim, close))
+
+
+if __name__ == "__main__":
+    main()
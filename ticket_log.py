@@ -0,0 +1,41 @@
+import datetime
+from typing import Optional
+
+import discord
+
+from audit_log import AuditLogWriter
+from guild_config import GuildConfigStore
+
+
+class TicketLog:
+    """
+    Baut die Log-Embeds für Ticket-Aktionen (Erstellen, Claim, Schließen) und übergibt sie an die Log-Pipeline.
+    Braucht nur die Guild-Konfiguration (Log-Kanal) und den AuditLogWriter, keine View- oder Interaktions-Instanz.
+    """
+
+    def __init__(self, guild_configs: GuildConfigStore, writer: AuditLogWriter):
+        self.guild_configs = guild_configs
+        self.writer = writer
+
+    def submit(self, guild_id: Optional[int], actor: discord.abc.User, action_name: str, message: str, color: discord.Color,
+               thread_id: Optional[int] = None) -> bool:
+        """Reiht einen Log-Eintrag ein, gesendet wird gebündelt im Hintergrund. False: kein Log-Kanal oder Queue voll."""
+        log_channel_id = self.guild_configs.get(guild_id).log_channel_id
+        if not log_channel_id or guild_id is None:
+            return False
+
+        embed = discord.Embed(title=f"Ticket System: {action_name}", description=message, color=color)
+        embed.set_footer(text=f"Aktion durchgeführt von: {actor.name} ({actor.id})")
+        embed.timestamp = datetime.datetime.now(datetime.timezone.utc)
+        if thread_id:
+            # Mention direkt aus der ID bauen, ohne den Thread per REST zu laden
+            embed.add_field(name="Ticket Thread", value=f"<#{thread_id}>", inline=True)
+            embed.add_field(name="Ticket ID", value=str(thread_id), inline=True)
+        return self.writer.submit(guild_id, log_channel_id, embed)
+
+    def submit_interaction(self, interaction: discord.Interaction, action_name: str, message: str, color: discord.Color,
+                           thread_id: Optional[int] = None) -> bool:
+        """Wie `submit` für eine Aktion aus einer Interaktion; in einem Ticket-Thread ist das der Thread der Interaktion."""
+        if isinstance(interaction.channel, discord.Thread): # Claim, Close
+            thread_id = interaction.channel.id
+        return self.submit(interaction.guild_id, interaction.user, action_name, message, color, thread_id)
@@ -0,0 +1,75 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import discord
+
+from category_registry import CategoryRegistry, MAX_CUSTOM_ID_LENGTH
+from ticket_store import STATUS_OPEN, TicketRecord, TicketStore
+
+# Ticket-Listen für Moderatoren
+QUEUE_OPEN = "open"           # Alle offenen (auch geclaimten) Tickets
+QUEUE_UNCLAIMED = "unclaimed" # Noch nicht geclaimte Tickets
+QUEUE_MINE = "mine"           # Vom abfragenden Moderator geclaimte Tickets
+QUEUE_TITLES = {QUEUE_OPEN: "Offene Tickets", QUEUE_UNCLAIMED: "Ungeclaimte Tickets", QUEUE_MINE: "Meine Tickets"}
+
+PAGE_SIZE = 10
+# Blätter-Buttons: Ziel-Seite, Filter und Button-Art stecken in der Custom ID (übersteht Neustarts, kein Zustand im Speicher)
+CUSTOM_ID_PREFIX = "tickets"
+NAV_PREVIOUS, NAV_NEXT, NAV_REFRESH = "p", "n", "r"
+
+
+@dataclass(frozen=True)
+class QueueQuery:
+    """Filter einer Ticket-Liste."""
+    queue: str
+    created_before: int = 0 # Unix-Zeit, 0 = ohne Altersfilter
+    category_id: str = ""   # "" = alle Kategorien
+
+    def custom_id(self, page: int, nav: str) -> str:
+        return f"{CUSTOM_ID_PREFIX}:{self.queue}:{page}:{self.created_before}:{nav}:{self.category_id}"
+
+    def fits_custom_id(self) -> bool:
+        return len(self.custom_id(0, NAV_REFRESH)) + 6 <= MAX_CUSTOM_ID_LENGTH # Platz für mehrstellige Seitenzahlen
+
+    def matches(self, record: TicketRecord, user_id: int) -> bool:
+        if self.queue == QUEUE_UNCLAIMED and record.status != STATUS_OPEN:
+            return False
+        if self.queue == QUEUE_MINE and record.claimer_id != user_id:
+            return False
+        if self.category_id and record.category_id != self.category_id:
+            return False
+        return not self.created_before or record.created_at < self.created_before
+
+
+def query_tickets(store: TicketStore, guild_id: int, query: QueueQuery, user_id: int) -> List[TicketRecord]:
+    """Passende Tickets aus dem Speicher-Index der Guild, älteste zuerst. Kein REST-Aufruf, keine Datenbankabfrage."""
+    records = [record for record in store.open_in_guild(guild_id) if query.matches(record, user_id)]
+    records.sort(key=lambda record: record.created_at)
+    return records
+
+
+def _format_line(record: TicketRecord, registry: Optional[CategoryRegistry]) -> str:
+    category = registry.get(record.category_id) if registry else None
+    line = f"<#{record.thread_id}> · {category.label if category else record.category_id} · <@{record.creator_id}> · <t:{int(record.created_at)}:R>"
+    if record.claimer_id:
+        line += f" · ✅ <@{record.claimer_id}>"
+    return line
+
+
+def render_page(records: List[TicketRecord], query: QueueQuery, page: int, registry: Optional[CategoryRegistry]):
+    """Liefert (Embed, angezeigte Seite, Anzahl Seiten); `page` wird auf den gültigen Bereich begrenzt."""
+    pages = max(1, math.ceil(len(records) / PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    lines = [_format_line(record, registry) for record in records[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]]
+    embed = discord.Embed(title=f"{QUEUE_TITLES[query.queue]} ({len(records)})", description="\n".join(lines) or "Keine Tickets gefunden.",
+                          color=discord.Color.blue())
+    filters = []
+    if query.category_id:
+        category = registry.get(query.category_id) if registry else None
+        filters.append(f"Kategorie: {category.label if category else query.category_id}")
+    if query.created_before:
+        filters.append(f"erstellt vor {time.strftime('%d.%m.%Y %H:%M', time.gmtime(query.created_before))} UTC")
+    embed.set_footer(text=" · ".join([f"Seite {page + 1}/{pages}"] + filters))
+    return embed, page, pages
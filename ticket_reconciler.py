@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Callable, List, Optional
+
+import discord
+
+import metrics
+import rest_scheduler
+from ticket_store import TicketRecord, TicketStore
+
+log = logging.getLogger(__name__)
+
+CLOSED_PREFIX = "[Geschlossen]"
+# Threads pro Seite von ForumChannel.archived_threads (ein REST-Aufruf, Maximum der API)
+ARCHIVED_PAGE_SIZE = 100
+# So viele Nachrichten am Anfang eines Threads werden nach dem Ticket-Embed durchsucht (ein REST-Aufruf)
+FIRST_MESSAGES = 5
+# Überlappung beim inkrementellen Abgleich, fängt Threads ab, die während des letzten Abgleichs archiviert wurden (Sekunden)
+CHECKPOINT_OVERLAP_SECONDS = 300.0
+
+# Übernimmt ein unbekanntes Ticket aus Thread und Embed-Nachricht in den Ticket-Speicher (None: kein Ticket)
+AdoptTicket = Callable[[discord.Thread, discord.Message], Optional[TicketRecord]]
+
+
+def is_closed_thread(thread: discord.Thread) -> bool:
+    """Geschlossene Tickets werden umbenannt, archiviert und gesperrt; ein nur archivierter Thread ist noch offen."""
+    return thread.name.startswith(CLOSED_PREFIX) or (thread.archived and thread.locked)
+
+
+class TicketReconciler:
+    """
+    Gleicht nach dem Start den Ticket-Speicher mit den Threads im Ticket-Forum ab, z.B. nach einem Ausfall, während dem
+    Tickets von Hand geschlossen wurden, oder mit einer leeren Datenbank.
+    Aktive Threads kommen ohne REST-Aufruf aus dem Gateway-Cache, archivierte Threads werden seitenweise (100 pro Aufruf)
+    gelesen; nach dem ersten vollständigen Durchlauf nur noch die seit dem letzten Abgleich archivierten.
+    Das Ticket-Embed wird nur für unbekannte offene Threads abgerufen. Alle REST-Aufrufe werden auf `rate` pro Sekunde
+    begrenzt; der Abgleich läuft im Hintergrund, Interaktionen werden währenddessen normal bearbeitet.
+    """
+
+    def __init__(self, client: discord.Client, store: TicketStore, adopt: AdoptTicket,
+                 on_open: Callable[[TicketRecord], None], on_closed: Callable[[TicketRecord], None], rate: float = 2.0):
+        self.client = client
+        self.store = store
+        self.adopt = adopt
+        self.on_open = on_open
+        self.on_closed = on_closed
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_request = 0.0
+        self.results = Counter()
+
+    def stats(self) -> dict:
+        return dict(self.results)
+
+    def _count(self, result: str):
+        self.results[result] += 1
+        metrics.RECONCILED_TOTAL.inc(result)
+
+    async def _pace(self):
+        """Wartet, bis der nächste REST-Aufruf erlaubt ist."""
+        now = time.monotonic()
+        delay = self._next_request - now
+        self._next_request = max(now, self._next_request) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _find_ticket_message(self, thread: discord.Thread) -> Optional[discord.Message]:
+        await self._pace()
+        async for message in thread.history(limit=FIRST_MESSAGES, oldest_first=True):
+            if message.author.id == self.client.user.id and message.embeds and any(
+                    field.name == "Ersteller" for field in message.embeds[0].fields):
+                return message
+        return None
+
+    async def _reconcile_thread(self, thread: discord.Thread):
+        record = self.store.get(thread.id)
+        closed = is_closed_thread(thread)
+        if record:
+            if closed and record.is_open and self.store.mark_closed(thread.id, None):
+                self.on_closed(record)
+                self._count("closed")
+            else:
+                self._count("unchanged")
+            return
+        if closed:
+            self._count("skipped") # Unbekannt und geschlossen: weder Buttons noch Fristen, Embed nicht nötig
+            return
+        message = await self._find_ticket_message(thread)
+        record = self.adopt(thread, message) if message else None
+        if record is None:
+            self._count("ignored") # Kein Ticket-Thread (z.B. von Hand erstellter Beitrag)
+            return
+        self._count("adopted")
+        if record.is_open:
+            self.on_open(record)
+
+    async def reconcile_forum(self, forum: discord.ForumChannel):
+        started_at = time.time()
+        checkpoint = self.store.reconcile_checkpoint(forum.guild.id, forum.id)
+        since = checkpoint - CHECKPOINT_OVERLAP_SECONDS if checkpoint else None
+
+        for thread in list(forum.threads): # Aktive Threads aus dem Gateway-Cache
+            await self._reconcile_thread(thread)
+
+        await self._pace()
+        count = 0
+        async for thread in forum.archived_threads(limit=None): # Absteigend nach Archivierungszeitpunkt
+            if since and thread.archive_timestamp and thread.archive_timestamp.timestamp() < since:
+                break
+            await self._reconcile_thread(thread)
+            count += 1
+            if count % ARCHIVED_PAGE_SIZE == 0:
+                await self._pace() # Vor dem Abruf der nächsten Seite
+        self.store.set_reconcile_checkpoint(forum.guild.id, forum.id, started_at)
+        log.info("Ticket-Forum %s abgeglichen (%d archivierte Threads%s).", forum.id, count,
+                 "" if since is None else " seit dem letzten Abgleich", extra={"guild_id": forum.guild.id})
+
+    async def run(self, forums) -> List[discord.ForumChannel]:
+        """
+        Gleicht die Foren nacheinander ab. Fehler in einem Forum brechen den Abgleich der übrigen nicht ab.
+        Liefert die vollständig abgeglichenen Foren.
+        """
+        rest_scheduler.background()
+        started = time.monotonic()
+        reconciled = []
+        for forum in forums:
+            try:
+                await self.reconcile_forum(forum)
+                reconciled.append(forum)
+            except discord.HTTPException as e:
+                log.warning("Ticket-Forum %s konnte nicht abgeglichen werden: %s", forum.id, e, extra={"guild_id": forum.guild.id})
+        log.info("Abgleich der Tickets abgeschlossen in %.1fs: %s", time.monotonic() - started,
+                 ", ".join(f"{result}={count}" for result, count in sorted(self.results.items())) or "keine Threads")
+        return reconciled
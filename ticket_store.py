@@ -0,0 +1,435 @@
+import sqlite3
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Status-Werte eines Tickets
+STATUS_OPEN = "open"
+STATUS_CLAIMED = "claimed"
+STATUS_CLOSED = "closed"
+
+
+@dataclass
+class TicketRecord:
+    """Zustand eines Tickets, Schlüssel ist die Thread-ID."""
+    thread_id: int
+    guild_id: Optional[int]
+    creator_id: int
+    category_id: str
+    status: str = STATUS_OPEN
+    claimer_id: Optional[int] = None
+    closer_id: Optional[int] = None
+    created_at: float = 0.0
+    claimed_at: Optional[float] = None
+    closed_at: Optional[float] = None
+    message_id: Optional[int] = None # Nachricht mit Ticket-Embed und Claim/Close-Buttons
+
+    @property
+    def is_open(self) -> bool:
+        return self.status != STATUS_CLOSED
+
+
+@dataclass
+class TranscriptRecord:
+    """Eintrag im Archiv-Index der exportierten Transkripte."""
+    thread_id: int
+    guild_id: Optional[int]
+    path: str
+    message_count: int
+    size_bytes: int
+    exported_at: float
+    log_message_id: Optional[int] = None
+
+
+@dataclass
+class EvidenceRecord:
+    """Vom Benutzer im Ticket-Thread hochgeladene Datei, abgelegt im Nachweis-Archiv."""
+    thread_id: int
+    sha256: str
+    filename: str
+    content_type: str
+    size_bytes: int
+    path: str
+    uploader_id: int
+    message_id: int
+    stored_at: float
+
+
+_EVIDENCE_COLUMNS = ("thread_id", "sha256", "filename", "content_type", "size_bytes", "path", "uploader_id", "message_id", "stored_at")
+
+_TRANSCRIPT_COLUMNS = ("thread_id", "guild_id", "path", "message_count", "size_bytes", "exported_at", "log_message_id")
+
+_COLUMNS = ("thread_id", "guild_id", "creator_id", "category_id", "status", "claimer_id",
+            "closer_id", "created_at", "claimed_at", "closed_at", "message_id")
+
+
+class TicketStore:
+    """
+    Lokaler Ticket-Speicher (SQLite), indiziert nach Thread-ID.
+    Alle Datensätze werden beim Start in ein Dict geladen, Lesezugriffe sind damit O(1)
+    und brauchen weder Embed-Parsing noch REST-Aufrufe. Schreibzugriffe gehen direkt in die Datenbank,
+    sodass der Zustand einen Neustart übersteht.
+    """
+
+    def __init__(self, path: str = "tickets.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None)  # Autocommit
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tickets ("
+            " thread_id INTEGER PRIMARY KEY,"
+            " guild_id INTEGER,"
+            " creator_id INTEGER NOT NULL,"
+            " category_id TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " claimer_id INTEGER,"
+            " closer_id INTEGER,"
+            " created_at REAL NOT NULL,"
+            " claimed_at REAL,"
+            " closed_at REAL,"
+            " message_id INTEGER)"
+        )
+        # Datenbanken älterer Versionen um neue Spalten ergänzen
+        existing_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tickets)")}
+        if "message_id" not in existing_columns:
+            self._conn.execute("ALTER TABLE tickets ADD COLUMN message_id INTEGER")
+        # Gepostete Ticket-Panels, damit sie nach einem Neuladen der Kategorien aktualisiert werden können
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS panels ("
+            " message_id INTEGER PRIMARY KEY,"
+            " channel_id INTEGER NOT NULL,"
+            " guild_id INTEGER NOT NULL)"
+        )
+        # Archiv-Index der exportierten Transkripte
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            " thread_id INTEGER PRIMARY KEY,"
+            " guild_id INTEGER,"
+            " path TEXT NOT NULL,"
+            " message_count INTEGER NOT NULL,"
+            " size_bytes INTEGER NOT NULL,"
+            " exported_at REAL NOT NULL,"
+            " log_message_id INTEGER)"
+        )
+        # Nachweise pro Ticket; dieselbe Datei (gleicher Hash) wird pro Ticket nur einmal erfasst
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS evidence ("
+            " thread_id INTEGER NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " filename TEXT NOT NULL,"
+            " content_type TEXT NOT NULL,"
+            " size_bytes INTEGER NOT NULL,"
+            " path TEXT NOT NULL,"
+            " uploader_id INTEGER NOT NULL,"
+            " message_id INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " PRIMARY KEY (thread_id, sha256))"
+        )
+        # Laufende Ticket-Erstellungen, prozessübergreifend (mehrere Bot-Prozesse teilen sich die Datenbank)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS creation_locks ("
+            " guild_id INTEGER NOT NULL,"
+            " creator_id INTEGER NOT NULL,"
+            " category_id TEXT NOT NULL,"
+            " owner TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (guild_id, creator_id, category_id))"
+        )
+        # Fristen des SLA-Schedulers (Ping bei ungeclaimten Tickets, automatisches Schließen), überstehen Neustarts
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS deadlines ("
+            " thread_id INTEGER NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " due_at REAL NOT NULL,"
+            " PRIMARY KEY (thread_id, kind))"
+        )
+        # Letzte Nachricht eines Benutzers (nicht des Bots) pro Ticket, für das automatische Schließen nach Inaktivität
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ticket_activity ("
+            " thread_id INTEGER PRIMARY KEY,"
+            " last_at REAL NOT NULL)"
+        )
+        # Letzter vollständiger Abgleich der Forum-Threads pro Guild, spätere Abgleiche lesen nur neu archivierte Threads
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reconcile_state ("
+            " guild_id INTEGER PRIMARY KEY,"
+            " forum_id INTEGER NOT NULL,"
+            " started_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tickets_by_creator ON tickets (guild_id, creator_id, status)")
+        self._tickets: Dict[int, TicketRecord] = {}
+        # Offene Tickets pro (Guild, Ersteller), z.B. für die Höchstzahl offener Tickets pro Benutzer
+        self._open_by_creator: Dict[Tuple[Optional[int], int], Set[int]] = {}
+        # Offene Tickets pro Guild (Thread-ID -> Datensatz), z.B. für die Ticket-Listen der Moderatoren
+        self._open_by_guild: Dict[Optional[int], Dict[int, TicketRecord]] = {}
+        for row in self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM tickets"):
+            record = TicketRecord(*row)
+            self._tickets[record.thread_id] = record
+            self._index_open(record, True)
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def get(self, thread_id: int) -> Optional[TicketRecord]:
+        return self._tickets.get(thread_id)
+
+    def open_tickets(self) -> List[TicketRecord]:
+        """Alle offenen (auch geclaimten) Tickets aus dem Speicher."""
+        return [record for guild_tickets in self._open_by_guild.values() for record in guild_tickets.values()]
+
+    def open_in_guild(self, guild_id: Optional[int]) -> List[TicketRecord]:
+        """Offene (auch geclaimte) Tickets einer Guild aus dem Speicher, ohne Datenbankzugriff."""
+        return list(self._open_by_guild.get(guild_id, {}).values())
+
+    def count_open(self, guild_id: Optional[int], creator_id: int) -> int:
+        """Anzahl offener (auch geclaimter) Tickets eines Benutzers in einer Guild."""
+        return len(self._open_by_creator.get((guild_id, creator_id), ()))
+
+    def count_all_open(self) -> int:
+        """Anzahl aller offenen Tickets (z.B. für Metriken)."""
+        return sum(len(guild_tickets) for guild_tickets in self._open_by_guild.values())
+
+    def find_open(self, guild_id: Optional[int], creator_id: int, category_id: str) -> Optional[TicketRecord]:
+        """
+        Offenes Ticket eines Benutzers in einer Kategorie. Zuerst im Speicher, danach in der Datenbank,
+        damit auch Tickets gefunden werden, die ein anderer Bot-Prozess gerade erstellt hat.
+        """
+        for thread_id in self._open_by_creator.get((guild_id, creator_id), ()):
+            record = self._tickets[thread_id]
+            if record.category_id == category_id:
+                return record
+        row = self._conn.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM tickets WHERE guild_id IS ? AND creator_id = ? AND status != ? AND category_id = ?"
+            " LIMIT 1", (guild_id, creator_id, STATUS_CLOSED, category_id)
+        ).fetchone()
+        return TicketRecord(*row) if row else None
+
+    def _index_open(self, record: TicketRecord, add: bool):
+        if not record.is_open:
+            return
+        key = (record.guild_id, record.creator_id)
+        if add:
+            self._open_by_creator.setdefault(key, set()).add(record.thread_id)
+            self._open_by_guild.setdefault(record.guild_id, {})[record.thread_id] = record
+            return
+        guild_tickets = self._open_by_guild.get(record.guild_id)
+        if guild_tickets is not None:
+            guild_tickets.pop(record.thread_id, None)
+            if not guild_tickets:
+                del self._open_by_guild[record.guild_id]
+        thread_ids = self._open_by_creator.get(key)
+        if thread_ids is not None:
+            thread_ids.discard(record.thread_id)
+            if not thread_ids:
+                del self._open_by_creator[key]
+
+    def _write(self, record: TicketRecord):
+        values = asdict(record)
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO tickets ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+            tuple(values[c] for c in _COLUMNS)
+        )
+
+    def add(self, record: TicketRecord) -> TicketRecord:
+        """Speichert einen (neuen oder migrierten) Datensatz."""
+        previous = self._tickets.get(record.thread_id)
+        if previous:
+            self._index_open(previous, False)
+        self._tickets[record.thread_id] = record
+        self._index_open(record, True)
+        self._write(record)
+        return record
+
+    def create(self, thread_id: int, guild_id: Optional[int], creator_id: int, category_id: str) -> TicketRecord:
+        record = TicketRecord(thread_id=thread_id, guild_id=guild_id, creator_id=creator_id,
+                              category_id=category_id, created_at=time.time())
+        return self.add(record)
+
+    def _refresh(self, thread_id: int) -> Optional[TicketRecord]:
+        """
+        Liest ein Ticket neu aus der Datenbank, z.B. nachdem ein anderer Bot-Prozess es geclaimed oder geschlossen hat.
+        Der Datensatz im Speicher wird an Ort und Stelle aktualisiert, Aufrufer mit einer Referenz sehen den neuen Zustand.
+        """
+        row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM tickets WHERE thread_id = ?", (thread_id,)).fetchone()
+        record = self._tickets.get(thread_id)
+        if record:
+            self._index_open(record, False)
+        if row is None:
+            self._tickets.pop(thread_id, None)
+            return None
+        if record is None:
+            record = self._tickets[thread_id] = TicketRecord(*row)
+        else:
+            for column, value in zip(_COLUMNS, row):
+                setattr(record, column, value)
+        self._index_open(record, True)
+        return record
+
+    def _update(self, thread_id: int, sql: str, params: tuple) -> bool:
+        """
+        Führt eine Statusänderung als UPDATE nur der betroffenen Spalten aus, deren WHERE-Bedingung den erwarteten Status
+        in der Datenbank prüft. Mehrere Bot-Prozesse mit derselben Datenbank überschreiben so nicht gegenseitig ihre
+        Claims und Schließungen. Danach wird der Datensatz im Speicher neu gelesen; False: Bedingung galt nicht mehr.
+        """
+        if thread_id not in self._tickets:
+            return False
+        changed = self._conn.execute(sql, params).rowcount == 1
+        self._refresh(thread_id)
+        return changed
+
+    def mark_claimed(self, thread_id: int, claimer_id: int) -> bool:
+        """
+        Markiert ein Ticket als geclaimed. Gibt False zurück, wenn es bereits geclaimed oder geschlossen ist.
+        Prüfung und Änderung laufen ohne await dazwischen und sind damit innerhalb des Event-Loops atomar.
+        """
+        return self._update(thread_id, "UPDATE tickets SET status = ?, claimer_id = ?, claimed_at = ? WHERE thread_id = ? AND status = ?",
+                            (STATUS_CLAIMED, claimer_id, time.time(), thread_id, STATUS_OPEN))
+
+    def reassign(self, thread_id: int, claimer_id: int) -> bool:
+        """
+        Weist ein offenes Ticket einem Moderator zu, auch wenn es schon geclaimed ist (Zeitpunkt des ersten Claims bleibt).
+        Gibt False zurück, wenn das Ticket unbekannt oder geschlossen ist.
+        """
+        return self._update(thread_id, "UPDATE tickets SET status = ?, claimer_id = ?, claimed_at = COALESCE(claimed_at, ?)"
+                                       " WHERE thread_id = ? AND status != ?",
+                            (STATUS_CLAIMED, claimer_id, time.time(), thread_id, STATUS_CLOSED))
+
+    def mark_closed(self, thread_id: int, closer_id: Optional[int]) -> bool:
+        """Markiert ein Ticket als geschlossen. Gibt False zurück, wenn es unbekannt oder schon geschlossen ist."""
+        return self._update(thread_id, "UPDATE tickets SET status = ?, closer_id = ?, closed_at = ? WHERE thread_id = ? AND status != ?",
+                            (STATUS_CLOSED, closer_id, time.time(), thread_id, STATUS_CLOSED))
+
+    def reopen(self, thread_id: int) -> bool:
+        """
+        Nimmt `mark_closed` zurück (z.B. wenn der Thread nicht archiviert werden konnte); Claim und Claimer bleiben erhalten.
+        Gibt False zurück, wenn das Ticket unbekannt oder nicht geschlossen ist.
+        """
+        return self._update(thread_id, "UPDATE tickets SET status = CASE WHEN claimer_id IS NULL THEN ? ELSE ? END,"
+                                       " closer_id = NULL, closed_at = NULL WHERE thread_id = ? AND status = ?",
+                            (STATUS_OPEN, STATUS_CLAIMED, thread_id, STATUS_CLOSED))
+
+    def set_message_id(self, thread_id: int, message_id: int):
+        """Merkt sich die Nachricht mit dem Ticket-Embed, damit sie ohne Interaktion (z.B. beim automatischen Schließen) gefunden wird."""
+        record = self._tickets.get(thread_id)
+        if not record or record.message_id == message_id:
+            return
+        record.message_id = message_id
+        self._conn.execute("UPDATE tickets SET message_id = ? WHERE thread_id = ?", (message_id, thread_id))
+
+    def set_deadline(self, thread_id: int, kind: str, due_at: float):
+        self._conn.execute("INSERT OR REPLACE INTO deadlines (thread_id, kind, due_at) VALUES (?, ?, ?)", (thread_id, kind, due_at))
+
+    def remove_deadline(self, thread_id: int, kind: Optional[str] = None):
+        """Entfernt eine Frist oder (ohne `kind`) alle Fristen eines Tickets."""
+        if kind is None:
+            self._conn.execute("DELETE FROM deadlines WHERE thread_id = ?", (thread_id,))
+        else:
+            self._conn.execute("DELETE FROM deadlines WHERE thread_id = ? AND kind = ?", (thread_id, kind))
+
+    def deadlines(self) -> List[Tuple[int, str, float]]:
+        """Alle gespeicherten Fristen als (thread_id, kind, due_at)."""
+        return self._conn.execute("SELECT thread_id, kind, due_at FROM deadlines").fetchall()
+
+    def set_activity(self, thread_id: int, last_at: float):
+        self._conn.execute("INSERT OR REPLACE INTO ticket_activity (thread_id, last_at) VALUES (?, ?)", (thread_id, last_at))
+
+    def remove_activity(self, thread_id: int):
+        self._conn.execute("DELETE FROM ticket_activity WHERE thread_id = ?", (thread_id,))
+
+    def activity(self) -> Dict[int, float]:
+        """Gespeicherte letzte Benutzer-Aktivität pro Ticket (Thread-ID -> Unix-Zeit)."""
+        return dict(self._conn.execute("SELECT thread_id, last_at FROM ticket_activity").fetchall())
+
+    def reconcile_checkpoint(self, guild_id: int, forum_id: int) -> Optional[float]:
+        """Startzeit des letzten vollständigen Abgleichs dieses Forums (None: noch keiner oder anderes Forum)."""
+        row = self._conn.execute("SELECT forum_id, started_at FROM reconcile_state WHERE guild_id = ?", (guild_id,)).fetchone()
+        return row[1] if row and row[0] == forum_id else None
+
+    def set_reconcile_checkpoint(self, guild_id: int, forum_id: int, started_at: float):
+        self._conn.execute("INSERT OR REPLACE INTO reconcile_state (guild_id, forum_id, started_at) VALUES (?, ?, ?)",
+                           (guild_id, forum_id, started_at))
+
+    def add_panel(self, message_id: int, channel_id: int, guild_id: int):
+        self._conn.execute("INSERT OR REPLACE INTO panels (message_id, channel_id, guild_id) VALUES (?, ?, ?)",
+                           (message_id, channel_id, guild_id))
+
+    def remove_panel(self, message_id: int):
+        self._conn.execute("DELETE FROM panels WHERE message_id = ?", (message_id,))
+
+    def panels(self) -> List[Tuple[int, int, int]]:
+        """Alle gespeicherten Panels als (message_id, channel_id, guild_id)."""
+        return self._conn.execute("SELECT message_id, channel_id, guild_id FROM panels").fetchall()
+
+    @staticmethod
+    def _lock_key(guild_id: Optional[int], creator_id: int, category_id: str) -> tuple:
+        return (guild_id or 0, creator_id, category_id)
+
+    def try_lock_creation(self, guild_id: Optional[int], creator_id: int, category_id: str, owner: str, ttl: float) -> bool:
+        """
+        Reserviert die Erstellung eines Tickets für (Guild, Ersteller, Kategorie). Gibt False zurück, wenn ein anderer
+        Prozess (oder Aufruf) die Reservierung hält. Abgelaufene Reservierungen, z.B. eines abgestürzten Prozesses, verfallen.
+        """
+        key = self._lock_key(guild_id, creator_id, category_id)
+        now = time.time()
+        self._conn.execute("DELETE FROM creation_locks WHERE guild_id = ? AND creator_id = ? AND category_id = ? AND expires_at < ?",
+                           (*key, now))
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO creation_locks (guild_id, creator_id, category_id, owner, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (*key, owner, now + ttl)
+        )
+        return cursor.rowcount == 1
+
+    def is_creation_locked(self, guild_id: Optional[int], creator_id: int, category_id: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM creation_locks WHERE guild_id = ? AND creator_id = ? AND category_id = ? AND expires_at >= ?",
+            (*self._lock_key(guild_id, creator_id, category_id), time.time())
+        ).fetchone()
+        return row is not None
+
+    def unlock_creation(self, guild_id: Optional[int], creator_id: int, category_id: str, owner: str):
+        self._conn.execute("DELETE FROM creation_locks WHERE guild_id = ? AND creator_id = ? AND category_id = ? AND owner = ?",
+                           (*self._lock_key(guild_id, creator_id, category_id), owner))
+
+    def add_transcript(self, thread_id: int, guild_id: Optional[int], path: str, message_count: int, size_bytes: int):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO transcripts (thread_id, guild_id, path, message_count, size_bytes, exported_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (thread_id, guild_id, path, message_count, size_bytes, time.time())
+        )
+
+    def set_transcript_message(self, thread_id: int, log_message_id: int):
+        self._conn.execute("UPDATE transcripts SET log_message_id = ? WHERE thread_id = ?", (log_message_id, thread_id))
+
+    def get_transcript(self, thread_id: int) -> Optional[TranscriptRecord]:
+        row = self._conn.execute(
+            f"SELECT {', '.join(_TRANSCRIPT_COLUMNS)} FROM transcripts WHERE thread_id = ?", (thread_id,)
+        ).fetchone()
+        return TranscriptRecord(*row) if row else None
+
+    def add_evidence(self, thread_id: int, sha256: str, filename: str, content_type: str, size_bytes: int, path: str,
+                     uploader_id: int, message_id: int) -> bool:
+        """Erfasst einen Nachweis. False, wenn dieselbe Datei im Ticket schon erfasst ist."""
+        cursor = self._conn.execute(
+            f"INSERT OR IGNORE INTO evidence ({', '.join(_EVIDENCE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, sha256, filename, content_type, size_bytes, path, uploader_id, message_id, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def get_evidence(self, thread_id: int, sha256: str) -> Optional[EvidenceRecord]:
+        row = self._conn.execute(
+            f"SELECT {', '.join(_EVIDENCE_COLUMNS)} FROM evidence WHERE thread_id = ? AND sha256 = ?", (thread_id, sha256)
+        ).fetchone()
+        return EvidenceRecord(*row) if row else None
+
+    def count_evidence(self, thread_id: int) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM evidence WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+    def evidence_for(self, thread_id: int) -> List[EvidenceRecord]:
+        rows = self._conn.execute(
+            f"SELECT {', '.join(_EVIDENCE_COLUMNS)} FROM evidence WHERE thread_id = ? ORDER BY stored_at", (thread_id,)
+        )
+        return [EvidenceRecord(*row) for row in rows]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,119 @@
+import asyncio
+import gzip
+import html
+import json
+import os
+from dataclasses import dataclass
+from typing import List
+
+import discord
+
+# Nachrichten pro Seite von thread.history (ein REST-Aufruf), so viele werden höchstens gleichzeitig gehalten
+HISTORY_PAGE_SIZE = 100
+TRANSCRIPT_FORMATS = ("html", "jsonl")
+
+_HTML_HEADER = """<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; background: #313338; color: #dbdee1; margin: 2em; }}
+.msg {{ margin: 0 0 1em 0; }} .meta {{ color: #949ba4; font-size: 0.85em; }} .author {{ color: #fff; font-weight: bold; }}
+.content {{ white-space: pre-wrap; }} .embed {{ border-left: 4px solid #5865f2; padding: 0.3em 0.8em; margin-top: 0.3em; background: #2b2d31; }}
+</style></head><body>
+<h1>{title}</h1>
+"""
+_HTML_FOOTER = "</body></html>\n"
+
+
+@dataclass(frozen=True)
+class TranscriptFile:
+    path: str
+    message_count: int
+    size_bytes: int
+
+
+def message_to_dict(message: discord.Message) -> dict:
+    """Für das Transkript relevante Teile einer Nachricht."""
+    return {
+        "id": message.id,
+        "author_id": message.author.id,
+        "author": str(message.author),
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+        "content": message.content,
+        "embeds": [
+            {
+                "title": embed.title,
+                "description": embed.description,
+                "fields": [{"name": field.name, "value": field.value} for field in embed.fields],
+            }
+            for embed in message.embeds
+        ],
+        "attachments": [{"filename": attachment.filename, "url": attachment.url} for attachment in message.attachments],
+    }
+
+
+def _render_html(entry: dict) -> str:
+    parts = [
+        f'<div class="msg"><span class="author">{html.escape(entry["author"])}</span> '
+        f'<span class="meta">({entry["author_id"]}) {html.escape(entry["created_at"] or "")}</span>'
+    ]
+    if entry["content"]:
+        parts.append(f'<div class="content">{html.escape(entry["content"])}</div>')
+    for embed in entry["embeds"]:
+        lines = [f"<b>{html.escape(embed['title'])}</b>"] if embed["title"] else []
+        if embed["description"]:
+            lines.append(html.escape(embed["description"]))
+        lines += [f"<b>{html.escape(field['name'])}</b>: {html.escape(field['value'])}" for field in embed["fields"]]
+        parts.append(f'<div class="embed content">{"<br>".join(lines)}</div>')
+    for attachment in entry["attachments"]:
+        parts.append(f'<div><a href="{html.escape(attachment["url"])}">{html.escape(attachment["filename"])}</a></div>')
+    parts.append("</div>\n")
+    return "".join(parts)
+
+
+class TranscriptExporter:
+    """
+    Exportiert den Verlauf eines Ticket-Threads als gzip-komprimierte HTML- oder JSONL-Datei.
+    thread.history wird seitenweise gelesen und jede Seite sofort (in einem Worker-Thread) geschrieben,
+    sodass auch Threads mit zehntausenden Nachrichten nur eine Seite gleichzeitig im Speicher halten.
+    """
+
+    def __init__(self, directory: str = "transcripts", fmt: str = "html"):
+        self.directory = directory
+        self.format = fmt if fmt in TRANSCRIPT_FORMATS else "html"
+
+    def path_for(self, guild_id: int, thread_id: int) -> str:
+        return os.path.join(self.directory, str(guild_id), f"{thread_id}.{self.format}.gz")
+
+    def _render(self, entries: List[dict]) -> str:
+        if self.format == "jsonl":
+            return "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        return "".join(_render_html(entry) for entry in entries)
+
+    async def export(self, thread: discord.Thread) -> TranscriptFile:
+        path = self.path_for(thread.guild.id, thread.id)
+        tmp_path = f"{path}.tmp"
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        output = await asyncio.to_thread(gzip.open, tmp_path, "wt", encoding="utf-8")
+        message_count = 0
+        try:
+            if self.format == "html":
+                await asyncio.to_thread(output.write, _HTML_HEADER.format(title=html.escape(f"Transkript: {thread.name}")))
+            page = []
+            async for message in thread.history(limit=None, oldest_first=True):
+                page.append(message_to_dict(message))
+                if len(page) >= HISTORY_PAGE_SIZE:
+                    await asyncio.to_thread(output.write, self._render(page))
+                    message_count += len(page)
+                    page = []
+            if page:
+                await asyncio.to_thread(output.write, self._render(page))
+                message_count += len(page)
+            if self.format == "html":
+                await asyncio.to_thread(output.write, _HTML_FOOTER)
+        except BaseException:
+            await asyncio.to_thread(output.close)
+            await asyncio.to_thread(os.remove, tmp_path)
+            raise
+        await asyncio.to_thread(output.close)
+        await asyncio.to_thread(os.replace, tmp_path, path) # Erst vollständige Dateien erscheinen im Archiv
+        return TranscriptFile(path, message_count, os.path.getsize(path))